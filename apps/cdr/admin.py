@@ -1,13 +1,15 @@
 from django.contrib import admin
+from django.db.models import Q
+from apps.core.db_routers import ReplicaChangelistMixin
 from .models import Cdr
 
 
 @admin.register(Cdr)
-class CdrAdmin(admin.ModelAdmin):
+class CdrAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = (
         'src_number', 'dest_number', 'call_duration', 'start_time', 'end_time', 'call_successful', 'timestamp')
     list_filter = ('call_successful', 'start_time', 'end_time')
-    search_fields = ('src_number', 'dest_number')
+    search_fields = ('=src_number', '=dest_number')  # Numbers are stored as integers, see get_search_results
     list_editable = ('call_successful',)
     ordering = ('-timestamp',)
     date_hierarchy = 'timestamp'
@@ -25,6 +27,15 @@ class CdrAdmin(admin.ModelAdmin):
 
     readonly_fields = ('start_time', 'end_time', 'timestamp')
 
+    def get_search_results(self, request, queryset, search_term):
+        # The admin's exact search (iexact) compares the numbers as text, without their leading zero, and
+        # a term that is not a number cannot be compared to the integer columns: every term must be a number.
+        for term in search_term.split():
+            if not term.isdigit():
+                return queryset.none(), False
+            queryset = queryset.filter(Q(src_number=term) | Q(dest_number=term))
+        return queryset, False
+
     def save_model(self, request, obj, form, change):
         if not change:  # Only validate on new record creation
             if Cdr.objects.filter(src_number=obj.src_number, dest_number=obj.dest_number).exists():
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CdrConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.cdr'
+
+    def ready(self):
+        from apps.cdr import signals  # noqa: F401
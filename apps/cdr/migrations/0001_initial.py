@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2025-01-03 00:12
+
+import apps.core.validators
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cdr',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('src_number', models.CharField(max_length=11, unique=True, validators=[apps.core.validators.PhoneNumberMobileValidator()], verbose_name='Phone Number Src')),
+                ('dest_number', models.CharField(max_length=11, unique=True, validators=[apps.core.validators.PhoneNumberMobileValidator()], verbose_name='Phone Number Dest')),
+                ('call_duration', models.PositiveIntegerField(blank=True, help_text='Duration of the call in seconds', null=True, validators=[apps.core.validators.CallDuration()])),
+                ('start_time', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('end_time', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('timestamp', models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False)),
+                ('call_successful', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Call Detail Record',
+                'verbose_name_plural': 'Call Detail Records',
+                'indexes': [models.Index(fields=['src_number', 'dest_number', 'timestamp'], name='cdr_cdr_src_num_2ee275_idx')],
+                'constraints': [models.UniqueConstraint(fields=('src_number', 'dest_number'), name='unique_src_dest_numbers')],
+            },
+        ),
+    ]
@@ -0,0 +1,126 @@
+import apps.core.fields
+import apps.core.validators
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+CHUNK_SIZE = 10000
+
+
+def copy_numbers(apps, schema_editor):
+    """Fill the bigint columns from the varchar ones, one primary key range at a time."""
+    Cdr = apps.get_model('cdr', 'Cdr')
+    manager = Cdr.objects.using(schema_editor.connection.alias)
+    bounds = manager.aggregate(low=models.Min('pk'), high=models.Max('pk'))
+    if bounds['low'] is None:
+        return
+
+    for start in range(bounds['low'], bounds['high'] + 1, CHUNK_SIZE):
+        chunk = manager.filter(pk__gte=start, pk__lt=start + CHUNK_SIZE)
+        chunk.filter(src_number__regex=r'^[0-9]{1,18}$').update(
+            src_number_int=Cast('src_number', models.BigIntegerField()))
+        chunk.filter(dest_number__regex=r'^[0-9]{1,18}$').update(
+            dest_number_int=Cast('dest_number', models.BigIntegerField()))
+        print(f"Converted phone numbers of rows {start} to {min(start + CHUNK_SIZE - 1, bounds['high'])}.")
+
+    invalid = manager.filter(models.Q(src_number_int__isnull=True) | models.Q(dest_number_int__isnull=True))
+    if invalid.exists():
+        raise ValueError(
+            f"{invalid.count()} CDRs have a src_number or dest_number that is not a phone number "
+            f"(e.g. pk={invalid.values_list('pk', flat=True).first()}). Fix or delete them and migrate again."
+        )
+
+
+def copy_numbers_back(apps, schema_editor):
+    """Restore the zero padded varchar numbers from the bigint columns."""
+    Cdr = apps.get_model('cdr', 'Cdr')
+    manager = Cdr.objects.using(schema_editor.connection.alias)
+    bounds = manager.aggregate(low=models.Min('pk'), high=models.Max('pk'))
+    if bounds['low'] is None:
+        return
+
+    for start in range(bounds['low'], bounds['high'] + 1, CHUNK_SIZE):
+        chunk = manager.filter(pk__gte=start, pk__lt=start + CHUNK_SIZE)
+        chunk.update(
+            src_number=models.Func(models.F('src_number_int'), models.Value('FM00000000000'), function='TO_CHAR'),
+            dest_number=models.Func(models.F('dest_number_int'), models.Value('FM00000000000'), function='TO_CHAR'),
+        )
+
+
+class Migration(migrations.Migration):
+    """
+    Store src_number/dest_number as bigint and replace the four varchar indexes (two per-column unique
+    indexes, the pair constraint and the composite index) with one covering unique key.
+
+    The data is copied in primary key chunks outside of a single transaction, so large tables are
+    converted without holding one long transaction open.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('cdr', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cdr',
+            name='src_number_int',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='cdr',
+            name='dest_number_int',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RemoveConstraint(
+            model_name='cdr',
+            name='unique_src_dest_numbers',
+        ),
+        migrations.RemoveIndex(
+            model_name='cdr',
+            name='cdr_cdr_src_num_2ee275_idx',
+        ),
+        migrations.AlterField(
+            model_name='cdr',
+            name='src_number',
+            field=models.CharField(max_length=11, null=True),
+        ),
+        migrations.AlterField(
+            model_name='cdr',
+            name='dest_number',
+            field=models.CharField(max_length=11, null=True),
+        ),
+        migrations.RunPython(copy_numbers, copy_numbers_back, elidable=True),
+        migrations.RemoveField(
+            model_name='cdr',
+            name='src_number',
+        ),
+        migrations.RemoveField(
+            model_name='cdr',
+            name='dest_number',
+        ),
+        migrations.RenameField(
+            model_name='cdr',
+            old_name='src_number_int',
+            new_name='src_number',
+        ),
+        migrations.RenameField(
+            model_name='cdr',
+            old_name='dest_number_int',
+            new_name='dest_number',
+        ),
+        migrations.AlterField(
+            model_name='cdr',
+            name='src_number',
+            field=apps.core.fields.PhoneNumberField(validators=[apps.core.validators.PhoneNumberMobileValidator()], verbose_name='Phone Number Src'),
+        ),
+        migrations.AlterField(
+            model_name='cdr',
+            name='dest_number',
+            field=apps.core.fields.PhoneNumberField(validators=[apps.core.validators.PhoneNumberMobileValidator()], verbose_name='Phone Number Dest'),
+        ),
+        migrations.AddConstraint(
+            model_name='cdr',
+            constraint=models.UniqueConstraint(fields=('src_number', 'dest_number'), include=('timestamp',), name='unique_src_dest_numbers'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr', '0002_phone_numbers_as_bigint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cdr',
+            name='start_time',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+    ]
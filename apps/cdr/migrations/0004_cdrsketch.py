@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr', '0003_start_time_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CdrSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the hour the sketches cover', unique=True)),
+                ('calls', models.PositiveBigIntegerField(default=0)),
+                ('src_numbers', models.BinaryField(help_text='HyperLogLog of the distinct src numbers')),
+                ('dest_numbers', models.BinaryField(help_text='HyperLogLog of the distinct dest numbers')),
+                ('call_durations', models.BinaryField(help_text='DDSketch of the call durations in seconds')),
+            ],
+            options={
+                'verbose_name': 'CDR Sketch',
+                'verbose_name_plural': 'CDR Sketches',
+            },
+        ),
+    ]
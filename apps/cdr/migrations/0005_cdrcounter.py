@@ -0,0 +1,39 @@
+from datetime import timezone
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def count_existing_cdrs(apps, schema_editor):
+    """Fill the counters with the CDRs stored before they existed, one row per day."""
+    Cdr = apps.get_model('cdr', 'Cdr')
+    CdrCounter = apps.get_model('cdr', 'CdrCounter')
+    alias = schema_editor.connection.alias
+    days = (Cdr.objects.using(alias).annotate(day=TruncDate('start_time', tzinfo=timezone.utc))
+            .values('day').annotate(count=models.Count('id')).order_by())
+    CdrCounter.objects.using(alias).bulk_create(CdrCounter(day=row['day'], shard=0, count=row['count']) for row in days)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr', '0004_cdrsketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CdrCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'CDR Counter',
+                'verbose_name_plural': 'CDR Counters',
+                'constraints': [models.UniqueConstraint(fields=('day', 'shard'), name='unique_cdr_counter_day_shard')],
+            },
+        ),
+        migrations.RunPython(count_existing_cdrs, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,18 @@
+import apps.core.fields
+import apps.core.validators
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr', '0005_cdrcounter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cdr',
+            name='dest_number',
+            field=apps.core.fields.PhoneNumberField(db_index=True, validators=[apps.core.validators.PhoneNumberMobileValidator()], verbose_name='Phone Number Dest'),
+        ),
+    ]
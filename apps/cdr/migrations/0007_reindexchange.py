@@ -0,0 +1,24 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr', '0006_dest_number_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReindexChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cdr_id', models.BigIntegerField()),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Reindex Change',
+                'verbose_name_plural': 'Reindex Changes',
+            },
+        ),
+    ]
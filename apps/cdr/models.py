@@ -1,20 +1,20 @@
 from django.db import models
 from django.utils import timezone
 from apps.core import validators
+from apps.core.fields import PhoneNumberField
 from django.utils.translation import gettext_lazy as _
 
 
 class Cdr(models.Model):
     """Model to represent a Call Detail Record (CDR)"""
 
-    src_number = models.CharField(
-        max_length=11, unique=True,
+    src_number = PhoneNumberField(
         validators=[validators.PhoneNumberMobileValidator()], verbose_name=_('Phone Number Src')
     )
 
-    dest_number = models.CharField(
-        max_length=11, unique=True,
-        validators=[validators.PhoneNumberMobileValidator()], verbose_name=_('Phone Number Dest')
+    # Searched alone (admin, search fallback, dest_prefix ranges), which the unique key below cannot serve.
+    dest_number = PhoneNumberField(
+        validators=[validators.PhoneNumberMobileValidator()], verbose_name=_('Phone Number Dest'), db_index=True
     )
 
     call_duration = models.PositiveIntegerField(
@@ -24,7 +24,7 @@ class Cdr(models.Model):
         help_text="Duration of the call in seconds"
     )
 
-    start_time = models.DateTimeField(default=timezone.now, editable=False)
+    start_time = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
     end_time = models.DateTimeField(default=timezone.now, editable=False)
     timestamp = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
     call_successful = models.BooleanField(default=False)
@@ -33,11 +33,62 @@ class Cdr(models.Model):
         return f'{self.src_number} -> {self.dest_number} | {self.call_duration}s | {"Success" if self.call_successful else "Failed"}'
 
     class Meta:
-        indexes = [
-            models.Index(fields=['src_number', 'dest_number', 'timestamp']),
-        ]
         verbose_name = "Call Detail Record"
         verbose_name_plural = "Call Detail Records"
+        # Unique on the number pair, it serves lookups by src_number (and src_prefix ranges) and by
+        # (src_number, dest_number); the included timestamp is not searchable but lets those lookups read
+        # it with index-only scans.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['src_number', 'dest_number'], include=['timestamp'], name='unique_src_dest_numbers'
+            )
+        ]
+
+
+class CdrSketch(models.Model):
+    """Mergeable sketches of the CDRs starting in one hour (UTC), maintained by the consumer"""
+
+    bucket = models.DateTimeField(unique=True, help_text="Start of the hour the sketches cover")
+    calls = models.PositiveBigIntegerField(default=0)
+    src_numbers = models.BinaryField(help_text="HyperLogLog of the distinct src numbers")
+    dest_numbers = models.BinaryField(help_text="HyperLogLog of the distinct dest numbers")
+    call_durations = models.BinaryField(help_text="DDSketch of the call durations in seconds")
+
+    def __str__(self):
+        return f'{self.bucket:%Y-%m-%d %H:00} | {self.calls} calls'
+
+    class Meta:
+        verbose_name = "CDR Sketch"
+        verbose_name_plural = "CDR Sketches"
+
+
+class CdrCounter(models.Model):
+    """Number of CDRs per start_time day (UTC), split over a few shard rows so concurrent inserts do not contend"""
+
+    day = models.DateField()
+    shard = models.PositiveSmallIntegerField()
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.day} #{self.shard} | {self.count} CDRs'
+
+    class Meta:
+        verbose_name = "CDR Counter"
+        verbose_name_plural = "CDR Counters"
         constraints = [
-            models.UniqueConstraint(fields=['src_number', 'dest_number'], name='unique_src_dest_numbers')
+            models.UniqueConstraint(fields=['day', 'shard'], name='unique_cdr_counter_day_shard')
         ]
+
+
+class ReindexChange(models.Model):
+    """A CDR saved or deleted while `reindex_cdrs` runs, indexed again once the rebuilt indices are served"""
+
+    cdr_id = models.BigIntegerField()
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'CDR {self.cdr_id} | {self.changed_at:%Y-%m-%d %H:%M:%S}'
+
+    class Meta:
+        verbose_name = "Reindex Change"
+        verbose_name_plural = "Reindex Changes"
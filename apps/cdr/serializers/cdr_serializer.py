@@ -1,8 +1,19 @@
 from rest_framework import serializers
 from apps.core import validators
+from apps.core.server_timing import timed
 
 
-class CdrSearchSerializer(serializers.Serializer):
+class TimedSerializer(serializers.Serializer):
+    """
+    Serializer whose validation is timed as the `validation` phase of the request (see `apps.core.server_timing`).
+    """
+
+    def is_valid(self, *, raise_exception=False):
+        with timed('validation'):
+            return super().is_valid(raise_exception=raise_exception)
+
+
+class CdrSearchSerializer(TimedSerializer):
     """
     Serializer for validating Call Detail Records (CDR) search parameters.
     """
@@ -20,6 +31,14 @@ class CdrSearchSerializer(serializers.Serializer):
             "invalid": "The dest number field must be a valid phone number.",
         },
     )
+    src_prefix = serializers.CharField(
+        required=False,
+        validators=[validators.PhoneNumberPrefixValidator()],
+    )
+    dest_prefix = serializers.CharField(
+        required=False,
+        validators=[validators.PhoneNumberPrefixValidator()],
+    )
     start_time = serializers.DateTimeField(
         required=False,
         error_messages={
@@ -44,3 +63,151 @@ class CdrSearchSerializer(serializers.Serializer):
             "invalid": "The call successful field must be a boolean.",
         },
     )
+    page_size = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=1000,
+        error_messages={
+            "invalid": "The page size field must be an integer.",
+            "min_value": "The page size field must be at least 1.",
+            "max_value": "The page size field must be at most 1000.",
+        },
+    )
+    cursor = serializers.CharField(
+        required=False,
+        error_messages={
+            "invalid": "The cursor field must be the `next` token of a previous page.",
+        },
+    )
+
+    fields = serializers.CharField(
+        required=False,
+        error_messages={
+            "invalid": "The fields field must be a comma separated list of CDR fields.",
+        },
+    )
+    count_only = serializers.BooleanField(
+        required=False,
+        error_messages={
+            "invalid": "The count only field must be a boolean.",
+        },
+    )
+    count_limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        error_messages={
+            "invalid": "The count limit field must be an integer.",
+            "min_value": "The count limit field must be at least 1.",
+        },
+    )
+    exists = serializers.BooleanField(
+        required=False,
+        error_messages={
+            "invalid": "The exists field must be a boolean.",
+        },
+    )
+
+    PAGINATION_FIELDS = ('page_size', 'cursor')
+    OUTPUT_FIELDS = ('fields', 'count_only', 'count_limit', 'exists')
+    CDR_FIELDS = ('id', 'src_number', 'dest_number', 'call_duration', 'start_time', 'end_time', 'timestamp',
+                  'call_successful')
+
+    def validate_fields(self, value):
+        """
+        Split the comma separated list of fields to return and check that every one is a CDR field.
+        """
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.CDR_FIELDS]
+        if not names or unknown:
+            raise serializers.ValidationError(
+                f"Unknown field(s): {', '.join(unknown)}, use {', '.join(self.CDR_FIELDS)}." if unknown
+                else "The fields field must not be empty."
+            )
+        return names
+
+    def validate(self, attrs):
+        """
+        Check that the count and exists modes are not combined with each other or with pagination.
+        """
+        if attrs.get('count_only') and attrs.get('exists'):
+            raise serializers.ValidationError("count_only and exists cannot be used together.")
+        if (attrs.get('count_only') or attrs.get('exists')) and any(key in attrs for key in self.PAGINATION_FIELDS):
+            raise serializers.ValidationError("count_only and exists cannot be used with page_size or cursor.")
+        if 'count_limit' in attrs and not attrs.get('count_only'):
+            raise serializers.ValidationError("count_limit can only be used with count_only.")
+        return attrs
+
+
+class CdrStatsSerializer(TimedSerializer):
+    """
+    Serializer for validating the time window of the CDR statistics, with the semantics of the search:
+    CDRs started from `start_time` and ended by `end_time`.
+    """
+    start_time = serializers.DateTimeField(
+        required=False,
+        error_messages={
+            "invalid": "The start time field must be a valid date-time.",
+        },
+    )
+    end_time = serializers.DateTimeField(
+        required=False,
+        error_messages={
+            "invalid": "The end time field must be a valid date-time.",
+        },
+    )
+
+    def validate(self, attrs):
+        """
+        Check that the window does not end before it starts.
+        """
+        if 'start_time' in attrs and 'end_time' in attrs and attrs['end_time'] <= attrs['start_time']:
+            raise serializers.ValidationError("end_time must be later than start_time.")
+        return attrs
+
+
+class CdrTimeRangeSerializer(TimedSerializer):
+    """
+    Serializer for validating a time range given as `from` and `to`.
+    """
+    to = serializers.DateTimeField(
+        required=False,
+        error_messages={
+            "invalid": "The to field must be a valid date-time.",
+        },
+    )
+
+    def get_fields(self):
+        """
+        Add the `from` field, which cannot be declared as a class attribute.
+        """
+        fields = super().get_fields()
+        fields['from'] = serializers.DateTimeField(
+            required=False,
+            error_messages={
+                "invalid": "The from field must be a valid date-time.",
+            },
+        )
+        return fields
+
+    def validate(self, attrs):
+        """
+        Check that the range does not end before it starts.
+        """
+        if 'from' in attrs and 'to' in attrs and attrs['to'] <= attrs['from']:
+            raise serializers.ValidationError("to must be later than from.")
+        return attrs
+
+
+class CdrTimeseriesSerializer(CdrTimeRangeSerializer):
+    """
+    Serializer for validating the parameters of the CDR time series: `interval`, `from` and `to`.
+    """
+    INTERVALS = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600, '6h': 21600, '1d': 86400}
+
+    interval = serializers.ChoiceField(
+        choices=list(INTERVALS),
+        default='1h',
+        error_messages={
+            "invalid_choice": f"The interval field must be one of {', '.join(INTERVALS)}.",
+        },
+    )
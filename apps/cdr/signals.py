@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.cdr.models import Cdr
+from apps.core.row_counts import add_to_counter
+
+# The cached searches and time series buckets a CDR changes are invalidated once it is indexed, by
+# `apps.cdr.tasks.tasks_indexing.index_cdrs`: not here, before the transaction commits and the CDR is searchable.
+
+
+@receiver(post_save, sender=Cdr)
+def cdr_created(sender, instance, created, **kwargs):
+    """Count a new CDR in the counters of its day, in the transaction of the insert when there is one."""
+    if created:
+        add_to_counter(instance.start_time, 1)
+
+
+@receiver(post_delete, sender=Cdr)
+def cdr_deleted(sender, instance, **kwargs):
+    """Uncount a deleted CDR."""
+    add_to_counter(instance.start_time, -1)
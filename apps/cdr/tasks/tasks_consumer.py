@@ -1,19 +1,26 @@
-from apps.core import os_setting_elastic  # noqa
 import json
+from django.conf import settings
+from django.db import transaction
 from django.utils.dateparse import parse_datetime
-from apps.cdr.models import Cdr
 from django.utils import timezone
 from apps.cdr.tasks.tasks_main import RabbitMQMain
+from apps.core.bootstrap import setup_django
+from apps.core.db_routers import pin_to_primary
+from apps.core.sketch_store import SketchBuffer
 
 
 class RabbitMQConsumer(RabbitMQMain):
     """
     This class is used for consuming messages from RabbitMQ queues, processing them into Call Detail Records (CDRs),
     and saving them to a database.
+    It also keeps hourly sketches of the saved CDRs (see `apps.core.sketch_store`), merged into the
+    database every SKETCHES['FLUSH_INTERVAL'] seconds and when the consumer stops.
     """
+    sketches = None
 
     def connect(self):
-        """Establish connection to RabbitMQ."""
+        """Establish connection to RabbitMQ, once Django is set up to save the CDRs."""
+        setup_django()
         super().connect()
         for shard_id in range(self.shard_count):
             self.channel.basic_consume(queue=f"{self.queue_prefix}_{shard_id}",
@@ -28,6 +35,7 @@ class RabbitMQConsumer(RabbitMQMain):
             print(f"Received message: {message}")
             cdr_data = self._parse_message(message)
             self._save_cdr(cdr_data)
+            self._track_cdr(cdr_data)
 
             ch.basic_ack(delivery_tag=method.delivery_tag)
             print(f"Processed message: {cdr_data}")
@@ -61,18 +69,53 @@ class RabbitMQConsumer(RabbitMQMain):
 
     def _save_cdr(self, cdr_data):  # noqa
         """
-        Save the CDR data to the database.
+        Save the CDR data to the database, and count it in the per-day counters in the same transaction.
         """
-        Cdr.objects.create(**cdr_data)
+        from apps.cdr.models import Cdr
+
+        with transaction.atomic():
+            Cdr.objects.create(**cdr_data)
+
+    def _track_cdr(self, cdr_data):
+        """
+        Add a saved CDR to the hourly sketches, and flush them once SKETCHES['FLUSH_INTERVAL'] seconds have passed.
+        """
+        if not settings.SKETCHES.get('ENABLED', True):
+            return
+        if self.sketches is None:
+            self.sketches = SketchBuffer()
+        self.sketches.add(cdr_data)
+        if self.sketches.due():
+            self.flush_sketches()
+
+    def flush_sketches(self):
+        """Merge the buffered sketches into the database, they are kept for the next flush on failure."""
+        if not self.sketches:
+            return
+        try:
+            self.sketches.flush()
+        except Exception as e:
+            print(f"Error flushing sketches: {e}")
+
+    def _flush_sketches_periodically(self):
+        """Flush the sketches of an idle consumer too, rescheduled on the connection's timer."""
+        self.flush_sketches()
+        self.connection.call_later(settings.SKETCHES.get('FLUSH_INTERVAL', 5.0), self._flush_sketches_periodically)
 
     def start_consuming(self):
-        """Start consuming messages."""
+        """Start consuming messages. Every query of the consumer goes to the primary database."""
         try:
-            self.channel.start_consuming()
+            with pin_to_primary():
+                if settings.SKETCHES.get('ENABLED', True):
+                    self.connection.call_later(settings.SKETCHES.get('FLUSH_INTERVAL', 5.0),
+                                               self._flush_sketches_periodically)
+                self.channel.start_consuming()
             print("Consumer started consuming messages...")
         except KeyboardInterrupt:
             print("Consumer interrupted by user.")
         except Exception as e:
             print(f"Error while consuming: {e}")
         finally:
+            with pin_to_primary():
+                self.flush_sketches()
             self.close_connection()
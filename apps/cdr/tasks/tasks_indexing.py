@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from apps.cdr.models import Cdr
+from apps.cdr.serializers.cdr_serializer import CdrTimeseriesSerializer
+from apps.core.db_routers import pin_to_primary
+from apps.core.reindex import record_changes
+from apps.core.search_cache import TIMESERIES_PREFIX, advance_watermark, forget_buckets
+from config.celery import app
+
+
+@app.task(bind=True, max_retries=5, default_retry_delay=2, acks_late=True)
+def index_cdrs(self, ids, deleted=()):
+    """
+    Index a batch of changed CDRs, sent by `apps.core.signal_processor.CoalescingSignalProcessor`.
+    The rows are read from the primary in one query and written with `_bulk` requests, each to the
+    index of its period; the CDRs that failed are retried by a new run of the task. While `reindex_cdrs`
+    runs, the changes are also recorded for its catch up.
+
+    :param ids: Ids of the saved CDRs, the ones deleted since are skipped.
+    :param deleted: [id, index, start_time] of the deleted CDRs, start_time in ISO 8601.
+    :return: The indexed and failed counts.
+    """
+    from apps.core.documents import CdrDocument
+
+    record_changes([*ids, *(pk for pk, _, _ in deleted)])
+    document = CdrDocument()
+    with pin_to_primary():
+        cdrs = list(Cdr.objects.filter(id__in=ids))
+    found = {cdr.id for cdr in cdrs}
+    actions = [document._prepare_action(cdr, 'index') for cdr in cdrs]
+    actions += [{'_op_type': 'delete', '_index': index, '_id': pk} for pk, index, _ in deleted if pk not in found]
+    if not actions:
+        return {'indexed': 0, 'failed': 0}
+
+    result = CdrDocument.bulk_index(actions)
+
+    # Cached results computed before the CDRs were searchable are stale now, like after a save in real time.
+    for start_time in {cdr.start_time.date(): cdr.start_time for cdr in cdrs}.values():
+        advance_watermark(start_time)
+    if deleted:
+        advance_watermark()
+    # So are the closed time series buckets the late CDRs fall in.
+    start_times = [cdr.start_time for cdr in cdrs] + [datetime.fromisoformat(start) for pk, _, start in deleted
+                                                       if pk not in found]
+    for start_time in start_times:
+        forget_buckets(TIMESERIES_PREFIX, CdrTimeseriesSerializer.INTERVALS.values(), start_time)
+
+    retry_ids = [pk for pk in result.failed_ids if pk in found]
+    if retry_ids:
+        raise self.retry(args=(retry_ids, []))
+    return {'indexed': result.indexed, 'failed': result.failed}
@@ -1,5 +1,4 @@
 import time
-from apps.core import os_setting_elastic  # noqa
 import random
 from datetime import datetime, timedelta
 import pika
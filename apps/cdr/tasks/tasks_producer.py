@@ -1,4 +1,3 @@
-from apps.core import os_setting_elastic  # noqa
 from apps.cdr.tasks.tasks_main import RabbitMQMain
 import pika
 import json
@@ -0,0 +1,120 @@
+import time
+from unittest.mock import AsyncMock, patch
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from elastic_transport import ConnectionError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.cdr.models import Cdr
+from apps.core.query_planner import QueryPlanner
+
+
+# The planner is measured with the sync client, it is enabled only where a test needs it.
+@override_settings(QUERY_PLANNER={'ENABLED': False})
+class AsyncCDRViewsTest(TestCase):
+    def setUp(self):
+        """
+        Set up the test environment by creating a test user, obtaining a JWT token and mocking the async client.
+        """
+        caches['search'].clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+        patcher = patch('apps.cdr.views.cdr_async.get_async_es')
+        self.es = patcher.start().return_value
+        self.es.search = AsyncMock()
+        self.es.count = AsyncMock()
+        self.addCleanup(patcher.stop)
+
+    async def test_async_search(self):
+        """
+        Test searching CDRs through the async endpoint.
+        """
+        self.es.search.return_value = {"hits": {"hits": [{"_source": {"src_number": "09124567890"}}]}}
+
+        response = await self.async_client.get(
+            reverse('cdr_async_search'), {'src_number': '09124567890'}, headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [{"src_number": "09124567890"}])
+        self.assertEqual(response['X-Search-Backend'], 'elasticsearch')
+        self.assertEqual(self.es.search.call_args.kwargs['body']['query']['bool']['filter'],
+                         [{'term': {'src_number': '09124567890'}}])
+
+    async def test_async_search_falls_back_to_postgres(self):
+        """
+        Test that a search Elasticsearch fails to answer is answered by PostgreSQL, as on the sync endpoint.
+        """
+        cdr = await Cdr.objects.acreate(src_number="09124567890", dest_number="09127654321", call_duration=300,
+                                        call_successful=True)
+        self.es.search.side_effect = ConnectionError("Connection reset")
+        planner = QueryPlanner()
+
+        with patch('apps.cdr.views.cdr_async.planner', planner), \
+                override_settings(QUERY_PLANNER={'ENABLED': True, 'CHECK_INTERVAL': 3600}):
+            # Elasticsearch was up at the last check, the search itself fails.
+            planner._checked_at = time.monotonic()
+            response = await self.async_client.get(
+                reverse('cdr_async_search'), {'src_number': '09124567890', 'fields': 'id,call_duration'},
+                headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Search-Backend'], 'postgres')
+        self.assertEqual(response.json(), [{'id': cdr.id, 'call_duration': 300}])
+        self.assertFalse(planner.available)
+
+    async def test_async_search_invalid_params(self):
+        """
+        Test that the async endpoint validates its parameters like the sync one.
+        """
+        response = await self.async_client.get(
+            reverse('cdr_async_search'), {'cursor': 'abc'}, headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Invalid parameter(s)", response.json()['error'])
+        self.es.search.assert_not_called()
+
+    async def test_async_search_invalid_token(self):
+        """
+        Test that an invalid JWT is rejected before Elasticsearch is queried.
+        """
+        response = await self.async_client.get(
+            reverse('cdr_async_search'), {'src_number': '09124567890'}, headers={'Authorization': 'Bearer nope'})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.es.search.assert_not_called()
+
+    async def test_async_stats(self):
+        """
+        Test retrieving the statistics through the async endpoint.
+        """
+        self.es.search.return_value = {
+            'aggregations': {
+                'avg_duration': {'value': 150.0},
+                'successful_calls': {'doc_count': 120},
+                'failed_calls': {'doc_count': 30}
+            }
+        }
+
+        response = await self.async_client.get(reverse('cdr_async_stats'), headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            "average_call_duration": 150.0, "successful_calls": 120, "failed_calls": 30})
+
+    async def test_async_sync_status(self):
+        """
+        Test that the async sync status counts the database from the CDR counters.
+        """
+        await Cdr.objects.acreate(src_number="09124567890", dest_number="09127654321")
+        self.es.count.return_value = {'count': 2}
+
+        response = await self.async_client.get(reverse('cdr_async_sync_status'), headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"status": "out_of_sync", "db_count": 1, "es_count": 2,
+                                           "count_mode": "counter", "exact": True})
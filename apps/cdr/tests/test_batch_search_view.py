@@ -0,0 +1,80 @@
+from unittest.mock import patch
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.test import TestCase
+from rest_framework import status
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class CDRBatchSearchViewTest(TestCase):
+    def setUp(self):
+        """
+        Set up the test environment by creating a test user and obtaining a JWT token.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+
+        refresh = RefreshToken.for_user(self.user)
+        self.access_token = str(refresh.access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.url = reverse('cdr_batch_search')
+
+    @patch('apps.cdr.views.cdr_batch_search.es.msearch')
+    def test_batch_search(self, mock_es_msearch):
+        """
+        Test that valid filter sets run in one multi-search and invalid ones get an error block in place.
+        """
+        mock_es_msearch.return_value = {"responses": [
+            {"hits": {"hits": [{"_source": {"src_number": "09124567890"}}]}},
+            {"error": {"type": "search_phase_execution_exception", "reason": "all shards failed"}, "status": 400},
+        ]}
+        searches = [
+            {'src_number': '09124567890', 'page_size': 1},
+            {'src_number': 'not-a-number'},
+            {'dest_number': '09127654321', 'start_time': '2024-01-10T00:00:00Z', 'end_time': '2024-02-10T00:00:00Z'},
+        ]
+
+        response = self.client.post(self.url, {'searches': searches}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(results[0], {'results': [{'src_number': '09124567890'}]})
+        self.assertIn('src_number', results[1]['error'])
+        self.assertEqual(results[2], {'error': 'all shards failed'})
+
+        mock_es_msearch.assert_called_once()
+        lines = mock_es_msearch.call_args.kwargs['searches']
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[1]['size'], 1)
+        self.assertEqual(lines[1]['sort'], [{'start_time': 'desc'}])
+        self.assertEqual(lines[0], {})  # No window: the read alias of the request
+        self.assertEqual(lines[2]['index'], 'cdrs-2024.01,cdrs-2024.02')
+        self.assertEqual(mock_es_msearch.call_args.kwargs['max_concurrent_searches'], 8)
+
+    @patch('apps.cdr.views.cdr_batch_search.es.msearch')
+    def test_batch_search_invalid_batch(self, mock_es_msearch):
+        """
+        Test that a missing, empty or oversized list of searches is rejected, as well as a batch of too many hits.
+        """
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(self.url, {'searches': []}, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {'searches': [{'src_number': '09124567890'}] * 501}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        searches = [{'src_number': '09124567890', 'page_size': 1000}] * 11
+        response = self.client.post(self.url, {'searches': searches}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_es_msearch.assert_not_called()
+
+    @patch('apps.cdr.views.cdr_batch_search.es.msearch')
+    def test_batch_search_elasticsearch_error(self, mock_es_msearch):
+        """
+        Test when Elasticsearch throws an exception (e.g., down).
+        """
+        mock_es_msearch.side_effect = Exception("Elasticsearch is down")
+
+        response = self.client.post(self.url, {'searches': [{'src_number': '09124567890'}]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.data['error'], "Elasticsearch is down")
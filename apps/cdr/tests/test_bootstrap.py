@@ -0,0 +1,17 @@
+from django.test import SimpleTestCase
+
+from benchmarks.bench_import_time import import_time
+
+
+class BootstrapTest(SimpleTestCase):
+    def test_pipeline_modules_import_lazily(self):
+        """
+        Test that importing the producer and the consumer neither sets up Django nor loads the Elasticsearch client.
+        """
+        for module in ('apps.cdr.tasks.tasks_producer', 'apps.cdr.tasks.tasks_consumer'):
+            with self.subTest(module=module):
+                total, imported, booted = import_time(module)
+
+                self.assertIsNotNone(total)
+                self.assertFalse(booted)
+                self.assertNotIn('elasticsearch', [name.strip() for _, name in imported])
@@ -0,0 +1,93 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from elastic_transport import ConnectionError, ConnectionTimeout, JsonSerializer
+from elasticsearch import ApiError
+
+from apps.core.bulk_indexer import BulkIndexer
+
+
+class FakeClient:
+    """Elasticsearch stand-in answering _bulk requests with the statuses of `answers`, one list per request."""
+
+    class transport:
+        class serializers:
+            @staticmethod
+            def get_serializer(mimetype):
+                return JsonSerializer()
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.requests = []
+
+    def bulk(self, operations):
+        documents = [JsonSerializer().loads(line) for line in operations[1::2]]
+        self.requests.append(documents)
+        statuses = self.answers.pop(0) if self.answers else [201] * len(documents)
+        if isinstance(statuses, Exception):
+            raise statuses
+        return {'items': [{'index': {'_id': str(document['n']), 'status': status}}
+                          for document, status in zip(documents, statuses)]}
+
+
+def api_error(status):
+    return ApiError('failed', meta=type('Meta', (), {'status': status})(), body={})
+
+
+def actions(count):
+    return ({'_index': 'cdrs-2024.01', '_id': n, '_source': {'n': n}} for n in range(count))
+
+
+@patch('apps.core.bulk_indexer.random.uniform', return_value=0)
+class BulkIndexerTest(SimpleTestCase):
+    def test_chunks_by_count_and_bytes(self, mock_uniform):
+        """
+        Test that a chunk closes at the document limit or at the byte limit, whichever comes first.
+        """
+        client = FakeClient()
+        result = BulkIndexer(client, chunk_docs=4, max_in_flight=1).index(actions(10))
+        self.assertEqual([len(request) for request in client.requests], [4, 4, 2])
+        self.assertEqual(result.indexed, 10)
+
+        client = FakeClient()
+        BulkIndexer(client, chunk_docs=100, chunk_bytes=150, max_in_flight=1).index(actions(10))
+        self.assertTrue(all(len(request) < 10 for request in client.requests))
+        self.assertEqual(sum(len(request) for request in client.requests), 10)
+
+    def test_rejected_items_are_retried(self, mock_uniform):
+        """
+        Test that 429 items are sent again, other errors are reported with their ids, and the concurrency drops.
+        """
+        client = FakeClient([201, 429, 400, 429])
+        indexer = BulkIndexer(client, chunk_docs=4, max_in_flight=4)
+
+        result = indexer.index(actions(4))
+
+        self.assertEqual(result.as_dict(), {'indexed': 3, 'failed': 1, 'retried': 2, 'failed_ids': [2]})
+        self.assertEqual(client.requests[1], [{'n': 1}, {'n': 3}])
+        self.assertEqual(indexer.in_flight, 2)
+
+    def test_retries_are_bounded(self, mock_uniform):
+        """
+        Test that an item rejected more than MAX_RETRIES times fails, as does a chunk with a client error.
+        """
+        client = FakeClient([429], [429], [429])
+        result = BulkIndexer(client, chunk_docs=1, max_retries=2).index(actions(1))
+        self.assertEqual(result.as_dict(), {'indexed': 0, 'failed': 1, 'retried': 2, 'failed_ids': [0]})
+
+        client = FakeClient(api_error(400))
+        result = BulkIndexer(client, chunk_docs=2, max_in_flight=1).index(actions(2))
+        self.assertEqual(result.as_dict(), {'indexed': 0, 'failed': 2, 'retried': 0, 'failed_ids': [0, 1]})
+
+    def test_transient_chunk_failures_are_retried(self, mock_uniform):
+        """
+        Test that chunks failing as a whole on a busy or unreachable cluster are sent again and slow the indexer down.
+        """
+        client = FakeClient(api_error(429), ConnectionError('down'), ConnectionTimeout('slow'), api_error(503))
+        indexer = BulkIndexer(client, chunk_docs=2, max_in_flight=4)
+
+        result = indexer.index(actions(2))
+
+        self.assertEqual(result.as_dict(), {'indexed': 2, 'failed': 0, 'retried': 8, 'failed_ids': []})
+        self.assertEqual(len(client.requests), 5)
+        self.assertEqual(indexer.in_flight, 2)  # Halved down to 1, then one more after the clean chunk
@@ -0,0 +1,127 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.cdr.models import Cdr
+from apps.core.cdr_indices import READ_ALIAS, WRITE_ALIAS, index_name, indices_for, rollover, template_body
+from apps.core.documents import CdrDocument
+
+NOW = datetime(2024, 3, 15, 12, 0, tzinfo=dt_timezone.utc)
+
+
+class CdrIndicesTest(TestCase):
+    def test_indices_of_a_time_range(self):
+        """
+        Test that a search reads the period indices overlapping its range, up to the next period without an end.
+        """
+        start = datetime(2024, 1, 20, tzinfo=dt_timezone.utc)
+        self.assertEqual(indices_for(start, datetime(2024, 2, 1, tzinfo=dt_timezone.utc)), 'cdrs-2024.01,cdrs-2024.02')
+        self.assertEqual(indices_for(start, now=NOW), 'cdrs-2024.01,cdrs-2024.02,cdrs-2024.03,cdrs-2024.04')
+        self.assertEqual(indices_for(datetime(2023, 12, 31, 23, tzinfo=dt_timezone.utc), start),
+                         'cdrs-2023.12,cdrs-2024.01')
+
+    def test_unbounded_and_wide_ranges_read_the_alias(self):
+        """
+        Test that searches without a start or over too many periods go to the read alias.
+        """
+        self.assertEqual(indices_for(None, NOW), READ_ALIAS)
+        self.assertEqual(indices_for(datetime(2020, 1, 1, tzinfo=dt_timezone.utc), NOW), READ_ALIAS)
+
+    @override_settings(CDR_INDICES={'PERIOD': 'day', 'MAX_SEARCHED': 36})
+    def test_daily_indices(self):
+        """
+        Test the names of daily indices.
+        """
+        self.assertEqual(indices_for(datetime(2024, 2, 28, 22, tzinfo=dt_timezone.utc), NOW.replace(day=1)),
+                         'cdrs-2024.02.28,cdrs-2024.02.29,cdrs-2024.03.01')
+
+    def test_documents_are_written_to_their_period(self):
+        """
+        Test that a CDR is indexed in the index of the month of its start time.
+        """
+        cdr = Cdr.objects.create(src_number="09124567890", dest_number="09127654321",
+                                 start_time=datetime(2024, 2, 10, tzinfo=dt_timezone.utc))
+        action = CdrDocument()._prepare_action(cdr, 'index')
+        self.assertEqual(action['_index'], 'cdrs-2024.02')
+        self.assertEqual(action['_index'], index_name(cdr.start_time))
+
+    def test_rollover(self):
+        """
+        Test that the rollover installs the template, creates the missing indices and moves the write alias.
+        """
+        es = MagicMock()
+        es.indices.exists.side_effect = lambda index: index == 'cdrs-2024.03'
+        es.indices.exists_alias.return_value = True
+        es.indices.get_alias.side_effect = lambda index=None, name=None: {index or 'cdrs-2024.02': {}}
+
+        self.assertEqual(rollover(es, now=NOW), ['cdrs-2024.03', 'cdrs-2024.04'])
+
+        template = es.indices.put_index_template.call_args.kwargs
+        self.assertEqual(template['index_patterns'], ['cdrs-*'])
+        self.assertEqual(template['template']['aliases'], {READ_ALIAS: {}})
+        es.indices.create.assert_called_once_with(index='cdrs-2024.04')
+        self.assertEqual(es.indices.update_aliases.call_args.kwargs['actions'], [
+            {'remove': {'index': 'cdrs-2024.02', 'alias': WRITE_ALIAS}},
+            {'add': {'index': 'cdrs-2024.03', 'alias': WRITE_ALIAS, 'is_write_index': True}},
+        ])
+
+    def test_template_carries_the_mapping(self):
+        """
+        Test that the index template holds the document mapping and its analyzers.
+        """
+        template = template_body()['template']
+        self.assertEqual(template['mappings']['properties']['src_number']['type'], 'keyword')
+        self.assertIn('number_prefix', template['settings']['analysis']['analyzer'])
+
+
+class CdrIndexPruningViewTest(TestCase):
+    def setUp(self):
+        """
+        Set up the test environment by creating a test user and obtaining a JWT token.
+        """
+        caches['search'].clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    @override_settings(QUERY_PLANNER={'ENABLED': False})
+    @patch('apps.cdr.views.cdr_search.es.search')
+    def test_search_reads_the_indices_of_its_range(self, mock_es_search):
+        """
+        Test that the search only reads the indices of the periods between start_time and end_time.
+        """
+        mock_es_search.return_value = {"hits": {"hits": [{"_source": {"src_number": "09124567890"}}]}}
+
+        response = self.client.get('/api/cdr/search/', {'start_time': '2024-01-05T00:00:00Z',
+                                                        'end_time': '2024-02-05T00:00:00Z'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_es_search.call_args.kwargs['index'], 'cdrs-2024.01,cdrs-2024.02')
+        self.assertTrue(mock_es_search.call_args.kwargs['ignore_unavailable'])
+
+    @patch('apps.cdr.views.cdr_stats.es.search')
+    def test_stats_of_a_time_range(self, mock_es_search):
+        """
+        Test that the statistics are restricted to the window and read its indices only.
+        """
+        mock_es_search.return_value = {'aggregations': {'avg_duration': {'value': 10.0},
+                                                        'successful_calls': {'doc_count': 1},
+                                                        'failed_calls': {'doc_count': 0}}}
+
+        response = self.client.get('/api/cdr/stats/', {'start_time': '2024-01-05T00:00:00Z',
+                                                       'end_time': '2024-01-06T00:00:00Z'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_es_search.call_args.kwargs['index'], 'cdrs-2024.01')
+        filters = mock_es_search.call_args.kwargs['body']['query']['bool']['filter']
+        self.assertEqual([list(f['range']) for f in filters], [['start_time'], ['end_time']])
+
+        response = self.client.get('/api/cdr/stats/', {'start_time': '2024-01-06T00:00:00Z',
+                                                       'end_time': '2024-01-05T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
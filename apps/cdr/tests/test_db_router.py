@@ -0,0 +1,130 @@
+import time
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import path, reverse
+
+from apps.cdr.models import Cdr
+from apps.core.db_routers import (PRIMARY_UNTIL_SESSION_KEY, ReplicaReadsMixin, ReplicaRouter, pin_to_primary,
+                                  use_replicas)
+
+
+@override_settings(DB_REPLICA_MAX_LAG=5.0, DB_REPLICA_LAG_CHECK_INTERVAL=5.0)
+class ReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        """Set up a router with two replicas whose lag is controlled by the tests."""
+        self.router = ReplicaRouter()
+        self.lag = {'replica_0': 0.5, 'replica_1': 0.5}
+        patch.object(ReplicaRouter, 'replicas', return_value=list(self.lag)).start()
+        patch.object(ReplicaRouter, 'replica_lag', side_effect=lambda alias: self.lag[alias]).start()
+        self.addCleanup(patch.stopall)
+
+    def test_reads_go_to_primary_by_default(self):
+        """Test that reads outside use_replicas(), e.g. in tasks and commands, are sent to the primary."""
+        self.assertEqual(self.router.db_for_read(Cdr), 'default')
+
+    def test_reads_go_to_replicas(self):
+        """Test that reads inside use_replicas() are sent to one of the replicas."""
+        with use_replicas():
+            self.assertIn(self.router.db_for_read(Cdr), self.lag)
+        self.assertEqual(self.router.db_for_read(Cdr), 'default')
+
+    async def test_async_reads_go_to_replicas(self):
+        """Test that the ORM calls an async view runs in a thread follow its routing."""
+        with use_replicas():
+            self.assertIn(await sync_to_async(self.router.db_for_read)(Cdr), self.lag)
+
+    def test_read_only_views_use_replicas(self):
+        """Test that the mixin of the read-only views routes their safe requests only to the replicas."""
+        class View:
+            def dispatch(view, request):
+                return self.router.db_for_read(Cdr)
+
+        class ReadOnlyView(ReplicaReadsMixin, View):
+            pass
+
+        self.assertIn(ReadOnlyView().dispatch(type('Request', (), {'method': 'GET'})), self.lag)
+        self.assertEqual(ReadOnlyView().dispatch(type('Request', (), {'method': 'POST'})), 'default')
+
+    def test_writes_go_to_primary(self):
+        """Test that writes are always sent to the primary."""
+        self.assertEqual(self.router.db_for_write(Cdr), 'default')
+
+    def test_lagging_replica_is_skipped(self):
+        """Test that a replica lagging more than DB_REPLICA_MAX_LAG is not used."""
+        self.lag['replica_0'] = 60
+        with use_replicas():
+            for _ in range(10):
+                self.assertEqual(self.router.db_for_read(Cdr), 'replica_1')
+
+    def test_fallback_to_primary_when_all_replicas_lag(self):
+        """Test that reads go to the primary when no replica is fresh enough."""
+        self.lag.update({'replica_0': 60, 'replica_1': float('inf')})
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(Cdr), 'default')
+
+    def test_pin_to_primary(self):
+        """Test that reads inside pin_to_primary() go to the primary, even inside use_replicas()."""
+        with use_replicas():
+            with pin_to_primary():
+                self.assertEqual(self.router.db_for_read(Cdr), 'default')
+            self.assertIn(self.router.db_for_read(Cdr), self.lag)
+
+    def test_migrations_only_on_primary(self):
+        """Test that migrations are only applied to the primary."""
+        self.assertTrue(self.router.allow_migrate('default', 'cdr'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'cdr'))
+
+"""The admin is only routed in DEBUG, the admin tests use their own URLconf."""
+urlpatterns = [path('admin/', admin.site.urls)]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class ReplicaChangelistTest(TestCase):
+    def setUp(self):
+        """Log in an admin user and record where the change list of the CDRs reads from."""
+        self.client.force_login(User.objects.create_superuser(username='admin', password='password'))
+        self.cdr = Cdr.objects.create(src_number="09124567890", dest_number="09127654321", call_duration=300,
+                                      call_successful=True)
+        self.routed = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            # The test runs in a transaction, which the router would send to the primary.
+            with patch.object(ReplicaRouter, 'replicas', return_value=['replica_0']), \
+                    patch.object(ReplicaRouter, 'replica_lag', return_value=0.0), \
+                    patch.object(connections['default'], 'in_atomic_block', False):
+                alias = db_for_read(router, model, **hints)
+            if model is Cdr:
+                self.routed.append(alias)
+            return 'default'  # The test database has no replica
+
+        patcher = patch.object(ReplicaRouter, 'db_for_read', record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_changelist_reads_from_replicas(self):
+        self.client.get(reverse('admin:cdr_cdr_changelist'))
+
+        self.assertEqual(set(self.routed), {'replica_0'})
+
+    def test_change_form_reads_from_primary(self):
+        self.client.get(reverse('admin:cdr_cdr_change', args=[self.cdr.pk]))
+
+        self.assertEqual(set(self.routed), {'default'})
+
+    @override_settings(DB_REPLICA_MAX_LAG=5.0)
+    def test_changelist_reads_from_primary_after_a_change(self):
+        """Test that an admin user who just saved a CDR sees it in the change list, read from the primary."""
+        self.client.post(reverse('admin:cdr_cdr_delete', args=[self.cdr.pk]), {'post': 'yes'})
+        self.assertAlmostEqual(self.client.session[PRIMARY_UNTIL_SESSION_KEY], time.time() + 5.0, delta=2)
+        self.routed.clear()
+
+        self.client.get(reverse('admin:cdr_cdr_changelist'))
+
+        self.assertEqual(set(self.routed), {'default'})
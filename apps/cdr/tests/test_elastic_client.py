@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+from elastic_transport import ConnectionError, NodeConfig, Transport
+from elasticsearch import AsyncElasticsearch
+from elasticsearch_dsl.connections import connections
+
+from apps.core.elastic import BackoffTransport, client_options, get_async_es, get_es
+from apps.core.os_setting_elastic import es
+
+
+def response(status):
+    return SimpleNamespace(meta=SimpleNamespace(status=status))
+
+
+class ElasticClientTest(SimpleTestCase):
+    def setUp(self):
+        self.transport = BackoffTransport([NodeConfig('http', 'localhost', 9200)], max_retries=3)
+
+    @override_settings(ELASTICSEARCH_DSL={'default': {'hosts': 'http://es1:9200, http://es2:9200', 'max_retries': 5}})
+    def test_client_options_split_hosts(self):
+        """
+        Test that a comma separated ELASTICSEARCH_HOST becomes a list of nodes.
+        """
+        options = client_options()
+
+        self.assertEqual(options['hosts'], ['http://es1:9200', 'http://es2:9200'])
+        self.assertEqual(options['max_retries'], 5)
+
+    def test_one_client_per_process(self):
+        """
+        Test that the views, the documents and django_elasticsearch_dsl share the client of the process.
+        """
+        self.assertIs(get_es(), get_es())
+        self.assertIs(es.transport, get_es().transport)
+        self.assertIs(connections.get_connection().transport, get_es().transport)
+
+    @patch.object(AsyncElasticsearch, 'close', new_callable=AsyncMock)
+    def test_async_client_closed_with_its_loop(self, mock_close):
+        """
+        Test that the async client of an event loop is shared while the loop runs and closed when it shuts down.
+        """
+        async def use_client():
+            self.assertIs(get_async_es(), get_async_es())
+            return mock_close.await_count
+
+        self.assertEqual(async_to_sync(use_client)(), 0)
+        self.assertEqual(mock_close.await_count, 1)
+
+    @patch('apps.core.elastic.time.sleep')
+    @patch.object(Transport, 'perform_request')
+    def test_retry_with_backoff_on_429(self, mock_perform_request, mock_sleep):
+        """
+        Test that 429 responses are retried after a growing wait, and the final response is returned.
+        """
+        mock_perform_request.side_effect = [response(429), response(429), response(200)]
+
+        result = self.transport.perform_request('GET', '/cdrs/_search')
+
+        self.assertEqual(result.meta.status, 200)
+        self.assertEqual(mock_perform_request.call_count, 3)
+        self.assertEqual(mock_perform_request.call_args.kwargs['max_retries'], 0)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch('apps.core.elastic.time.sleep')
+    @patch.object(Transport, 'perform_request')
+    def test_retries_are_bounded(self, mock_perform_request, mock_sleep):
+        """
+        Test that the last error is raised once max_retries is exhausted, and 404s are not retried.
+        """
+        mock_perform_request.side_effect = ConnectionError("refused")
+        with self.assertRaises(ConnectionError):
+            self.transport.perform_request('GET', '/cdrs/_search')
+        self.assertEqual(mock_perform_request.call_count, 4)
+
+        mock_perform_request.reset_mock(side_effect=True)
+        mock_perform_request.return_value = response(404)
+        self.assertEqual(self.transport.perform_request('GET', '/cdrs/_doc/1').meta.status, 404)
+        mock_perform_request.assert_called_once()
@@ -0,0 +1,90 @@
+import json
+from unittest.mock import patch
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.test import TestCase
+from rest_framework import status
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+@patch('apps.cdr.views.cdr_export.es.close_point_in_time')
+@patch('apps.cdr.views.cdr_export.es.open_point_in_time', return_value={"id": "pit-1"})
+@patch('apps.cdr.views.cdr_export.es.search')
+class CDRExportViewTest(TestCase):
+    def setUp(self):
+        """
+        Set up the test environment by creating a test user and obtaining a JWT token.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+
+        refresh = RefreshToken.for_user(self.user)
+        self.access_token = str(refresh.access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.url = reverse('cdr_export')
+
+    def hit(self, cdr_id):
+        return {
+            "_source": {"id": cdr_id, "src_number": "09124567890", "dest_number": "09127654321",
+                        "call_duration": 300, "call_successful": True},
+            "sort": ["2025-01-02T00:00:00", cdr_id],
+        }
+
+    def test_export_ndjson_streams_every_page(self, mock_es_search, mock_open_pit, mock_close_pit):
+        """
+        Test that every page of the point in time is streamed and the point in time is closed at the end.
+        """
+        mock_es_search.side_effect = [
+            {"pit_id": "pit-1", "hits": {"hits": [self.hit(1), self.hit(2)]}},
+            {"pit_id": "pit-1", "hits": {"hits": [self.hit(3)]}},
+        ]
+
+        with patch('apps.cdr.views.cdr_export.CDRExportView.EXPORT_PAGE_SIZE', 2):
+            response = self.client.get(self.url, {'src_number': '09124567890'})
+            lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([json.loads(line)['id'] for line in lines], [1, 2, 3])
+        self.assertEqual(mock_es_search.call_args.kwargs['body']['search_after'], ["2025-01-02T00:00:00", 2])
+        mock_close_pit.assert_called_once_with(id='pit-1')
+
+    def test_export_csv(self, mock_es_search, mock_open_pit, mock_close_pit):
+        """
+        Test that the CSV export starts with a header row, even when nothing matches.
+        """
+        mock_es_search.return_value = {"pit_id": "pit-1", "hits": {"hits": [self.hit(1)]}}
+
+        response = self.client.get(self.url, {'src_number': '09124567890', 'export_format': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertTrue(lines[0].startswith('id,src_number,dest_number'))
+        self.assertTrue(lines[1].startswith('1,09124567890,09127654321,300'))
+
+        mock_es_search.return_value = {"pit_id": "pit-1", "hits": {"hits": []}}
+        response = self.client.get(self.url, {'src_number': '09124567890', 'export_format': 'csv'})
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 1)
+
+    def test_export_invalid_format(self, mock_es_search, mock_open_pit, mock_close_pit):
+        """
+        Test that an unknown export format is rejected before Elasticsearch is queried.
+        """
+        response = self.client.get(self.url, {'src_number': '09124567890', 'export_format': 'xml'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_open_pit.assert_not_called()
+
+    def test_export_elasticsearch_error(self, mock_es_search, mock_open_pit, mock_close_pit):
+        """
+        Test that an Elasticsearch failure on the first page returns an error instead of an empty stream.
+        """
+        mock_es_search.side_effect = Exception("Elasticsearch is down")
+
+        response = self.client.get(self.url, {'src_number': '09124567890'})
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.data['error'], "Elasticsearch is down")
+        mock_close_pit.assert_called_once_with(id='pit-1')
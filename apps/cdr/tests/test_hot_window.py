@@ -0,0 +1,85 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from apps.core.hot_window import HotWindow, np
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestHotWindow(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a small hot window and a fixed reference time."""
+        self.now = datetime(2025, 1, 2, 12, 0, tzinfo=timezone.utc)
+        self.window = HotWindow(minutes=10, capacity=4)
+        self.window.ready = True
+
+    def _row(self, cdr_id, minutes_ago, src_number="09121234567", call_successful=True, call_duration=120):
+        start_time = self.now - timedelta(minutes=minutes_ago)
+        return (cdr_id, src_number, "09129876543", call_duration, start_time,
+                start_time + timedelta(seconds=120), start_time, call_successful)
+
+    def test_append_skips_rows_outside_window(self):
+        """Test that rows older than the window are not stored but still advance the last id."""
+        stored = self.window.append([self._row(1, 30), self._row(2, 1)], now=self.now)
+
+        self.assertEqual(stored, 1)
+        self.assertEqual(len(self.window), 1)
+        self.assertEqual(self.window.last_id, 2)
+
+    def test_late_rows_within_margin(self):
+        """Test that rows read again are skipped, and that a lower id committed late is still appended."""
+        window = HotWindow(minutes=10, capacity=10, id_margin=5)
+        window.append([self._row(1, 1), self._row(3, 1)], now=self.now)
+
+        stored = window.append([self._row(1, 1), self._row(2, 1), self._row(3, 1), self._row(4, 1)], now=self.now)
+
+        self.assertEqual(stored, 2)
+        self.assertEqual(sorted(cdr['id'] for cdr in window.search(now=self.now)), [1, 2, 3, 4])
+
+    def test_search_filters(self):
+        """Test vectorized filtering on numbers and success flag."""
+        self.window.append([
+            self._row(1, 1),
+            self._row(2, 2, src_number="09120000001"),
+            self._row(3, 3, call_successful=False),
+        ], now=self.now)
+
+        results = self.window.search(src_number="09121234567", call_successful=True, now=self.now)
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['src_number'], "09121234567")
+        self.assertEqual(results[0]['dest_number'], "09129876543")
+        self.assertEqual(results[0]['call_duration'], 120)
+        self.assertTrue(results[0]['call_successful'])
+
+    def test_search_time_range(self):
+        """Test the start_time/end_time filters."""
+        self.window.append([self._row(1, 1), self._row(2, 5)], now=self.now)
+
+        results = self.window.search(start_time=self.now - timedelta(minutes=3), now=self.now)
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['start_time'], (self.now - timedelta(minutes=1)).isoformat())
+
+    def test_null_call_duration(self):
+        """Test that a null call duration round trips."""
+        self.window.append([self._row(1, 1, call_duration=None)], now=self.now)
+
+        self.assertIsNone(self.window.search(now=self.now)[0]['call_duration'])
+
+    def test_ring_buffer_eviction(self):
+        """Test that overwriting old rows shrinks the covered time range."""
+        self.window.append([self._row(i, 9 - i) for i in range(1, 7)], now=self.now)
+
+        self.assertEqual(len(self.window), 4)
+        self.assertFalse(self.window.covers(self.now - timedelta(minutes=8), now=self.now))
+        self.assertTrue(self.window.covers(self.now - timedelta(minutes=6), now=self.now))
+
+    def test_covers(self):
+        """Test coverage checks for queries without a lower bound or outside the window."""
+        self.assertFalse(self.window.covers(None, now=self.now))
+        self.assertFalse(self.window.covers(self.now - timedelta(minutes=20), now=self.now))
+        self.assertTrue(self.window.covers(self.now - timedelta(minutes=5), now=self.now))
+
+        self.window.ready = False
+        self.assertFalse(self.window.covers(self.now - timedelta(minutes=5), now=self.now))
@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from benchmarks import microbench
+
+
+class MicrobenchTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = os.path.join(directory.name, 'baseline.json')
+
+    def bench(self, *args):
+        out = StringIO()
+        call_command('bench', *args, '--baseline', self.baseline, '--repeat', '1', '--min-time', '0.001',
+                     '--warmup', '0', stdout=out)
+        return out.getvalue()
+
+    def test_compare(self):
+        baseline = {'cases': {'fast': {'best_us': 1.0}, 'slow': {'best_us': 1.0}}}
+        results = {'fast': {'best_us': 1.1}, 'slow': {'best_us': 1.5}, 'new': {'best_us': 2.0}}
+
+        rows = microbench.compare(results, baseline, threshold=0.2)
+
+        self.assertEqual([(name, regressed) for name, *_, regressed in rows],
+                         [('fast', False), ('slow', True), ('new', False)])
+
+    def test_every_case_runs_without_services(self):
+        """
+        Test that every case runs without RabbitMQ, PostgreSQL nor Elasticsearch and is saved to the baseline.
+        """
+        self.bench('--save')
+
+        with open(self.baseline) as baseline_file:
+            self.assertEqual(set(json.load(baseline_file)['cases']), set(microbench.CASES))
+
+    def test_regression_fails(self):
+        with open(self.baseline, 'w') as baseline_file:
+            json.dump({'cases': {'producer_get_shard_id': {'best_us': 1e-6}}}, baseline_file)
+
+        with self.assertRaisesMessage(CommandError, 'producer_get_shard_id'):
+            self.bench('producer_get_shard_id')
+
+    def test_missing_baseline_fails(self):
+        """
+        Test that the gate fails without a baseline, or with one that does not have every case, instead of passing.
+        """
+        with self.assertRaisesMessage(CommandError, 'No baseline'):
+            self.bench('producer_get_shard_id')
+
+        with open(self.baseline, 'w') as baseline_file:
+            json.dump({'cases': {'generate_cdr': {'best_us': 1e6}}}, baseline_file)
+        with self.assertRaisesMessage(CommandError, 'Not in the baseline: producer_get_shard_id'):
+            self.bench('generate_cdr', 'producer_get_shard_id')
+
+    def test_default_baseline_is_next_to_the_module(self):
+        self.assertEqual(os.path.dirname(microbench.BASELINE_PATH), os.path.dirname(microbench.__file__))
+
+    def test_unknown_case(self):
+        with self.assertRaisesMessage(CommandError, 'Unknown cases: nope.'):
+            self.bench('nope')
@@ -2,6 +2,8 @@ from django.test import TestCase
 from django.core.exceptions import ValidationError
 from django.db.utils import IntegrityError
 from django.utils import timezone
+from django.contrib import admin
+from apps.cdr.admin import CdrAdmin
 from apps.cdr.models import Cdr
 
 class CdrModelTest(TestCase):
@@ -62,7 +64,7 @@ class CdrModelTest(TestCase):
 
     def test_create_cdr_with_duplicate_src_number(self):
         """
-        Test creating a CDR with duplicate source number (should raise an IntegrityError).
+        Test creating a CDR with duplicate source number and another destination (allowed, only the pair is unique).
         """
         Cdr.objects.create(
             src_number=self.valid_src_number,
@@ -74,20 +76,21 @@ class CdrModelTest(TestCase):
             call_successful=True
         )
 
-        with self.assertRaises(IntegrityError):
-            Cdr.objects.create(
-                src_number=self.valid_src_number,
-                dest_number="09121234569",
-                call_duration=self.valid_call_duration,
-                timestamp=self.timestamp,
-                start_time=self.start_time,
-                end_time=self.end_time,
-                call_successful=False
-            )
+        Cdr.objects.create(
+            src_number=self.valid_src_number,
+            dest_number="09121234569",
+            call_duration=self.valid_call_duration,
+            timestamp=self.timestamp,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            call_successful=False
+        )
+
+        self.assertEqual(Cdr.objects.filter(src_number=self.valid_src_number).count(), 2)
 
-    def test_create_cdr_with_duplicate_dest_number(self):
+    def test_create_cdr_with_duplicate_src_dest_pair(self):
         """
-        Test creating a CDR with duplicate destination number (should raise an IntegrityError).
+        Test creating a CDR with duplicate source and destination numbers (should raise an IntegrityError).
         """
         Cdr.objects.create(
             src_number=self.valid_src_number,
@@ -101,7 +104,7 @@ class CdrModelTest(TestCase):
 
         with self.assertRaises(IntegrityError):
             Cdr.objects.create(
-                src_number="09121234570",
+                src_number=self.valid_src_number,
                 dest_number=self.valid_dest_number,
                 call_duration=self.valid_call_duration,
                 timestamp=self.timestamp,
@@ -110,6 +113,24 @@ class CdrModelTest(TestCase):
                 call_successful=False
             )
 
+    def test_phone_numbers_round_trip(self):
+        """
+        Test that phone numbers stored as integers are read back as zero padded strings.
+        """
+        cdr = Cdr.objects.create(
+            src_number=self.valid_src_number,
+            dest_number=self.valid_dest_number,
+            call_duration=self.valid_call_duration,
+            timestamp=self.timestamp,
+            start_time=self.start_time,
+            end_time=self.end_time,
+        )
+
+        cdr.refresh_from_db()
+        self.assertEqual(cdr.src_number, self.valid_src_number)
+        self.assertEqual(cdr.dest_number, self.valid_dest_number)
+        self.assertEqual(Cdr.objects.filter(dest_number=self.valid_dest_number).get().pk, cdr.pk)
+
     def test_string_representation(self):
         """
         Test the string representation of the CDR model.
@@ -195,7 +216,7 @@ class CdrModelTest(TestCase):
 
     def test_indexing_on_fields(self):
         """
-        Test that the database indexes on src_number, dest_number, and timestamp are created.
+        Test that the covering unique key on src_number, dest_number (including timestamp) is declared.
         """
         cdr = Cdr(
             src_number=self.valid_src_number,
@@ -208,11 +229,23 @@ class CdrModelTest(TestCase):
         )
         cdr.save()
 
-        indexes = Cdr._meta.indexes
-        index_fields = [index.fields for index in indexes]
+        constraints = Cdr._meta.constraints
 
-        # Check if there's an index on 'src_number', 'dest_number', and 'timestamp'
+        # Check if there's a key on 'src_number', 'dest_number' that also carries 'timestamp'
         self.assertTrue(any(
-            set(['src_number', 'dest_number', 'timestamp']).issubset(fields)
-            for fields in index_fields
+            set(['src_number', 'dest_number']).issubset(constraint.fields) and 'timestamp' in constraint.include
+            for constraint in constraints
         ))
+
+    def test_admin_search_ignores_non_numeric_terms(self):
+        """
+        Test that searching the admin for a name or a partial text matches nothing instead of failing.
+        """
+        cdr = Cdr.objects.create(src_number=self.valid_src_number, dest_number=self.valid_dest_number)
+        cdr_admin = CdrAdmin(Cdr, admin.site)
+
+        queryset, _ = cdr_admin.get_search_results(None, Cdr.objects.all(), 'abc')
+        self.assertFalse(queryset.exists())
+
+        queryset, _ = cdr_admin.get_search_results(None, Cdr.objects.all(), self.valid_dest_number)
+        self.assertEqual(list(queryset), [cdr])
@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from apps.core.middlewares import ProfileMiddleware
+from utility.profiler import Sampler
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class SamplerTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_samples_the_profiled_thread(self):
+        """
+        Test that the function a thread spends its time in is in the sampled stacks, and only that thread is sampled.
+        """
+        sampler = Sampler(0.001, [threading.get_ident()]).start()
+        spin(0.1)
+        sampler.stop()
+
+        self.assertGreater(sampler.samples, 0)
+        functions = [{function[0] for function in stack} for stack in sampler.stacks]
+        self.assertTrue(all('test_samples_the_profiled_thread' in stack for stack in functions))
+        self.assertGreater(sum(count for stack, count in sampler.stacks.items() if stack[-1][0] == 'spin'), 0)
+        self.assertFalse(sampler.running)
+
+    def test_output_formats(self):
+        """
+        Test that profiles are written as speedscope JSON or as folded stacks, by file extension.
+        """
+        sampler = Sampler(0.01)
+        sampler.stacks[(('main', 'app.py', 1), ('spin', 'app.py', 10))] = 3
+        sampler.stacks[(('main', 'app.py', 1),)] = 1
+
+        speedscope = json.load(open(sampler.write(os.path.join(self.directory.name, 'p.speedscope.json'), 'test')))
+        folded = open(sampler.write(os.path.join(self.directory.name, 'p.folded'))).read()
+
+        profile = speedscope['profiles'][0]
+        self.assertEqual([frame['name'] for frame in speedscope['shared']['frames']], ['main', 'spin'])
+        self.assertEqual(profile['samples'], [[0, 1], [0]])
+        self.assertEqual(profile['weights'], [0.03, 0.01])
+        self.assertEqual(folded, 'main (app.py:1);spin (app.py:10) 3\nmain (app.py:1) 1\n')
+
+
+class ProfileMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_not_loaded_without_token(self):
+        with override_settings(PROFILER={'TOKEN': ''}):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfileMiddleware(lambda request: None)
+
+    def test_profile_requested_with_the_token(self):
+        """
+        Test that only requests carrying the token are profiled, into the profiles directory.
+        """
+        with override_settings(PROFILER={'TOKEN': 'secret', 'DIR': self.directory.name}):
+            profiled = self.client.get('/api/cdr/stats/?start_time=invalid', HTTP_X_PROFILE='secret')
+            wrong_token = self.client.get('/api/cdr/stats/?start_time=invalid', HTTP_X_PROFILE='guess')
+
+        self.assertEqual(profiled.status_code, 400)
+        self.assertEqual(os.listdir(self.directory.name), [profiled['X-Profile-File']])
+        self.assertTrue(profiled['X-Profile-File'].endswith('.speedscope.json'))
+        self.assertNotIn('X-Profile-File', wrong_token)
+
+    def test_async_profile_samples_the_sync_view_threads(self):
+        """
+        Test that under ASGI the profile holds the stacks of the sync views, run by asgiref off the event loop.
+        """
+        def view(request):
+            spin(0.05)
+            return HttpResponse()
+
+        async def get_response(request):
+            return await sync_to_async(view)(request)
+
+        with override_settings(PROFILER={'TOKEN': 'secret', 'DIR': self.directory.name, 'FORMAT': 'folded'}):
+            middleware = ProfileMiddleware(get_response)
+            response = async_to_sync(middleware)(RequestFactory().get('/', HTTP_X_PROFILE='secret'))
+
+        with open(os.path.join(self.directory.name, response['X-Profile-File'])) as profile_file:
+            self.assertIn('spin (', profile_file.read())
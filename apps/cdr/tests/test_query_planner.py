@@ -0,0 +1,111 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+from elastic_transport import ConnectionError
+from elasticsearch import ApiError
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.cdr.models import Cdr
+from apps.core.query_planner import QueryPlanner
+
+
+@patch('apps.cdr.views.cdr_search.es.search')
+class QueryPlannerTest(TestCase):
+    def setUp(self):
+        """
+        Set up a test user with a JWT token, one CDR in the database and a fresh query planner.
+        """
+        caches['search'].clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.url = reverse('cdr_search')
+
+        self.cdr = Cdr.objects.create(src_number="09124567890", dest_number="09127654321", call_duration=300)
+        self.planner = QueryPlanner()
+        patcher = patch('apps.cdr.views.cdr_search.planner', self.planner)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def es_max_id(self, max_id):
+        return {"aggregations": {"max_id": {"value": max_id}}, "hits": {"hits": []}}
+
+    def test_pair_lookup_uses_postgres(self, mock_es_search):
+        """
+        Test that a src/dest pair is answered by PostgreSQL, with the same shape as an Elasticsearch hit.
+        """
+        mock_es_search.return_value = self.es_max_id(self.cdr.id)
+
+        response = self.client.get(self.url, {'src_number': '09124567890', 'dest_number': '09127654321'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Search-Backend'], 'postgres')
+        self.assertEqual(response.data[0]['id'], self.cdr.id)
+        self.assertEqual(response.data[0]['src_number'], '09124567890')
+        self.assertIsInstance(response.data[0]['start_time'], str)
+        self.assertEqual(mock_es_search.call_count, 1)  # Only the lag measurement
+
+    def test_lagging_index_routes_src_lookups_to_postgres(self, mock_es_search):
+        """
+        Test that src_number searches go to PostgreSQL once Elasticsearch lags, and to Elasticsearch otherwise.
+        """
+        mock_es_search.return_value = self.es_max_id(self.cdr.id)
+        response = self.client.get(self.url, {'src_number': '09124567890'})
+        self.assertEqual(response['X-Search-Backend'], 'elasticsearch')
+
+        self.planner._probes.appendleft((time.monotonic() - 60, self.cdr.id))
+        self.planner._checked_at = None
+        mock_es_search.return_value = self.es_max_id(self.cdr.id - 1)
+
+        response = self.client.get(self.url, {'src_number': '09124567890'})
+
+        self.assertEqual(response['X-Search-Backend'], 'postgres')
+        self.assertGreater(self.planner.lag, 50)
+
+    def test_elasticsearch_down_uses_postgres(self, mock_es_search):
+        """
+        Test the degraded mode: searches are answered by PostgreSQL when Elasticsearch cannot be reached.
+        """
+        mock_es_search.side_effect = ConnectionError("Connection refused")
+
+        response = self.client.get(self.url, {'dest_number': '09127654321'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Search-Backend'], 'postgres')
+        self.assertFalse(self.planner.available)
+
+    def test_failed_search_falls_back_to_postgres(self, mock_es_search):
+        """
+        Test that a search Elasticsearch fails to answer is retried on PostgreSQL.
+        """
+        mock_es_search.side_effect = [self.es_max_id(self.cdr.id), ConnectionError("Connection reset")]
+
+        response = self.client.get(self.url, {'dest_number': '09127654321', 'fields': 'id,call_duration'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Search-Backend'], 'postgres')
+        self.assertEqual(response.data, [{'id': self.cdr.id, 'call_duration': 300}])
+
+    def test_overloaded_elasticsearch_falls_back_to_postgres(self, mock_es_search):
+        """
+        Test that a search rejected with 429 after the client retries is answered by PostgreSQL, and that an
+        invalid query is an error rather than a reason to stop using Elasticsearch.
+        """
+        def api_error(status_code):
+            return ApiError('rejected', meta=type('Meta', (), {'status': status_code})(), body={})
+
+        mock_es_search.side_effect = [self.es_max_id(self.cdr.id), api_error(429)]
+        response = self.client.get(self.url, {'dest_number': '09127654321'})
+        self.assertEqual(response['X-Search-Backend'], 'postgres')
+
+        self.planner.available, self.planner._checked_at = True, None
+        mock_es_search.side_effect = [self.es_max_id(self.cdr.id), api_error(400)]
+        response = self.client.get(self.url, {'dest_number': '09127654321', 'call_duration': 1})
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertTrue(self.planner.available)
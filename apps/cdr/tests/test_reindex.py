@@ -0,0 +1,120 @@
+import os
+import tempfile
+from io import StringIO
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from apps.cdr.models import Cdr, ReindexChange
+from apps.core.cdr_indices import READ_ALIAS, WRITE_ALIAS
+from apps.core.management.commands.reindex_cdrs import Command
+from apps.core.reindex import (REINDEX_ALIAS, ReindexState, index_slice, periods_between, split_range,
+                               swap_aliases)
+
+
+class ReindexTest(TestCase):
+    def test_split_range(self):
+        """
+        Test that the primary key range is covered by contiguous slices.
+        """
+        self.assertEqual(split_range(1, 250, 100), [(1, 101), (101, 201), (201, 251)])
+        self.assertEqual(split_range(7, 7, 100), [(7, 8)])
+
+    def test_periods_between(self):
+        """
+        Test that every month between the first and the last CDR gets an index.
+        """
+        periods = periods_between(datetime(2023, 11, 20, tzinfo=dt_timezone.utc),
+                                  datetime(2024, 1, 3, tzinfo=dt_timezone.utc))
+        self.assertEqual([period.strftime('%Y.%m') for period in periods], ['2023.11', '2023.12', '2024.01'])
+
+    def test_state_resumes_pending_slices(self):
+        """
+        Test that a saved state only gives back the slices not indexed yet.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'reindex.json')
+            started_at = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+            state = ReindexState(path, '20240101000000', started_at, 250, split_range(1, 250, 100),
+                                 {'cdrs-2024.01': 'x'})
+            state.done.add(101)
+            state.save()
+
+            resumed = ReindexState.load(path)
+            self.assertEqual((resumed.generation, resumed.started_at), ('20240101000000', started_at))
+            self.assertEqual(resumed.pending(), [(1, 101), (201, 251)])
+
+    @patch('apps.core.reindex.BulkIndexer')
+    def test_index_slice(self, mock_bulk_indexer):
+        """
+        Test that a slice sends its CDRs, and only them, to the indices of the generation.
+        """
+        cdrs = [Cdr.objects.create(src_number=f"0912456789{i}", dest_number="09127654321",
+                                   start_time=datetime(2024, 1 + i % 2, 10, tzinfo=dt_timezone.utc)) for i in range(4)]
+        sent = []
+
+        def index(actions):
+            sent.extend(actions)
+            return MagicMock(indexed=len(sent), failed=0)
+
+        mock_bulk_indexer.return_value.index.side_effect = index
+        low, high, indexed, failed = index_slice(('20240301000000', cdrs[1].id, cdrs[3].id, 500))
+
+        self.assertEqual((indexed, failed), (2, 0))
+        self.assertEqual(mock_bulk_indexer.call_args.kwargs['chunk_docs'], 500)
+        self.assertEqual([action['_id'] for action in sent], [cdrs[1].id, cdrs[2].id])
+        self.assertEqual([action['_index'] for action in sent],
+                         ['cdrs_20240301000000-2024.02', 'cdrs_20240301000000-2024.01'])
+
+    @patch('apps.core.reindex.es')
+    def test_swap_aliases(self, mock_es):
+        """
+        Test that the aliases move to the new indices in one update, replacing concrete indices named like a period.
+        """
+        mock_es.indices.exists.return_value = True
+        mock_es.indices.get_alias.return_value = {
+            'cdrs-2024.01': {'aliases': {READ_ALIAS: {}}},
+            'cdrs_20230101000000-2023.12': {'aliases': {READ_ALIAS: {}, 'cdrs-2023.12': {}}},
+        }
+        indices = {'cdrs-2024.01': 'cdrs_20240301000000-2024.01', 'cdrs-2024.02': 'cdrs_20240301000000-2024.02'}
+
+        stale = swap_aliases(indices, 'cdrs-2024.02')
+
+        self.assertEqual(stale, ['cdrs_20230101000000-2023.12'])
+        mock_es.indices.update_aliases.assert_called_once()
+        actions = mock_es.indices.update_aliases.call_args.kwargs['actions']
+        self.assertEqual(actions[:3], [
+            {'remove_index': {'index': 'cdrs-2024.01'}},
+            {'remove': {'index': 'cdrs_20230101000000-2023.12', 'alias': READ_ALIAS}},
+            {'remove': {'index': 'cdrs_20230101000000-2023.12', 'alias': 'cdrs-2023.12'}},
+        ])
+        self.assertIn({'add': {'index': 'cdrs_20240301000000-2024.01', 'alias': 'cdrs-2024.01',
+                               'is_write_index': True}}, actions)
+        self.assertEqual(actions[-2:], [
+            {'add': {'index': 'cdrs_20240301000000-2024.02', 'alias': WRITE_ALIAS, 'is_write_index': True}},
+            {'remove': {'index': '*', 'alias': REINDEX_ALIAS}},
+        ])
+
+    @patch('apps.core.documents.CdrDocument.update')
+    @patch('apps.core.management.commands.reindex_cdrs.es')
+    def test_catch_up(self, mock_es, mock_update):
+        """
+        Test that the CDRs inserted, saved or deleted since the reindex started are indexed again or deleted
+        from the indices now served, and that their changes are forgotten.
+        """
+        started_at = datetime(2024, 3, 1, tzinfo=dt_timezone.utc)
+        streamed, updated, inserted = [Cdr.objects.create(src_number=f"0912456789{i}", dest_number="09127654321")
+                                       for i in range(3)]
+        ReindexChange.objects.create(cdr_id=updated.id, changed_at=started_at)
+        ReindexChange.objects.create(cdr_id=998, changed_at=started_at)
+        state = ReindexState('reindex.json', '20240301000000', started_at, updated.id, [], {})
+        sent = []
+        mock_update.side_effect = lambda cdrs: sent.extend(cdr.id for cdr in cdrs)
+
+        Command(stdout=StringIO()).catch_up(state)
+
+        self.assertEqual(sent, [updated.id, inserted.id])
+        self.assertEqual(mock_es.delete_by_query.call_args.kwargs['query'], {'ids': {'values': [998]}})
+        self.assertEqual(mock_es.delete_by_query.call_args.kwargs['index'], READ_ALIAS)
+        self.assertFalse(ReindexChange.objects.exists())
@@ -0,0 +1,34 @@
+import json
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy as _
+from rest_framework.renderers import JSONRenderer
+
+from apps.core.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    def test_same_output_as_json_renderer(self):
+        """
+        Test that the fast renderer produces the same JSON as DRF's renderer, including types orjson does not know.
+        """
+        data = {
+            "results": [{"src_number": "09124567890", "call_duration": 300, "call_successful": True,
+                         "start_time": datetime(2025, 1, 2, 12, 30, 15, 123456, tzinfo=dt_timezone.utc)}],
+            "ratio": Decimal("0.5"),
+            "message": _("No results found."),
+            "next": None,
+        }
+
+        fast, default = FastJSONRenderer().render(data), JSONRenderer().render(data)
+
+        self.assertEqual(json.loads(fast), json.loads(default))
+        self.assertIn(b'"2025-01-02T12:30:15.123456Z"', fast)
+
+    def test_indent_is_rendered_by_json_renderer(self):
+        rendered = FastJSONRenderer().render({"a": 1}, 'application/json; indent=2')
+
+        self.assertEqual(rendered, JSONRenderer().render({"a": 1}, 'application/json; indent=2'))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from elastic_transport import NodeConfig, Transport
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.core.elastic import BackoffTransport
+from apps.core.server_timing import ServerTiming, start_timing, stop_timing, timed
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'search': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def phases(header):
+    return [entry.split(';')[0] for entry in header.split(', ')]
+
+
+@override_settings(CACHES=CACHES, REQUEST_TIMING={'HEADER': True, 'LOG': True})
+class RequestTimingTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.start_request_log = patch('apps.core.middlewares.start_request_log').start()
+        self.addCleanup(patch.stopall)
+
+    def test_header_sums_phases_in_order(self):
+        """
+        Test that the header lists the phases in request order, a phase timed twice once, and the total last.
+        """
+        timing = ServerTiming()
+        timing.add('es', 2.0)
+        timing.add('auth', 1.25)
+        timing.add('es', 3.0)
+
+        self.assertEqual(timing.header(total=10), 'auth;dur=1.2, es;dur=5.0, total;dur=10.0')
+
+    def test_timed_outside_of_a_request(self):
+        with timed('es'):
+            pass
+
+        timing, token = start_timing()
+        with timed('es'):
+            pass
+        stop_timing(token)
+
+        self.assertEqual(list(timing.phases), ['es'])
+
+    @patch('apps.cdr.views.cdr_stats.es.search')
+    def test_server_timing_header(self, mock_es_search):
+        """
+        Test that a response carries the time of each phase of the request, and the request is logged.
+        """
+        mock_es_search.return_value = {'aggregations': {'avg_duration': {'value': 1.0},
+                                                        'successful_calls': {'doc_count': 1},
+                                                        'failed_calls': {'doc_count': 0}}}
+        with self.assertLogs('apps.requests', level='INFO') as logs:
+            response = self.client.get('/api/cdr/stats/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(phases(response['Server-Timing']), ['auth', 'throttle', 'validation', 'render', 'total'])
+        self.assertIn('GET /api/cdr/stats/ 200', logs.output[0])
+        self.start_request_log.assert_called_once()
+
+    def test_errors_keep_their_status(self):
+        """
+        Test that an invalid request gets its 400 response (not a redirect), logged as a warning.
+        """
+        with self.assertLogs('apps.requests', level='WARNING') as logs:
+            response = self.client.get('/api/cdr/stats/?start_time=invalid')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Server-Timing', response)
+        self.assertIn('GET /api/cdr/stats/ 400', logs.output[0])
+
+    @override_settings(REQUEST_TIMING={'HEADER': False, 'LOG': False})
+    def test_disabled(self):
+        response = self.client.get('/api/cdr/stats/?start_time=invalid')
+
+        self.assertNotIn('Server-Timing', response)
+        self.start_request_log.assert_not_called()
+
+    @override_settings(REQUEST_TIMING={})
+    def test_header_is_opt_in(self):
+        response = self.client.get('/api/cdr/stats/?start_time=invalid')
+
+        self.assertNotIn('Server-Timing', response)
+
+    @patch.object(Transport, 'perform_request')
+    def test_elasticsearch_phase(self, mock_perform_request):
+        """
+        Test that the requests sent to Elasticsearch are timed as the `es` phase.
+        """
+        mock_perform_request.return_value = SimpleNamespace(meta=SimpleNamespace(status=200))
+        transport = BackoffTransport([NodeConfig('http', 'localhost', 9200)])
+
+        timing, token = start_timing()
+        transport.perform_request('GET', '/cdrs/_search')
+        transport.perform_request('GET', '/cdrs/_search')
+        stop_timing(token)
+
+        self.assertEqual(list(timing.phases), ['es'])
@@ -0,0 +1,87 @@
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest.mock import Mock, patch
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from apps.cdr.models import Cdr
+from apps.cdr.tasks.tasks_indexing import index_cdrs
+from apps.core.bulk_indexer import BulkResult
+from apps.core.search_cache import GLOBAL_WATERMARK, cached_search, day_watermark, watermark_keys
+
+
+class SearchCacheTest(TestCase):
+    def setUp(self):
+        """
+        Start every test with an empty search cache.
+        """
+        caches['search'].clear()
+        self.query = {"query": {"bool": {"filter": [{"term": {"src_number": "09124567890"}}]}}}
+
+    def test_repeated_query_is_served_from_cache(self):
+        """
+        Test that the search only runs once for the same query.
+        """
+        search = Mock(return_value=[{"src_number": "09124567890"}])
+
+        first = cached_search('test', self.query, search)
+        second = cached_search('test', {**self.query}, search)
+
+        self.assertEqual(first, second)
+        search.assert_called_once()
+
+    def test_empty_results_are_cached(self):
+        """
+        Test that an empty result is a cache hit and not mistaken for a miss.
+        """
+        search = Mock(return_value=[])
+
+        cached_search('test', self.query, search)
+        cached_search('test', self.query, search)
+
+        search.assert_called_once()
+
+    @patch('apps.cdr.tasks.tasks_indexing.record_changes', Mock())
+    @patch('apps.core.documents.CdrDocument.bulk_index', return_value=BulkResult())
+    def test_ingest_invalidates_cached_results(self, mock_bulk_index):
+        """
+        Test that indexing a CDR advances the watermark, and results are not cached during the grace period.
+        """
+        search = Mock(return_value=[])
+        cached_search('test', self.query, search, now=time.time() - 60)
+
+        cdr = Cdr.objects.create(src_number="09124567890", dest_number="09127654321", call_successful=True)
+        self.assertEqual(caches['search'].get(GLOBAL_WATERMARK), None)  # Not searchable until indexed
+        index_cdrs([cdr.id])
+        cached_search('test', self.query, search)
+        cached_search('test', self.query, search)
+        self.assertEqual(search.call_count, 3)
+
+        cached_search('test', self.query, search, now=time.time() + 5)
+        cached_search('test', self.query, search, now=time.time() + 5)
+        self.assertEqual(search.call_count, 4)
+
+    def test_watermark_keys(self):
+        """
+        Test that bounded windows depend on their start_time days and open windows on the global watermark.
+        """
+        start = datetime(2025, 1, 1, 23, tzinfo=dt_timezone.utc)
+
+        self.assertEqual(watermark_keys(start, None), [GLOBAL_WATERMARK])
+        self.assertEqual(watermark_keys(start, start + timedelta(hours=2)),
+                         [day_watermark(start.date()), day_watermark(start.date() + timedelta(days=1))])
+        self.assertEqual(watermark_keys(start, start + timedelta(days=90)), [GLOBAL_WATERMARK])
+
+    def test_closed_window_uses_closed_timeout(self):
+        """
+        Test that windows ending in the past are stored with the longer timeout.
+        """
+        start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        with override_settings(SEARCH_CACHE={'TIMEOUT': 60, 'CLOSED_TIMEOUT': 3600}), \
+                patch('apps.core.search_cache.get_or_create') as mock_get_or_create:
+            cached_search('test', self.query, list, start, start + timedelta(hours=1))
+            cached_search('test', self.query, list, start, None)
+
+        self.assertEqual(mock_get_or_create.call_args_list[0].kwargs['timeout'], 3600)
+        self.assertEqual(mock_get_or_create.call_args_list[1].kwargs['timeout'], 60)
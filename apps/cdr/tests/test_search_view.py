@@ -1,19 +1,23 @@
 from unittest.mock import patch
 from django.urls import reverse
 from rest_framework.test import APIClient
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import caches
 from rest_framework import status
 from apps.cdr.models import Cdr
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
 
 
+# These tests cover the Elasticsearch path, the query planner has its own tests.
+@override_settings(QUERY_PLANNER={'ENABLED': False})
 class CDRSearchViewTest(TestCase):
     def setUp(self):
         """
         Set up the test environment by creating a test user, obtaining a JWT token,
         and creating some CDR records in the database for testing.
         """
+        caches['search'].clear()
         self.client = APIClient()
         self.user = User.objects.create_user(username='testuser', password='password')
 
@@ -94,3 +98,137 @@ class CDRSearchViewTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
         self.assertIn("error", response.data)
         self.assertEqual(response.data['error'], "Elasticsearch is down")
+
+    @patch('apps.cdr.views.cdr_search.es.close_point_in_time')
+    @patch('apps.cdr.views.cdr_search.es.open_point_in_time')
+    @patch('apps.cdr.views.cdr_search.es.search')
+    def test_cdr_search_pagination(self, mock_es_search, mock_open_pit, mock_close_pit):
+        """
+        Test cursor pagination: the first page returns a `next` token, the last page closes the point in time.
+        """
+        mock_open_pit.return_value = {"id": "pit-1"}
+        hit = {"_source": {"src_number": "09124567890"}, "sort": ["2025-01-02T00:00:00", 1]}
+        mock_es_search.return_value = {"pit_id": "pit-1", "hits": {"hits": [hit, {**hit, "sort": ["2025-01-02", 2]}]}}
+
+        params = {'src_number': '09124567890', 'page_size': 2}
+        response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        body = mock_es_search.call_args.kwargs['body']
+        self.assertEqual(body['size'], 2)
+        self.assertEqual(body['pit']['id'], 'pit-1')
+        self.assertNotIn('search_after', body)
+
+        mock_es_search.return_value = {"pit_id": "pit-1", "hits": {"hits": [hit]}}
+        response = self.client.get(self.url, {**params, 'cursor': response.data['next']})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(mock_es_search.call_args.kwargs['body']['search_after'], ["2025-01-02", 2])
+        mock_open_pit.assert_called_once()
+        mock_close_pit.assert_called_once_with(id='pit-1')
+
+    @patch('apps.cdr.views.cdr_search.es.search')
+    def test_cdr_search_cursor_for_other_filters(self, mock_es_search):
+        """
+        Test that a cursor cannot be reused with different filters.
+        """
+        from apps.core.pagination import encode_cursor
+
+        cursor = encode_cursor("pit-1", ["2025-01-02", 2], "another-query")
+        response = self.client.get(self.url, {'src_number': '09124567890', 'cursor': cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_es_search.assert_not_called()
+
+    @patch('apps.cdr.views.cdr_search.es.search')
+    def test_cdr_search_fields_projection(self, mock_es_search):
+        """
+        Test that `fields` is sent as `_source` includes, phone numbers are matched with exact terms
+        and filters that are not given (call_successful) are not added.
+        """
+        mock_es_search.return_value = {"hits": {"hits": [{"_source": {"dest_number": "09127654321"}}]}}
+
+        response = self.client.get(self.url, {'src_number': '09124567890', 'fields': 'dest_number,call_duration'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = mock_es_search.call_args.kwargs['body']
+        self.assertEqual(body['_source'], {'includes': ['dest_number', 'call_duration']})
+        self.assertEqual(body['track_total_hits'], False)
+        self.assertEqual(body['query']['bool']['filter'], [{'term': {'src_number': '09124567890'}}])
+
+        response = self.client.get(self.url, {'src_number': '09124567890', 'fields': 'password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('apps.cdr.views.cdr_search.es.search')
+    def test_cdr_search_count_only(self, mock_es_search):
+        """
+        Test that count_only asks for no hits and a bounded total.
+        """
+        mock_es_search.return_value = {"hits": {"total": {"value": 1000, "relation": "gte"}, "hits": []}}
+
+        response = self.client.get(self.url, {'src_number': '09124567890', 'count_only': 'true', 'count_limit': 1000})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'count': 1000, 'relation': 'gte'})
+        body = mock_es_search.call_args.kwargs['body']
+        self.assertEqual(body['size'], 0)
+        self.assertEqual(body['track_total_hits'], 1000)
+
+    @patch('apps.cdr.views.cdr_search.es.search')
+    def test_cdr_search_exists(self, mock_es_search):
+        """
+        Test that exists stops at the first match and returns a boolean.
+        """
+        mock_es_search.return_value = {"hits": {"total": {"value": 0, "relation": "eq"}, "hits": []}}
+
+        response = self.client.get(self.url, {'dest_number': '09127654321', 'exists': 'true'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'exists': False})
+        self.assertEqual(mock_es_search.call_args.kwargs['body']['terminate_after'], 1)
+
+        response = self.client.get(self.url, {'dest_number': '09127654321', 'exists': 'true', 'page_size': 10})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('apps.cdr.views.cdr_search.es.search')
+    def test_cdr_search_number_prefix(self, mock_es_search):
+        """
+        Test that number prefixes are exact terms on the prefix subfields, and that short prefixes are rejected.
+        """
+        mock_es_search.return_value = {"hits": {"hits": [{"_source": {"src_number": "09124567890"}}]}}
+
+        response = self.client.get(self.url, {'src_prefix': '091245', 'dest_prefix': '0912765'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = mock_es_search.call_args.kwargs['body']
+        self.assertEqual(body['query']['bool']['filter'], [{'term': {'src_number.prefix': '091245'}},
+                                                           {'term': {'dest_number.prefix': '0912765'}}])
+
+        response = self.client.get(self.url, {'src_prefix': '091'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cdr_search_number_prefix_postgres(self):
+        """
+        Test that PostgreSQL answers number prefixes with a range of the integer numbers.
+        """
+        from apps.cdr.views.cdr_search import CDRSearchView
+
+        cdrs = CDRSearchView().search_postgres(None, None, None, None, None, None, src_prefix='091245')
+        self.assertEqual([cdr['src_number'] for cdr in cdrs], ['09124567890'])
+
+        cdrs = CDRSearchView().search_postgres(None, None, None, None, None, None, dest_prefix='0912')
+        self.assertEqual(len(cdrs), 2)
+
+    def test_cdr_document_number_prefix_mapping(self):
+        """
+        Test that the phone numbers are indexed as keywords with an edge n-gram prefix subfield.
+        """
+        from apps.core.documents import CdrDocument
+
+        mapping = CdrDocument._doc_type.mapping.to_dict()['properties']
+        self.assertEqual(mapping['src_number']['type'], 'keyword')
+        self.assertEqual(mapping['src_number']['fields']['prefix']['analyzer'], 'number_prefix')
+        self.assertEqual(mapping['dest_number']['fields']['prefix']['search_analyzer'], 'keyword')
@@ -0,0 +1,122 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import patch
+
+from django.apps import apps
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from apps.cdr.models import Cdr, ReindexChange
+from apps.cdr.tasks.tasks_indexing import index_cdrs
+from apps.core.bulk_indexer import BulkResult
+from apps.core.search_cache import CACHE_ALIAS, TIMESERIES_PREFIX, bucket_key
+from apps.core.signal_processor import CoalescingSignalProcessor
+
+
+def create_cdr(i, month=1):
+    return Cdr.objects.create(src_number=f"0912456789{i}", dest_number="09127654321",
+                              start_time=datetime(2024, month, 10, tzinfo=dt_timezone.utc))
+
+
+@override_settings(ELASTICSEARCH_DSL_AUTOSYNC=True, ES_INDEXING={'WINDOW': 60, 'BATCH_SIZE': 3})
+class CoalescingSignalProcessorTest(TestCase):
+    def setUp(self):
+        self.processor = apps.get_app_config('django_elasticsearch_dsl').signal_processor
+        self.assertIsInstance(self.processor, CoalescingSignalProcessor)
+        self.delay = patch('apps.cdr.tasks.tasks_indexing.index_cdrs.delay').start()
+        self.addCleanup(patch.stopall)
+        self.addCleanup(self.processor.flush)
+
+    def test_changes_are_coalesced(self):
+        """
+        Test that saves are sent once their transaction commits, as one task without duplicates.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = create_cdr(1), create_cdr(2)
+            first.call_duration = 30
+            first.save()
+            self.delay.assert_not_called()
+
+        self.processor.flush()
+
+        self.delay.assert_called_once_with([first.id, second.id], [])
+
+    def test_full_batch_is_sent_at_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cdrs = [create_cdr(i) for i in range(4)]
+
+        self.delay.assert_called_once_with([cdr.id for cdr in cdrs[:3]], [])
+
+    def test_deleted_cdrs_carry_their_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cdr = create_cdr(1, month=2)
+        pk = cdr.id
+        with self.captureOnCommitCallbacks(execute=True):
+            cdr.delete()
+
+        self.processor.flush()
+
+        self.delay.assert_called_once_with([], [[pk, 'cdrs-2024.02', '2024-02-10T00:00:00+00:00']])
+
+    @override_settings(ELASTICSEARCH_DSL_AUTOSYNC=False)
+    def test_autosync_disabled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_cdr(1)
+
+        self.processor.flush()
+
+        self.delay.assert_not_called()
+
+
+class IndexCdrsTaskTest(TestCase):
+    def setUp(self):
+        """No reindex runs unless a test says so."""
+        self.es = patch('apps.core.reindex.es').start()
+        self.es.indices.exists_alias.return_value = False
+        self.addCleanup(patch.stopall)
+
+    @patch('apps.core.documents.CdrDocument.bulk_index')
+    def test_changes_are_recorded_during_a_reindex(self, mock_bulk_index):
+        """
+        Test that the CDRs saved and deleted while a reindex runs are recorded for its catch up, and only then.
+        """
+        mock_bulk_index.return_value = BulkResult()
+        cdr = create_cdr(1)
+
+        index_cdrs([cdr.id])
+        self.assertFalse(ReindexChange.objects.exists())
+
+        self.es.indices.exists_alias.return_value = True
+        index_cdrs([cdr.id], [[998, 'cdrs-2023.12', '2023-12-10T00:00:00+00:00']])
+        self.assertEqual(sorted(ReindexChange.objects.values_list('cdr_id', flat=True)), sorted([cdr.id, 998]))
+
+    @patch('apps.core.documents.CdrDocument.bulk_index')
+    def test_index_batch(self, mock_bulk_index):
+        """
+        Test that the saved CDRs are indexed in their period index and the deleted ones removed, in one bulk call.
+        """
+        mock_bulk_index.return_value = BulkResult()
+        january, february = create_cdr(1), create_cdr(2, month=2)
+
+        index_cdrs([january.id, february.id, 999], [[998, 'cdrs-2023.12', '2023-12-10T00:00:00+00:00']])
+
+        actions = mock_bulk_index.call_args.args[0]
+        self.assertEqual([(action.get('_op_type'), action['_index'], action['_id']) for action in actions], [
+            ('index', 'cdrs-2024.01', january.id),
+            ('index', 'cdrs-2024.02', february.id),
+            ('delete', 'cdrs-2023.12', 998),
+        ])
+
+    @patch('apps.core.documents.CdrDocument.bulk_index')
+    def test_late_cdrs_drop_their_buckets_once_indexed(self, mock_bulk_index):
+        """
+        Test that the closed time series buckets of the indexed and deleted CDRs are dropped after indexing.
+        """
+        mock_bulk_index.return_value = BulkResult()
+        cdr = create_cdr(1)
+        keys = [bucket_key(TIMESERIES_PREFIX, 3600, datetime(2024, month, 10, tzinfo=dt_timezone.utc).timestamp())
+                for month in (1, 3)]
+        caches[CACHE_ALIAS].set_many(dict.fromkeys(keys, {'count': 0}))
+
+        index_cdrs([cdr.id], [[998, 'cdrs-2024.03', '2024-03-10T00:00:00+00:00']])
+
+        self.assertEqual(caches[CACHE_ALIAS].get_many(keys), {})
@@ -0,0 +1,111 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.cdr.models import CdrSketch
+from apps.core.sketch_store import SketchBuffer
+from utility.sketches import DDSketch, HyperLogLog
+
+
+def cdr(index, hour=10, duration=None):
+    return {
+        'src_number': f'0912{index % 1000:07d}',
+        'dest_number': f'0935{index:07d}',
+        'call_duration': index % 600 if duration is None else duration,
+        'start_time': datetime(2024, 1, 1, hour, index % 60, tzinfo=dt_timezone.utc),
+    }
+
+
+class SketchTest(SimpleTestCase):
+    def test_hyperloglog_counts_distinct_values(self):
+        """
+        Test that merged HyperLogLogs estimate the distinct values of both within a few percent.
+        """
+        first, second = HyperLogLog(), HyperLogLog()
+        for index in range(20000):
+            (first if index % 2 else second).add(f'0912{index % 15000:07d}')
+
+        merged = HyperLogLog.from_bytes(first.merge(second).to_bytes())
+
+        self.assertAlmostEqual(merged.count(), 15000, delta=15000 * 0.05)
+        self.assertEqual(len(merged.to_bytes()), 4097)
+
+    def test_ddsketch_quantiles_within_relative_accuracy(self):
+        """
+        Test that the quantiles of merged DDSketches are within their relative accuracy, after serialization.
+        """
+        first, second = DDSketch(0.01), DDSketch(0.01)
+        for value in range(1, 1001):
+            (first if value % 2 else second).add(value)
+
+        merged = DDSketch.from_bytes(first.merge(second).to_bytes())
+
+        self.assertEqual(merged.count, 1000)
+        for q, exact in ((0.5, 500), (0.95, 950), (0.99, 990)):
+            self.assertAlmostEqual(merged.quantile(q), exact, delta=exact * 0.02)
+        self.assertIsNone(DDSketch().quantile(0.5))
+
+    def test_incompatible_sketches_are_not_merged(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+        with self.assertRaises(ValueError):
+            DDSketch(0.01).merge(DDSketch(0.02))
+
+
+class CDRSketchStatsViewTest(TestCase):
+    def setUp(self):
+        """
+        Set up a test user with a JWT token, and the sketches of two consumers over two hours.
+        """
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.url = '/api/cdr/stats/sketches/'
+
+        for consumer in range(2):
+            buffer = SketchBuffer()
+            for index in range(consumer * 2000, (consumer + 1) * 2000):
+                buffer.add(cdr(index, hour=10 + index % 2))
+            buffer.flush()
+            self.assertEqual(len(buffer), 0)
+
+    def test_consumers_merge_into_hourly_rows(self):
+        """
+        Test that the flushes of several consumers are merged into one row per hour.
+        """
+        self.assertEqual(CdrSketch.objects.count(), 2)
+        self.assertEqual(sum(CdrSketch.objects.values_list('calls', flat=True)), 4000)
+
+    def test_sketch_stats_of_a_range(self):
+        """
+        Test that the statistics of a range merge the sketches of its hours.
+        """
+        response = self.client.get(self.url, {'from': '2024-01-01T10:00:00Z', 'to': '2024-01-01T12:00:00Z'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['calls'], 4000)
+        self.assertAlmostEqual(response.data['distinct_src_numbers'], 1000, delta=50)
+        self.assertAlmostEqual(response.data['distinct_dest_numbers'], 4000, delta=200)
+        median = sorted(index % 600 for index in range(4000))[1999]
+        self.assertAlmostEqual(response.data['call_duration_percentiles']['p50'], median, delta=median * 0.02)
+
+        response = self.client.get(self.url, {'from': '2024-01-01T11:30:00Z', 'to': '2024-01-01T12:00:00Z'})
+        self.assertEqual(response.data['calls'], 2000)
+        self.assertEqual(response.data['from'], datetime(2024, 1, 1, 11, tzinfo=dt_timezone.utc))
+
+    def test_empty_range(self):
+        response = self.client.get(self.url, {'from': '2023-01-01T00:00:00Z', 'to': '2023-01-02T00:00:00Z'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['calls'], 0)
+        self.assertEqual(response.data['distinct_src_numbers'], 0)
+        self.assertIsNone(response.data['call_duration_percentiles']['p99'])
+
+    def test_invalid_range(self):
+        response = self.client.get(self.url, {'from': '2024-01-02T00:00:00Z', 'to': '2024-01-01T00:00:00Z'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from unittest.mock import patch
 from django.test import TestCase
+from django.core.cache import caches
 from rest_framework import status
 
 
@@ -11,6 +12,7 @@ class CDRStatsViewTest(TestCase):
         """
         Set up the test environment by creating a test user and obtaining a JWT token.
         """
+        caches['search'].clear()
         self.client = APIClient()
         self.user = User.objects.create_user(username='testuser', password='password')
 
@@ -1,6 +1,9 @@
+from io import StringIO
 from unittest.mock import patch
 
-from apps.cdr.models import Cdr
+from django.core.management import call_command
+
+from apps.cdr.models import Cdr, CdrCounter
 from rest_framework.test import APIClient
 from django.test import TestCase
 from django.contrib.auth.models import User
@@ -28,10 +31,10 @@ class CDRSyncStatusViewTest(TestCase):
         """
         mock_es_count.return_value = {'count': 100}
 
-        cdrs = [Cdr(src_number=f"src_{i:02d}", dest_number=f"dest_{i:02d}") for i in range(100)]
+        cdrs = [Cdr(src_number=f"0912{i:07d}", dest_number=f"0935{i:07d}") for i in range(100)]
         Cdr.objects.bulk_create(cdrs)
 
-        response = self.client.get(self.url)
+        response = self.client.get(self.url, {'count': 'exact'})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['status'], 'synced')
@@ -42,9 +45,9 @@ class CDRSyncStatusViewTest(TestCase):
         Test when the CDR counts in the Django DB and Elasticsearch are out of sync.
         """
         mock_es_count.return_value = {'count': 120}
-        cdrs = [Cdr(src_number=f"src_{i:02d}", dest_number=f"dest_{i:02d}") for i in range(100)]
+        cdrs = [Cdr(src_number=f"0912{i:07d}", dest_number=f"0935{i:07d}") for i in range(100)]
         Cdr.objects.bulk_create(cdrs)
-        response = self.client.get(self.url)
+        response = self.client.get(self.url, {'count': 'exact'})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data['status'], 'out_of_sync')
         self.assertEqual(response.data['db_count'], 100)
@@ -60,3 +63,48 @@ class CDRSyncStatusViewTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
         self.assertIn("error", response.data)
         self.assertEqual(response.data['error'], "Elasticsearch is down")
+
+    @patch('apps.cdr.views.cdr_sync_tatus.es.count')
+    def test_cdr_sync_status_from_counters(self, mock_es_count):
+        """
+        Test that the default count comes from the counters, which follow inserts and deletes.
+        """
+        mock_es_count.return_value = {'count': 2}
+        for i in range(3):
+            Cdr.objects.create(src_number=f"0912{i:07d}", dest_number=f"0935{i:07d}")
+        Cdr.objects.first().delete()
+
+        with self.assertNumQueries(2):  # The user of the token, and the sum of the counters
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"status": "synced", "db_count": 2, "es_count": 2, "count_mode": "counter",
+                                         "exact": True})
+
+    @patch('apps.cdr.views.cdr_sync_tatus.es.count')
+    def test_cdr_sync_status_estimate(self, mock_es_count):
+        """
+        Test the estimate mode: without PostgreSQL table statistics it falls back to the counters.
+        """
+        mock_es_count.return_value = {'count': 0}
+
+        with patch('apps.core.row_counts.estimated_cdrs', return_value=1000):
+            response = self.client.get(self.url, {'count': 'estimate'})
+        self.assertEqual(response.data['status'], 'estimated')
+        self.assertEqual(response.data['db_count'], 1000)
+        self.assertFalse(response.data['exact'])
+
+        response = self.client.get(self.url, {'count': 'estimate'})
+        self.assertEqual(response.data['count_mode'], 'counter')
+        self.assertEqual(self.client.get(self.url, {'count': 'all'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_counters(self):
+        """
+        Test that the rebuild command counts CDRs written without the ORM.
+        """
+        Cdr.objects.bulk_create([Cdr(src_number=f"0912{i:07d}", dest_number=f"0935{i:07d}") for i in range(10)])
+        Cdr.objects.create(src_number="09124567890", dest_number="09127654321")
+
+        call_command('rebuild_cdr_counters', stdout=StringIO())
+
+        self.assertEqual(sum(CdrCounter.objects.values_list('count', flat=True)), 11)
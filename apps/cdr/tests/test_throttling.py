@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, Mock, patch
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.core.throttling import RedisBuckets, TokenBucketThrottle, parse_rate
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'throttle-test'},
+    'search': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+@override_settings(CACHES=CACHES)
+class TokenBucketThrottleTest(TestCase):
+    def setUp(self):
+        """
+        Start every test with empty buckets and no local leases.
+        """
+        TokenBucketThrottle.clear_local()
+        self.addCleanup(TokenBucketThrottle.clear_local)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.request = SimpleNamespace(user=AnonymousUser(), META={'REMOTE_ADDR': '10.0.0.1'})
+        self.view = SimpleNamespace(throttle_scope='default')
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('5/m'), (5, 5 / 60))
+        self.assertEqual(parse_rate('20/min'), (20, 20 / 60))
+
+    @patch('apps.cdr.views.cdr_stats.es.search')
+    def test_default_scope_is_enforced(self, mock_es_search):
+        """
+        Test that the sixth request of a minute is refused with the time to wait for the next token.
+        """
+        mock_es_search.return_value = {'aggregations': {'avg_duration': {'value': 1.0},
+                                                        'successful_calls': {'doc_count': 1},
+                                                        'failed_calls': {'doc_count': 0}}}
+        for _ in range(5):
+            self.assertEqual(self.client.get('/api/cdr/stats/').status_code, status.HTTP_200_OK)
+
+        response = self.client.get('/api/cdr/stats/')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertLessEqual(int(response['Retry-After']), 12)
+
+    def test_staff_users_get_the_admin_scope(self):
+        """
+        Test that staff users are throttled with the admin rate.
+        """
+        staff = SimpleNamespace(user=SimpleNamespace(is_staff=True, is_authenticated=True, pk=1))
+
+        allowed = [TokenBucketThrottle().allow_request(staff, self.view) for _ in range(21)]
+
+        self.assertEqual(allowed, [True] * 20 + [False])
+
+    @override_settings(THROTTLE={'LEASE_FRACTION': 0.5, 'LEASE_TTL': 60})
+    def test_leases_and_denials_are_served_locally(self):
+        """
+        Test that tokens taken in advance and denials do not reach the cache again.
+        """
+        buckets = Mock()
+        buckets.take.side_effect = [(2, 0.0), (0, 30.0)]
+        with patch.object(TokenBucketThrottle, 'buckets', return_value=buckets):
+            allowed = [TokenBucketThrottle().allow_request(self.request, self.view) for _ in range(2)]
+            throttle = TokenBucketThrottle()
+            denied = [throttle.allow_request(self.request, self.view) for _ in range(3)]
+
+        self.assertEqual(allowed, [True, True])
+        self.assertEqual(denied, [False, False, False])
+        self.assertAlmostEqual(throttle.wait(), 30.0, delta=1)
+        self.assertEqual(buckets.take.call_count, 2)
+        self.assertEqual(buckets.take.call_args.args[1:], (5, 5 / 60, 2))
+
+    def test_cache_failure_allows_requests(self):
+        buckets = Mock()
+        buckets.take.side_effect = ConnectionError("Redis is down")
+        with patch.object(TokenBucketThrottle, 'buckets', return_value=buckets):
+            self.assertTrue(TokenBucketThrottle().allow_request(self.request, self.view))
+
+    @override_settings(THROTTLE={'LEASE_FRACTION': 0.05, 'MIN_LEASE': 3})
+    def test_min_lease(self):
+        """
+        Test that a lease is MIN_LEASE tokens when the fraction of the bucket is smaller, but never more than the bucket.
+        """
+        buckets = Mock()
+        buckets.take.return_value = (1, 0.0)
+        with patch.object(TokenBucketThrottle, 'buckets', return_value=buckets):
+            TokenBucketThrottle().allow_request(self.request, self.view)
+            with override_settings(THROTTLE={'MIN_LEASE': 10}):
+                TokenBucketThrottle().allow_request(self.request, self.view)
+
+        self.assertEqual([call.args[3] for call in buckets.take.call_args_list], [3, 5])
+
+    @patch('redis.Redis.from_url')
+    def test_redis_buckets_run_one_script_call(self, from_url):
+        """
+        Test that a bucket on Redis is one call of the token bucket script, on the prefixed key, with a
+        client of the first server of the cache location.
+        """
+        cache = MagicMock()
+        cache.make_and_validate_key.side_effect = lambda key: f':1:{key}'
+        script = from_url.return_value.register_script.return_value
+        script.return_value = [3, b'0']
+
+        buckets = RedisBuckets(cache, 'redis://primary:6379,redis://replica:6379')
+        granted = buckets.take('throttle_default_1', 5, 5 / 60, 3)
+        buckets.take('throttle_default_1', 5, 5 / 60, 3)
+
+        self.assertEqual(granted, (3, 0.0))
+        from_url.assert_called_once_with('redis://primary:6379')
+        script.assert_called_with(keys=[':1:throttle_default_1'], args=[5, 5 / 60, 3])
@@ -0,0 +1,121 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import Mock, patch
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.cdr.models import Cdr
+from apps.cdr.tasks.tasks_indexing import index_cdrs
+from apps.core.bulk_indexer import BulkResult
+
+
+def histogram(index, body, **options):
+    """Fake Elasticsearch answer: one call of 10 seconds per bucket of the requested range."""
+    bounds = body['aggs']['timeseries']['date_histogram']['extended_bounds']
+    step = {'1h': 3600000, '1d': 86400000}[body['aggs']['timeseries']['date_histogram']['fixed_interval']]
+    return {'aggregations': {'timeseries': {'buckets': [
+        {'key': key, 'doc_count': 1, 'avg_duration': {'value': 10.0}, 'total_duration': {'value': 10.0},
+         'successful_calls': {'doc_count': 1}}
+        for key in range(bounds['min'], bounds['max'] + 1, step)
+    ]}}}
+
+
+@patch('apps.cdr.views.cdr_timeseries.es.search', side_effect=histogram)
+class CDRTimeseriesViewTest(TestCase):
+    def setUp(self):
+        """
+        Set up the test environment by creating a test user and obtaining a JWT token.
+        """
+        caches['search'].clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.url = '/api/cdr/stats/timeseries/'
+        self.params = {'interval': '1h', 'from': '2024-01-01T00:00:00Z', 'to': '2024-01-01T06:00:00Z'}
+
+    def test_timeseries_buckets(self, mock_es_search):
+        """
+        Test that every bucket of the range is returned with its statistics.
+        """
+        response = self.client.get(self.url, self.params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['interval'], '1h')
+        self.assertEqual(len(response.data['buckets']), 6)
+        self.assertEqual(response.data['buckets'][0]['start'], '2024-01-01T00:00:00+00:00')
+        self.assertEqual(response.data['buckets'][0]['calls'], 1)
+        self.assertEqual(response.data['buckets'][0]['success_ratio'], 1.0)
+
+    def test_closed_buckets_are_cached(self, mock_es_search):
+        """
+        Test that a range in the past is sent to Elasticsearch once, and a wider one only for the new buckets.
+        """
+        self.client.get(self.url, self.params)
+        self.client.get(self.url, self.params)
+        self.assertEqual(mock_es_search.call_count, 1)
+
+        response = self.client.get(self.url, {**self.params, 'to': '2024-01-01T08:00:00Z'})
+
+        self.assertEqual(len(response.data['buckets']), 8)
+        self.assertEqual(mock_es_search.call_count, 2)
+        query = mock_es_search.call_args.kwargs['body']['query']['range']['start_time']
+        self.assertEqual(query['gte'], '2024-01-01T06:00:00+00:00')
+        self.assertEqual(mock_es_search.call_args.kwargs['index'], 'cdrs-2024.01')
+
+    @patch('apps.cdr.views.cdr_timeseries.time.time',
+           return_value=datetime(2024, 1, 2, 10, 30, tzinfo=dt_timezone.utc).timestamp())
+    def test_open_bucket_is_recomputed(self, mock_time, mock_es_search):
+        """
+        Test that, once the closed buckets are cached, a series up to now only queries the open bucket.
+        """
+        self.client.get(self.url, {'interval': '1h'})
+        response = self.client.get(self.url, {'interval': '1h'})
+
+        self.assertEqual(len(response.data['buckets']), 24)
+        self.assertEqual(response.data['buckets'][-1]['start'], '2024-01-02T10:00:00+00:00')
+        self.assertEqual(mock_es_search.call_count, 2)
+        query = mock_es_search.call_args.kwargs['body']['query']['range']['start_time']
+        self.assertEqual(query['gte'], '2024-01-02T10:00:00+00:00')
+
+    @patch('apps.cdr.tasks.tasks_indexing.record_changes', Mock())
+    @patch('apps.core.documents.CdrDocument.bulk_index', return_value=BulkResult())
+    def test_late_cdr_drops_its_bucket(self, mock_bulk_index, mock_es_search):
+        """
+        Test that a CDR indexed in a closed bucket makes it recomputed.
+        """
+        self.client.get(self.url, self.params)
+        cdr = Cdr.objects.create(src_number="09124567890", dest_number="09127654321", call_duration=30,
+                                 start_time=datetime(2024, 1, 1, 2, 30, tzinfo=dt_timezone.utc))
+        index_cdrs([cdr.id])
+
+        self.client.get(self.url, self.params)
+
+        self.assertEqual(mock_es_search.call_count, 2)
+        query = mock_es_search.call_args.kwargs['body']['query']['range']['start_time']
+        self.assertEqual(query['gte'], '2024-01-01T02:00:00+00:00')
+
+    def test_invalid_parameters(self, mock_es_search):
+        """
+        Test that unknown intervals, reversed ranges and too many buckets are rejected.
+        """
+        self.assertEqual(self.client.get(self.url, {'interval': '2h'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {**self.params, 'to': '2023-12-31T00:00:00Z'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {**self.params, 'to': '2025-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_es_search.assert_not_called()
+
+    def test_es_exception(self, mock_es_search):
+        """
+        Test when Elasticsearch throws an exception.
+        """
+        mock_es_search.side_effect = Exception("Elasticsearch is down")
+
+        response = self.client.get(self.url, self.params)
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.data['error'], "Elasticsearch is down")
@@ -1,8 +1,13 @@
 from django.urls import path
 
+from apps.cdr.views.cdr_async import AsyncCDRSearchView, AsyncCDRStatsView, AsyncCDRSyncStatusView
+from apps.cdr.views.cdr_batch_search import CDRBatchSearchView
+from apps.cdr.views.cdr_export import CDRExportView
 from apps.cdr.views.cdr_search import CDRSearchView
+from apps.cdr.views.cdr_sketch_stats import CDRSketchStatsView
 from apps.cdr.views.cdr_stats import CDRStatsView
 from apps.cdr.views.cdr_sync_tatus import CDRSyncStatusView
+from apps.cdr.views.cdr_timeseries import CDRTimeseriesView
 
 """
     URL patterns for the CDR API:
@@ -11,9 +16,23 @@ from apps.cdr.views.cdr_sync_tatus import CDRSyncStatusView
     2. 'cdr/stats/': Endpoint to get aggregated statistics about CDRs such as average call duration, successful 
          and failed calls.
     3. 'cdr/sync-status/': Endpoint to check if the CDRs are in sync between the Django database and Elasticsearch.
+    4. 'cdr/export/': Endpoint streaming every CDR matching the search filters as NDJSON or CSV.
+    5. 'cdr/async/search/', 'cdr/async/stats/', 'cdr/async/sync-status/': Async versions of the endpoints above,
+         meant to be served by ASGI workers (see config/gunicorn_asgi.py).
+    6. 'cdr/search/batch/': Endpoint running a list of searches (POST) in one Elasticsearch multi-search.
+    7. 'cdr/stats/timeseries/': Endpoint to get the statistics of CDRs per time bucket (1m to 1d).
+    8. 'cdr/stats/sketches/': Endpoint to get distinct numbers and call duration percentiles of a time range,
+         merged from the hourly sketches of the consumer.
     """
 urlpatterns = [
     path('cdr/search/', CDRSearchView.as_view(), name='cdr_search'),
+    path('cdr/search/batch/', CDRBatchSearchView.as_view(), name='cdr_batch_search'),
     path('cdr/stats/', CDRStatsView.as_view(), name='cdr_stats'),
+    path('cdr/stats/timeseries/', CDRTimeseriesView.as_view(), name='cdr_stats_timeseries'),
+    path('cdr/stats/sketches/', CDRSketchStatsView.as_view(), name='cdr_stats_sketches'),
     path('cdr/sync-status/', CDRSyncStatusView.as_view(), name='cdr_sync_status'),
+    path('cdr/export/', CDRExportView.as_view(), name='cdr_export'),
+    path('cdr/async/search/', AsyncCDRSearchView.as_view(), name='cdr_async_search'),
+    path('cdr/async/stats/', AsyncCDRStatsView.as_view(), name='cdr_async_stats'),
+    path('cdr/async/sync-status/', AsyncCDRSyncStatusView.as_view(), name='cdr_async_sync_status'),
 ]
@@ -0,0 +1,173 @@
+import asyncio
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from elasticsearch import ApiError, TransportError
+from rest_framework import status
+
+from apps.cdr.serializers.cdr_serializer import CdrStatsSerializer
+from apps.cdr.views.cdr_search import CDRSearchView
+from apps.cdr.views.cdr_stats import CDRStatsView
+from apps.cdr.views.cdr_sync_tatus import CDRSyncStatusView
+from apps.core.async_views import AsyncAPIView
+from apps.core.cdr_indices import search_target
+from apps.core.elastic import get_async_es
+from apps.core.hot_window import get_hot_window
+from apps.core.os_setting_elastic import es
+from apps.core.query_planner import ELASTICSEARCH, POSTGRES, is_unavailable, planner
+from apps.core.row_counts import COUNT_MODES, COUNTER, acount_cdrs
+from apps.core.search_cache import acached_search
+
+
+class AsyncCDRSearchView(AsyncAPIView):
+    """
+    Async version of `CDRSearchView`, served by ASGI workers.
+    The query is sent with the pooled AsyncElasticsearch client, so a worker does not hold a thread
+    per query in flight. Accepts the filters of the sync view, `fields`, `count_only`/`count_limit`
+    and `exists`; cursor pagination stays on the sync endpoint. Searches go to the backend the query
+    planner chooses, PostgreSQL included, as on the sync view, named by the `X-Search-Backend` header.
+    """
+    ALLOWED_PARAMETERS = ['src_number', 'dest_number', 'src_prefix', 'dest_prefix', 'start_time', 'end_time',
+                          'call_successful', 'call_duration', 'fields', 'count_only', 'count_limit', 'exists']
+
+    validate_params = CDRSearchView.validate_params
+    validate = CDRSearchView.validate
+    build_query = CDRSearchView.build_query
+    prefixes = staticmethod(CDRSearchView.prefixes)
+
+    async def get(self, request):
+        """
+        Handles the GET request to search CDRs based on query parameters.
+
+        Returns:
+        - JsonResponse: A list of filtered CDRs, the `count` or `exists`, or an error message.
+        """
+        validated_data, error = self.validate_params(request)
+        if error is not None:
+            return JsonResponse(error.data, status=error.status_code, safe=False)
+
+        start_time = validated_data.get('start_time')
+        end_time = validated_data.get('end_time')
+        fields = validated_data.get('fields')
+        filters = (validated_data.get('src_number'), validated_data.get('dest_number'), start_time, end_time,
+                   validated_data.get('call_successful'), validated_data.get('call_duration'))
+        prefixes = self.prefixes(validated_data)
+
+        if validated_data.get('count_only') or validated_data.get('exists'):
+            exists = validated_data.get('exists', False)
+            body = CDRSearchView.count_body(self.build_query(*filters, **prefixes), exists,
+                                            validated_data.get('count_limit'))
+
+            async def count():
+                response = await get_async_es().search(**search_target(start_time, end_time), body=body)
+                return response.get("hits", {}).get("total", {"value": 0, "relation": "eq"})
+
+            try:
+                total = await acached_search('cdr:count', body, count, start_time, end_time)
+            except Exception as e:
+                return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            if exists:
+                return JsonResponse({"exists": total["value"] > 0}, status=status.HTTP_200_OK)
+            return JsonResponse({"count": total["value"], "relation": total["relation"]}, status=status.HTTP_200_OK)
+
+        hot_window = get_hot_window()
+        if hot_window is not None and hot_window.covers(start_time) and not any(prefixes.values()):
+            cdrs, backend = hot_window.search(*filters), 'hot-window'
+            if fields:
+                cdrs = [{field: cdr[field] for field in fields} for cdr in cdrs]
+        else:
+            try:
+                cdrs, backend = await self.search(filters, fields, prefixes)
+            except Exception as e:
+                return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if not cdrs:
+            response = JsonResponse({"message": "No results found."}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            response = JsonResponse(cdrs, status=status.HTTP_200_OK, safe=False)
+        response[CDRSearchView.BACKEND_HEADER] = backend
+        return response
+
+    async def search(self, filters, fields, prefixes):
+        """
+        Runs the search on the backend chosen by the query planner, see `CDRSearchView.get`.
+
+        Returns:
+        - tuple: The CDRs found and the backend that answered.
+        """
+        src_number, dest_number, start_time, end_time = filters[:4]
+        query = self.build_query(*filters, fields, **prefixes)
+
+        async def search():
+            response = await get_async_es().search(**search_target(start_time, end_time), body=query,
+                                                    filter_path=CDRSearchView.FILTER_PATH)
+            return [hit["_source"] for hit in response.get("hits", {}).get("hits", [])]
+
+        # The planner measures the indexing lag with the sync client and the ORM, at most once per CHECK_INTERVAL.
+        backend = await sync_to_async(planner.choose)(es, src_number, dest_number, start_time)
+        if backend == ELASTICSEARCH:
+            try:
+                return await acached_search('cdr:search', query, search, start_time, end_time), backend
+            except (TransportError, ApiError) as e:
+                if not is_unavailable(e):
+                    raise
+                print(f"Elasticsearch search failed, answering from PostgreSQL: {e}")
+                planner.mark_unavailable()
+        search_postgres = sync_to_async(partial(CDRSearchView().search_postgres, *filters, fields, **prefixes))
+        return await acached_search('cdr:search:postgres', query, search_postgres, start_time, end_time), POSTGRES
+
+
+class AsyncCDRStatsView(AsyncAPIView):
+    """
+    Async version of `CDRStatsView`, with the same `start_time`/`end_time` window.
+    """
+
+    async def get(self, request):
+        """
+        Handles the GET request to retrieve statistics about CDRs.
+
+        Returns:
+        - JsonResponse: A dictionary with statistics on average call duration, successful and failed calls.
+        """
+        serializer = CdrStatsSerializer(data=request.GET.dict())
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        start_time = serializer.validated_data.get('start_time')
+        end_time = serializer.validated_data.get('end_time')
+        body = CDRStatsView.build_query(start_time, end_time)
+
+        async def aggregate():
+            return CDRStatsView.stats_from(
+                await get_async_es().search(**search_target(start_time, end_time), body=body))
+
+        try:
+            stats = await acached_search('cdr:stats', body, aggregate, start_time, end_time)
+            return JsonResponse(stats, status=status.HTTP_200_OK)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncCDRSyncStatusView(AsyncAPIView):
+    """
+    Async version of `CDRSyncStatusView`, the database and Elasticsearch are counted concurrently.
+    """
+
+    async def get(self, request):
+        """
+        Handles the GET request to check if the CDRs are in sync between the database and Elasticsearch.
+
+        Returns:
+        - JsonResponse: A message indicating the sync status, and counts from the database and Elasticsearch.
+        """
+        mode = request.GET.get('count', COUNTER)
+        if mode not in COUNT_MODES:
+            return JsonResponse({"error": f"count must be one of {', '.join(COUNT_MODES)}."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            (cdr_count_db, mode), es_response = await asyncio.gather(
+                acount_cdrs(mode), get_async_es().count(index="cdrs"))
+            data, status_code = CDRSyncStatusView.sync_status(cdr_count_db, es_response['count'], mode)
+            return JsonResponse(data, status=status_code)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,92 @@
+from rest_framework.response import Response
+from rest_framework import status
+
+from apps.cdr.views.cdr_search import CDRSearchView
+from apps.core.cdr_indices import READ_ALIAS, SEARCH_OPTIONS, indices_for
+from apps.core.os_setting_elastic import es
+
+
+class CDRBatchSearchView(CDRSearchView):
+    """
+    This view runs many CDR searches in one request and one Elasticsearch `_msearch` round trip,
+    e.g. the latest calls of a few hundred subscribers.
+
+    Body (via POST request):
+    - searches: (list) Filter sets, each with the parameters of `CDRSearchView` (src_number, dest_number,
+      src_prefix, dest_prefix, start_time, end_time, call_successful, call_duration, fields) and `page_size`,
+      the number of CDRs returned for that set (10 by default). CDRs are returned latest first. The page sizes
+      of a batch add up to at most MAX_BATCH_HITS.
+
+    Returns:
+    - Response: `results`, one block per filter set in the order of the request: the `results` of the set,
+                or its `error`.
+    """
+    http_method_names = ['post', 'options']
+    replica_methods = ('POST', 'OPTIONS')  # A batch only reads
+
+    ALLOWED_PARAMETERS = ['src_number', 'dest_number', 'src_prefix', 'dest_prefix', 'start_time', 'end_time',
+                          'call_successful', 'call_duration', 'fields', 'page_size']
+    DEFAULT_BATCH_PAGE_SIZE = 10
+    MAX_SEARCHES = 500
+    MAX_BATCH_HITS = 10000  # Sum of the page sizes, the CDRs of one response
+    MAX_CONCURRENT_SEARCHES = 8
+    FILTER_PATH = ['responses.hits.hits._source', 'responses.error']
+
+    def post(self, request):
+        """
+        Handles the POST request to run a batch of CDR searches.
+
+        Parameters:
+        - searches (list): The filter sets to search for.
+
+        Returns:
+        - Response: One result block per filter set, or an error message if the batch itself is invalid.
+        """
+        searches = request.data.get('searches') if isinstance(request.data, dict) else None
+        if not isinstance(searches, list) or not searches:
+            return Response({"error": "searches must be a non-empty list of filter sets."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(searches) > self.MAX_SEARCHES:
+            return Response({"error": f"A batch can hold at most {self.MAX_SEARCHES} searches."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(searches)
+        positions, lines, hits = [], [], 0
+        for position, params in enumerate(searches):
+            if not isinstance(params, dict):
+                results[position] = {"error": "A filter set must be an object."}
+                continue
+            validated_data, error = self.validate(params)
+            if error is not None:
+                results[position] = {"error": error.data}
+                continue
+            query = self.build_query(
+                validated_data.get('src_number'), validated_data.get('dest_number'), validated_data.get('start_time'),
+                validated_data.get('end_time'), validated_data.get('call_successful'),
+                validated_data.get('call_duration'), validated_data.get('fields'), **self.prefixes(validated_data),
+            )
+            query["size"] = validated_data.get('page_size', self.DEFAULT_BATCH_PAGE_SIZE)
+            hits += query["size"]
+            query["sort"] = [{"start_time": "desc"}]
+            positions.append(position)
+            # Every set only searches the period indices of its own window, like a single search.
+            index = indices_for(validated_data.get('start_time'), validated_data.get('end_time'))
+            lines.extend([{"index": index, **SEARCH_OPTIONS} if index != READ_ALIAS else {}, query])
+
+        if hits > self.MAX_BATCH_HITS:
+            return Response({"error": f"The page sizes of a batch can add up to at most {self.MAX_BATCH_HITS}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if lines:
+            try:
+                response = es.msearch(index=READ_ALIAS, searches=lines, filter_path=self.FILTER_PATH,
+                                      max_concurrent_searches=self.MAX_CONCURRENT_SEARCHES)
+            except Exception as e:
+                return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            for position, item in zip(positions, response["responses"]):
+                error = item.get("error")
+                if error is not None:
+                    results[position] = {"error": error.get("reason", str(error)) if isinstance(error, dict) else error}
+                else:
+                    results[position] = {"results": [hit["_source"] for hit in item.get("hits", {}).get("hits", [])]}
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
@@ -0,0 +1,103 @@
+import csv
+import io
+import itertools
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.response import Response
+from rest_framework import status
+
+from apps.cdr.serializers.cdr_serializer import CdrSearchSerializer
+from apps.cdr.views.cdr_search import CDRSearchView
+from apps.core.cdr_indices import indices_for
+from apps.core.os_setting_elastic import es
+from apps.core.pagination import iter_pages
+
+
+class CDRExportView(CDRSearchView):
+    """
+    This view streams every CDR matching the search filters as NDJSON or CSV.
+    Results are read from Elasticsearch one page at a time with a point in time and `search_after`
+    and written to the client as they arrive, so the memory used by the worker does not grow with
+    the size of the export.
+
+    Parameters (via GET request):
+    - The filters of `CDRSearchView` (src_number, dest_number, src_prefix, dest_prefix, start_time, end_time,
+      call_successful, call_duration), at least one is required.
+    - fields: (str) Comma separated CDR fields to export (and CSV columns), all fields by default.
+    - export_format: (str) 'ndjson' (default) or 'csv'.
+    """
+    ALLOWED_PARAMETERS = ['src_number', 'dest_number', 'src_prefix', 'dest_prefix', 'start_time', 'end_time',
+                          'call_successful', 'call_duration', 'fields', 'export_format']
+    EXPORT_PAGE_SIZE = 5000
+    CSV_COLUMNS = CdrSearchSerializer.CDR_FIELDS
+    CONTENT_TYPES = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+
+    def get(self, request):
+        """
+        Handles the GET request to export CDRs based on query parameters.
+
+        Parameters:
+        - export_format (str): 'ndjson' or 'csv'.
+        - The search filters, validated by `CdrSearchSerializer`.
+
+        Returns:
+        - StreamingHttpResponse: The matching CDRs as an attachment, or an error Response.
+        """
+        export_format = request.GET.get('export_format', 'ndjson')
+        if export_format not in self.CONTENT_TYPES:
+            return Response(
+                {"error": f"Invalid export format: {export_format}, use one of {', '.join(self.CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        validated_data, error = self.validate_params(request)
+        if error is not None:
+            return error
+
+        query = self.build_query(
+            validated_data.get('src_number'), validated_data.get('dest_number'), validated_data.get('start_time'),
+            validated_data.get('end_time'), validated_data.get('call_successful'), validated_data.get('call_duration'),
+            validated_data.get('fields'), **self.prefixes(validated_data),
+        )
+
+        # Fetch the first page before streaming starts, so Elasticsearch errors still get a proper status code.
+        pages = iter_pages(es, indices_for(validated_data.get('start_time'), validated_data.get('end_time')), query,
+                           self.EXPORT_PAGE_SIZE)
+        try:
+            first_page = next(pages, [])
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        pages = itertools.chain([first_page], pages)
+
+        if export_format == 'csv':
+            content = self.render_csv(pages, validated_data.get('fields', self.CSV_COLUMNS))
+        else:
+            content = self.render_ndjson(pages)
+        response = StreamingHttpResponse(content, content_type=self.CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="cdrs.{export_format}"'
+        return response
+
+    def render_ndjson(self, pages):
+        """
+        Yields the CDRs as newline delimited JSON, one chunk per page of hits.
+        """
+        for hits in pages:
+            yield ''.join(json.dumps(hit["_source"]) + '\n' for hit in hits)
+
+    def render_csv(self, pages, columns):
+        """
+        Yields a header row followed by the CDRs as CSV rows, one chunk per page of hits.
+        """
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for hits in pages:
+            writer.writerows(hit["_source"] for hit in hits)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
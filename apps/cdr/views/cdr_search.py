@@ -1,32 +1,62 @@
+from datetime import datetime
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-from rest_framework.throttling import ScopedRateThrottle
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from apps.core.throttling import TokenBucketThrottle
+from apps.core.authentication import JWTAuthentication
+from elasticsearch import ApiError, NotFoundError, TransportError
 
+from apps.cdr.models import Cdr
 from apps.cdr.serializers.cdr_serializer import CdrSearchSerializer
+from apps.core.cdr_indices import READ_ALIAS, indices_for, search_target
+from apps.core.db_routers import ReplicaReadsMixin, pin_to_primary
+from apps.core.hot_window import get_hot_window
+from apps.core.fields import PhoneNumberField
 from apps.core.os_setting_elastic import es
+from apps.core.pagination import InvalidCursor, search_page
+from apps.core.query_planner import ELASTICSEARCH, POSTGRES, is_unavailable, planner
+from apps.core.search_cache import cached_search
 
 
-class CDRSearchView(APIView):
+class CDRSearchView(ReplicaReadsMixin, APIView):
     """
     This view allows querying of Call Detail Records (CDRs) in Elasticsearch.
     Filters include date range, source/destination numbers, call success status and call duration,.
+    Queries whose start_time falls inside the in-process hot window (see `apps.core.hot_window`)
+    are answered from memory without a round trip to Elasticsearch, other results are kept in the
+    search cache until new CDRs are ingested (see `apps.core.search_cache`).
+    The query planner (see `apps.core.query_planner`) sends exact lookups, and recent ones while indexing
+    lags, to PostgreSQL instead, as well as every search while Elasticsearch is down. The `X-Search-Backend`
+    header of the response names the backend that answered.
 
     Parameters (via GET request):
     - src_number: (str) The source phone number to filter by.
     - dest_number: (str) The destination phone number to filter by.
+    - src_prefix, dest_prefix: (str) The first 4 to 11 digits of the source/destination number, e.g. 0912345.
     - call_successful: (str) Whether the call was successful, should be 'true' or 'false'.
     - call_duration: (int) The minimum call duration (in seconds) to filter CDRs.
+    - page_size: (int) Enables cursor pagination, number of CDRs per page (1-1000).
+    - cursor: (str) The `next` token of the previous page, sent along with the same filters.
+    - fields: (str) Comma separated CDR fields to return, all fields by default.
+    - count_only: (bool) Return only the number of matching CDRs, exact up to `count_limit` when given.
+    - exists: (bool) Return only whether at least one CDR matches.
     """
     authentication_classes = [JWTAuthentication]
     permission_classes = [AllowAny]
 
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [TokenBucketThrottle]
     throttle_scope = 'default'
 
-    ALLOWED_PARAMETERS = ['src_number', 'dest_number', 'start_time', 'end_time', 'call_successful', 'call_duration']
+    ALLOWED_PARAMETERS = ['src_number', 'dest_number', 'src_prefix', 'dest_prefix', 'start_time', 'end_time',
+                          'call_successful', 'call_duration', 'page_size', 'cursor', 'fields', 'count_only',
+                          'count_limit', 'exists']
+    DEFAULT_PAGE_SIZE = 100
+    SEARCH_SIZE = 10  # Hits of a search without pagination, the Elasticsearch default
+    BACKEND_HEADER = 'X-Search-Backend'
+    # Only the `_source` of the hits is read, Elasticsearch leaves the metadata of every hit out of the response
+    FILTER_PATH = ['hits.hits._source']
 
     def get(self, request):
         """
@@ -35,68 +65,272 @@ class CDRSearchView(APIView):
         Parameters:
         - src_number (str): Source number for filtering CDRs.
         - dest_number (str): Destination number for filtering CDRs.
+        - src_prefix (str): Leading digits of the source number.
+        - dest_prefix (str): Leading digits of the destination number.
         - call_successful (str): Whether the call was successful ('true' or 'false').
         - call_duration (int): The minimum call duration to filter CDRs.
+        - page_size (int): Number of CDRs per page, enables cursor pagination.
+        - cursor (str): Token of the next page returned by the previous request.
+        - fields (str): Comma separated CDR fields to return.
+        - count_only (bool): Return the number of matching CDRs instead of the CDRs.
+        - count_limit (int): Stop counting exactly past this number of CDRs.
+        - exists (bool): Return whether any CDR matches instead of the CDRs.
+
+        Returns:
+        - Response: A list of filtered CDRs or error message. With pagination, a dictionary with the
+                    `results` of the page and the `next` token (null on the last page). With count_only,
+                    the `count` and its `relation` ('eq' or 'gte'); with exists, `exists`.
+        """
+        validated_data, error = self.validate_params(request)
+        if error is not None:
+            return error
+
+        src_number = validated_data.get('src_number')
+        dest_number = validated_data.get('dest_number')
+        start_time = validated_data.get('start_time')
+        end_time = validated_data.get('end_time')
+        call_successful = validated_data.get('call_successful')
+        call_duration = validated_data.get('call_duration')
+        fields = validated_data.get('fields')
+        prefixes = self.prefixes(validated_data)
+
+        if validated_data.get('count_only') or validated_data.get('exists'):
+            query = self.build_query(src_number, dest_number, start_time, end_time, call_successful, call_duration,
+                                     **prefixes)
+            return self.count(query, validated_data.get('exists', False), validated_data.get('count_limit'),
+                              start_time, end_time)
+
+        if 'page_size' in validated_data or 'cursor' in validated_data:
+            query = self.build_query(
+                src_number, dest_number, start_time, end_time, call_successful, call_duration, fields, **prefixes)
+            return self.paginated_search(
+                query, validated_data.get('page_size', self.DEFAULT_PAGE_SIZE), validated_data.get('cursor'),
+                indices_for(start_time, end_time))
+
+        hot_window = get_hot_window()
+        if hot_window is not None and hot_window.covers(start_time) and not any(prefixes.values()):
+            cdrs = hot_window.search(src_number, dest_number, start_time, end_time, call_successful, call_duration)
+            if fields:
+                cdrs = [{field: cdr[field] for field in fields} for cdr in cdrs]
+            return self.results(cdrs, 'hot-window')
+
+        filters = (src_number, dest_number, start_time, end_time, call_successful, call_duration)
+        query = self.build_query(*filters, fields, **prefixes)
+
+        def search():
+            response = es.search(**search_target(start_time, end_time), body=query, filter_path=self.FILTER_PATH)
+            return [hit["_source"] for hit in response.get("hits", {}).get("hits", [])]
+
+        try:
+            backend = planner.choose(es, src_number, dest_number, start_time)
+            if backend == ELASTICSEARCH:
+                try:
+                    cdrs = cached_search('cdr:search', query, search, start_time, end_time)
+                except (TransportError, ApiError) as e:
+                    if not is_unavailable(e):
+                        raise
+                    print(f"Elasticsearch search failed, answering from PostgreSQL: {e}")
+                    planner.mark_unavailable()
+                    backend = POSTGRES
+            if backend == POSTGRES:
+                cdrs = cached_search('cdr:search:postgres', query,
+                                     lambda: self.search_postgres(*filters, fields, **prefixes), start_time, end_time)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return self.results(cdrs, backend)
+
+    def results(self, cdrs, backend):
+        """
+        Returns the CDRs found, or a 404 message, with the `X-Search-Backend` header naming what answered
+        ('elasticsearch', 'postgres' or 'hot-window').
+        """
+        if not cdrs:
+            response = Response({"message": "No results found."}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            response = Response(cdrs, status=status.HTTP_200_OK)
+        response[self.BACKEND_HEADER] = backend
+        return response
+
+    def search_postgres(self, src_number, dest_number, start_time, end_time, call_successful, call_duration,
+                        fields=None, src_prefix=None, dest_prefix=None):
+        """
+        Runs the search on the Cdr table with the semantics of `build_query`, for the query planner. It reads
+        from the primary: the planner falls back to PostgreSQL for the CDRs not indexed yet, which a lagging
+        replica may not have either.
 
         Returns:
-        - Response: A list of filtered CDRs or error message.
+        - list: Up to `SEARCH_SIZE` CDRs shaped like the Elasticsearch `_source` of a hit.
+        """
+        queryset = Cdr.objects.all()
+        if src_number:
+            queryset = queryset.filter(src_number=src_number)
+        if dest_number:
+            queryset = queryset.filter(dest_number=dest_number)
+        if src_prefix:
+            queryset = queryset.filter(src_number__range=self.prefix_range(src_prefix))
+        if dest_prefix:
+            queryset = queryset.filter(dest_number__range=self.prefix_range(dest_prefix))
+        if start_time:
+            queryset = queryset.filter(start_time__gte=start_time)
+        if end_time:
+            queryset = queryset.filter(end_time__lte=end_time)
+        if call_successful is not None:
+            queryset = queryset.filter(call_successful=call_successful)
+        if call_duration:
+            queryset = queryset.filter(call_duration=call_duration)
+        rows = queryset.order_by('id').values(*(fields or CdrSearchSerializer.CDR_FIELDS))[:self.SEARCH_SIZE]
+        with pin_to_primary():
+            rows = list(rows)
+        return [
+            {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+            for row in rows
+        ]
+
+    def validate_params(self, request):
+        """
+        Validates the query parameters against `ALLOWED_PARAMETERS` and `CdrSearchSerializer`.
+
+        Parameters:
+        - request: The incoming request.
+
+        Returns:
+        - tuple: The validated data and None, or None and the error Response to return.
+        """
+        # A plain dict, so that missing booleans stay missing instead of being read as unchecked checkboxes
+        return self.validate(request.GET.dict())
+
+    def validate(self, params):
+        """
+        Validates a dictionary of search parameters, see `validate_params`.
         """
-        params = request.GET.dict()
         invalid_params = [key for key in params.keys() if key not in self.ALLOWED_PARAMETERS]
         if invalid_params:
-            return Response(
+            return None, Response(
                 {"error": f"Invalid parameter(s): {', '.join(invalid_params)}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        serializer = CdrSearchSerializer(data=request.GET)
-        if serializer.is_valid():
-            validated_data = serializer.validated_data
-
-            if not validated_data:
-                return Response(
-                    {"error": "No valid parameters provided for search"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            src_number = validated_data.get('src_number')
-            dest_number = validated_data.get('dest_number')
-            start_time = validated_data.get('start_time')
-            end_time = validated_data.get('end_time')
-            call_successful = validated_data.get('call_successful')
-            call_duration = validated_data.get('call_duration')
-
-            query = self.build_query(src_number, dest_number, start_time, end_time, call_successful, call_duration)
-
-            try:
-                response = es.search(index="cdrs", body=query)
-                hits = response.get("hits", {}).get("hits", [])
-                if not hits:
-                    return Response({"message": "No results found."}, status=status.HTTP_404_NOT_FOUND)
-                cdrs = [hit["_source"] for hit in hits]
-                return Response(cdrs, status=status.HTTP_200_OK)
-            except Exception as e:
-                return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-    def build_query(self, src_number, dest_number, start_time, end_time, call_successful, call_duration):
+        serializer = CdrSearchSerializer(data=params)
+        if not serializer.is_valid():
+            return None, Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = serializer.validated_data
+        options = CdrSearchSerializer.PAGINATION_FIELDS + CdrSearchSerializer.OUTPUT_FIELDS
+        if not any(key not in options for key in validated_data):
+            return None, Response(
+                {"error": "No valid parameters provided for search"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return validated_data, None
+
+    def paginated_search(self, query, page_size, cursor=None, index=READ_ALIAS):
+        """
+        Returns one page of CDRs using a point in time and `search_after`, so deep pages cost the same as the first.
+
+        Parameters:
+        - query (dict): The Elasticsearch query built by `build_query`.
+        - page_size (int): Number of CDRs per page.
+        - cursor (str): The `next` token of the previous page, or None for the first page.
+        - index (str): The CDR indices the point in time is opened on, by `indices_for`.
+
+        Returns:
+        - Response: The `results` of the page and the `next` token.
+        """
+        try:
+            hits, next_cursor = search_page(es, index, query, page_size, cursor)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except NotFoundError:
+            return Response({"error": "The cursor has expired, restart the search without it."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if not hits and not cursor:
+            return Response({"message": "No results found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"results": [hit["_source"] for hit in hits], "next": next_cursor}, status=status.HTTP_200_OK)
+
+    def count(self, query, exists=False, count_limit=None, start_time=None, end_time=None):
+        """
+        Counts the CDRs matching the query without fetching any of them.
+
+        Parameters:
+        - query (dict): The Elasticsearch query built by `build_query`.
+        - exists (bool): Only check whether one CDR matches, every shard stops at its first match.
+        - count_limit (int): Count exactly up to this number, larger totals are reported as 'gte'.
+        - start_time, end_time (datetime): The time window of the query, used by the search cache and to pick
+          the indices searched.
+
+        Returns:
+        - Response: `exists`, or the `count` and its `relation`.
+        """
+        body = self.count_body(query, exists, count_limit)
+
+        def search():
+            response = es.search(**search_target(start_time, end_time), body=body)
+            return response.get("hits", {}).get("total", {"value": 0, "relation": "eq"})
+
+        try:
+            total = cached_search('cdr:count', body, search, start_time, end_time)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if exists:
+            return Response({"exists": total["value"] > 0}, status=status.HTTP_200_OK)
+        return Response({"count": total["value"], "relation": total["relation"]}, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def count_body(query, exists=False, count_limit=None):
+        """
+        Turns a query into a request that fetches no hits, only the total (or whether there is one).
+        """
+        if exists:
+            return {**query, "size": 0, "track_total_hits": 1, "terminate_after": 1}
+        return {**query, "size": 0, "track_total_hits": count_limit or True}
+
+    @staticmethod
+    def prefixes(validated_data):
+        """
+        Returns the number prefixes of the validated parameters, as keyword arguments of `build_query`.
+        """
+        return {'src_prefix': validated_data.get('src_prefix'), 'dest_prefix': validated_data.get('dest_prefix')}
+
+    @staticmethod
+    def prefix_range(prefix):
+        """
+        Returns the lowest and highest phone numbers starting with `prefix`, numbers are integers in PostgreSQL.
+        """
+        return prefix.ljust(PhoneNumberField.digits, '0'), prefix.ljust(PhoneNumberField.digits, '9')
+
+    def build_query(self, src_number, dest_number, start_time, end_time, call_successful, call_duration, fields=None,
+                    src_prefix=None, dest_prefix=None):
         """
         Builds the Elasticsearch query based on provided filters.
+        Phone numbers, the success flag and the duration are matched with exact `term` filters, and the
+        total number of hits is not tracked since only the hits themselves are returned. Number prefixes
+        are `term` filters too, on the `prefix` subfield indexing the leading digits of every number.
 
         Parameters:
         - src_number (str): Source phone number to filter by.
         - dest_number (str): Destination phone number to filter by.
         - call_successful (str): 'true' or 'false' to filter by call success status.
         - call_duration (int): The minimum call duration (in seconds) to filter CDRs.
+        - fields (list): The CDR fields to return, all of them when None.
+        - src_prefix (str): Leading digits of the source number to filter by.
+        - dest_prefix (str): Leading digits of the destination number to filter by.
 
         Returns:
         - dict: The Elasticsearch query with appropriate filters.
         """
-        query = {"query": {"bool": {"filter": []}}}
+        query = {"query": {"bool": {"filter": []}}, "track_total_hits": False}
+        if fields:
+            query["_source"] = {"includes": fields}
         if src_number:
-            query["query"]["bool"]["filter"].append({"match": {"src_number": src_number}})
+            query["query"]["bool"]["filter"].append({"term": {"src_number": src_number}})
         if dest_number:
-            query["query"]["bool"]["filter"].append({"match": {"dest_number": dest_number}})
+            query["query"]["bool"]["filter"].append({"term": {"dest_number": dest_number}})
+        if src_prefix:
+            query["query"]["bool"]["filter"].append({"term": {"src_number.prefix": src_prefix}})
+        if dest_prefix:
+            query["query"]["bool"]["filter"].append({"term": {"dest_number.prefix": dest_prefix}})
         if start_time:
             query["query"]["bool"]["filter"].append({"range": {"start_time": {"gte": start_time}}})
         if end_time:
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from apps.core.throttling import TokenBucketThrottle
+from apps.core.authentication import JWTAuthentication
+from apps.core.db_routers import ReplicaReadsMixin
+from apps.cdr.serializers.cdr_serializer import CdrTimeRangeSerializer
+from apps.core.sketch_store import hour_of, merged_sketches
+
+
+class CDRSketchStatsView(ReplicaReadsMixin, APIView):
+    """
+    This view provides approximate statistics of the CDRs started in a time range: the number of calls,
+    of distinct src and dest numbers (HyperLogLog) and the p50/p95/p99 call duration (DDSketch).
+    They are merged from the hourly sketches the consumer maintains, without reading any CDR,
+    so any range costs one row per hour.
+
+    Parameters (via GET request):
+    - from (datetime): Start of the range, widened to its hour (24 hours before `to` by default).
+    - to (datetime): End of the range, excluded (now by default).
+
+    Returns:
+    - Response: The range covered and its statistics.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [AllowAny]
+
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'default'
+
+    DEFAULT_RANGE = timedelta(hours=24)
+
+    def get(self, request):
+        """
+        Handles the GET request to retrieve the sketch statistics of a time range.
+
+        Returns:
+        - Response: The number of calls, distinct numbers and call duration percentiles, or an error message.
+        """
+        serializer = CdrTimeRangeSerializer(data=request.GET.dict())
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        end_time = serializer.validated_data.get('to', timezone.now())
+        start_time = hour_of(serializer.validated_data.get('from', end_time - self.DEFAULT_RANGE))
+        try:
+            stats = merged_sketches(start_time, end_time).stats()
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({"from": start_time, "to": end_time, **stats}, status=status.HTTP_200_OK)
@@ -2,18 +2,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-from rest_framework.throttling import ScopedRateThrottle
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from apps.core.throttling import TokenBucketThrottle
+from apps.core.authentication import JWTAuthentication
+from apps.core.db_routers import ReplicaReadsMixin
+from apps.cdr.serializers.cdr_serializer import CdrStatsSerializer
+from apps.core.cdr_indices import search_target
 from apps.core.os_setting_elastic import es
+from apps.core.search_cache import cached_search
 
 
-class CDRStatsView(APIView):
+class CDRStatsView(ReplicaReadsMixin, APIView):
     """
     This view provides statistics about CDRs, such as average call duration,
     and the number of successful and failed calls.
+    The statistics are kept in the search cache until new CDRs are ingested.
 
     Parameters (via GET request):
-    - None. This view only aggregates data from Elasticsearch.
+    - start_time (datetime): Only CDRs started from then, only the indices of the periods since are read.
+    - end_time (datetime): Only CDRs ended by then.
+    Both are optional, without them every CDR is aggregated.
 
     Returns:
     - Response: A dictionary containing average call duration, number of successful calls,
@@ -22,9 +29,33 @@ class CDRStatsView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [AllowAny]
 
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [TokenBucketThrottle]
     throttle_scope = 'default'
 
+    AGGREGATIONS = {
+        "aggs": {
+            "avg_duration": {
+                "avg": {
+                    "field": "call_duration"
+                }
+            },
+            "successful_calls": {
+                "filter": {
+                    "term": {
+                        "call_successful": True
+                    }
+                }
+            },
+            "failed_calls": {
+                "filter": {
+                    "term": {
+                        "call_successful": False
+                    }
+                }
+            }
+        }
+    }
+
     def get(self, request):
         """
         Handles the GET request to retrieve statistics about CDRs.
@@ -32,41 +63,43 @@ class CDRStatsView(APIView):
         Returns:
         - Response: A dictionary with statistics on average call duration, successful and failed calls.
         """
+        serializer = CdrStatsSerializer(data=request.GET.dict())
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        start_time = serializer.validated_data.get('start_time')
+        end_time = serializer.validated_data.get('end_time')
+        body = self.build_query(start_time, end_time)
 
-        try:
-            response = es.search(
-                index="cdrs",
-                body={
-                    "aggs": {
-                        "avg_duration": {
-                            "avg": {
-                                "field": "call_duration"
-                            }
-                        },
-                        "successful_calls": {
-                            "filter": {
-                                "term": {
-                                    "call_successful": True
-                                }
-                            }
-                        },
-                        "failed_calls": {
-                            "filter": {
-                                "term": {
-                                    "call_successful": False
-                                }
-                            }
-                        }
-                    }
-                }
-            )
-
-            stats = {
-                "average_call_duration": response['aggregations']['avg_duration']['value'],
-                "successful_calls": response['aggregations']['successful_calls']['doc_count'],
-                "failed_calls": response['aggregations']['failed_calls']['doc_count']
-            }
+        def aggregate():
+            return self.stats_from(es.search(**search_target(start_time, end_time), body=body))
 
+        try:
+            stats = cached_search('cdr:stats', body, aggregate, start_time, end_time)
             return Response(stats, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @classmethod
+    def build_query(cls, start_time=None, end_time=None):
+        """
+        Returns `AGGREGATIONS`, restricted to the CDRs started from `start_time` and ended by `end_time`.
+        """
+        filters = []
+        if start_time:
+            filters.append({"range": {"start_time": {"gte": start_time}}})
+        if end_time:
+            filters.append({"range": {"end_time": {"lte": end_time}}})
+        if not filters:
+            return cls.AGGREGATIONS
+        return {**cls.AGGREGATIONS, "query": {"bool": {"filter": filters}}}
+
+    @staticmethod
+    def stats_from(response):
+        """
+        Extracts the statistics from the Elasticsearch response to `AGGREGATIONS`.
+        """
+        return {
+            "average_call_duration": response['aggregations']['avg_duration']['value'],
+            "successful_calls": response['aggregations']['successful_calls']['doc_count'],
+            "failed_calls": response['aggregations']['failed_calls']['doc_count']
+        }
@@ -2,27 +2,32 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-from rest_framework.throttling import ScopedRateThrottle
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from apps.cdr.models import Cdr
+from apps.core.throttling import TokenBucketThrottle
+from apps.core.authentication import JWTAuthentication
+from apps.core.db_routers import ReplicaReadsMixin
 from apps.core.os_setting_elastic import es
+from apps.core.row_counts import COUNT_MODES, COUNTER, ESTIMATE, count_cdrs
 
 
-class CDRSyncStatusView(APIView):
+class CDRSyncStatusView(ReplicaReadsMixin, APIView):
     """
     This view checks if the CDRs are in sync between the Django database and Elasticsearch.
+    The database side is read from the per-day CDR counters by default, so the check takes the same
+    time whatever the size of the Cdr table.
 
     Parameters (via GET request):
-    - None. This view compares the count of CDRs in the database and Elasticsearch.
+    - count (str): How the CDRs of the database are counted: 'counter' (default, exact), 'estimate'
+      (PostgreSQL table statistics) or 'exact' (count(*) on the table).
 
     Returns:
     - Response: A status message indicating whether the data is synced or not, along with the counts
-                from both the database and Elasticsearch.
+                from both the database and Elasticsearch, how the database was counted and whether
+                that count is exact. An estimated count cannot prove the data synced, its status is 'estimated'.
     """
     authentication_classes = [JWTAuthentication]
     permission_classes = [AllowAny]
 
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [TokenBucketThrottle]
     throttle_scope = 'default'
 
     def get(self, request):
@@ -32,19 +37,31 @@ class CDRSyncStatusView(APIView):
         Returns:
         - Response: A message indicating the sync status, and counts from the database and Elasticsearch.
         """
+        mode = request.GET.get('count', COUNTER)
+        if mode not in COUNT_MODES:
+            return Response({"error": f"count must be one of {', '.join(COUNT_MODES)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            cdr_count_db = Cdr.objects.count()
+            cdr_count_db, mode = count_cdrs(mode)
             cdr_count_es = es.count(index="cdrs")['count']
-
-            # Check if counts match
-            if cdr_count_db == cdr_count_es:
-                return Response({"status": "synced"}, status=status.HTTP_200_OK)
-            else:
-                return Response({
-                    "status": "out_of_sync",
-                    "db_count": cdr_count_db,
-                    "es_count": cdr_count_es
-                }, status=status.HTTP_400_BAD_REQUEST)
+            data, status_code = self.sync_status(cdr_count_db, cdr_count_es, mode)
+            return Response(data, status=status_code)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @staticmethod
+    def sync_status(cdr_count_db, cdr_count_es, mode):
+        """
+        Compares the counts of the database and Elasticsearch.
+
+        Returns:
+        - tuple: The response data and its HTTP status.
+        """
+        counts = {"db_count": cdr_count_db, "es_count": cdr_count_es, "count_mode": mode, "exact": mode != ESTIMATE}
+        if mode == ESTIMATE:
+            return {"status": "estimated", **counts}, status.HTTP_200_OK
+        # Check if counts match
+        if cdr_count_db == cdr_count_es:
+            return {"status": "synced", **counts}, status.HTTP_200_OK
+        return {"status": "out_of_sync", **counts}, status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,132 @@
+import math
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from apps.core.throttling import TokenBucketThrottle
+from apps.core.authentication import JWTAuthentication
+from apps.core.db_routers import ReplicaReadsMixin
+from apps.cdr.serializers.cdr_serializer import CdrTimeseriesSerializer
+from apps.core.cdr_indices import search_target
+from apps.core.os_setting_elastic import es
+from apps.core.search_cache import TIMESERIES_PREFIX, cached_buckets
+
+
+class CDRTimeseriesView(ReplicaReadsMixin, APIView):
+    """
+    This view provides CDR statistics per time bucket: number of calls, average and total call duration,
+    and the ratio of successful calls, bucketed on start_time (UTC).
+    Buckets are aligned on the interval, `from` and `to` are widened to the buckets they fall in.
+    Closed buckets are not expected to change, they are cached and only the open ones are sent to Elasticsearch.
+
+    Parameters (via GET request):
+    - interval (str): Length of a bucket, one of 1m, 5m, 15m, 1h, 6h, 1d (1h by default).
+    - from (datetime): Start of the series (24 buckets before `to` by default).
+    - to (datetime): End of the series (now by default).
+
+    Returns:
+    - Response: The `interval` and the list of `buckets`, oldest first.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [AllowAny]
+
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'default'
+
+    DEFAULT_BUCKETS = 24
+    MAX_BUCKETS = 2000
+
+    def get(self, request):
+        """
+        Handles the GET request to retrieve the CDR time series.
+
+        Returns:
+        - Response: The statistics of every bucket between `from` and `to`, or an error message.
+        """
+        serializer = CdrTimeseriesSerializer(data=request.GET.dict())
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        name = serializer.validated_data['interval']
+        interval = CdrTimeseriesSerializer.INTERVALS[name]
+        now = time.time()
+        end = serializer.validated_data['to'].timestamp() if 'to' in serializer.validated_data else now
+        stop = int(math.ceil(end / interval) * interval)
+        start = (serializer.validated_data['from'].timestamp() if 'from' in serializer.validated_data
+                 else stop - self.DEFAULT_BUCKETS * interval)
+        starts = list(range(int(start // interval * interval), stop, interval))
+        if len(starts) > self.MAX_BUCKETS:
+            return Response(
+                {"error": f"The series is limited to {self.MAX_BUCKETS} buckets, use a longer interval."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        def search(first, last):
+            # Only the period indices of the buckets are searched, the read alias past CDR_INDICES['MAX_SEARCHED'].
+            target = search_target(datetime.fromtimestamp(first, dt_timezone.utc),
+                                   datetime.fromtimestamp(last + interval - 1, dt_timezone.utc))
+            response = es.search(**target, body=self.build_query(name, first, last + interval))
+            return {bucket['key'] // 1000: self.bucket_from(bucket)
+                    for bucket in response['aggregations']['timeseries']['buckets']}
+
+        try:
+            buckets = cached_buckets(TIMESERIES_PREFIX, interval, starts, search, now)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        empty = self.bucket_from({"doc_count": 0})
+        return Response({
+            "interval": name,
+            "buckets": [{"start": self.isoformat(start), **buckets.get(start, empty)} for start in starts],
+        }, status=status.HTTP_200_OK)
+
+    @classmethod
+    def build_query(cls, interval, first, end):
+        """
+        Builds the `date_histogram` query of the buckets starting from `first` to `end` (epoch seconds, excluded).
+        """
+        return {
+            "size": 0,
+            "query": {
+                "range": {
+                    "start_time": {"gte": cls.isoformat(first), "lt": cls.isoformat(end)}
+                }
+            },
+            "aggs": {
+                "timeseries": {
+                    "date_histogram": {
+                        "field": "start_time",
+                        "fixed_interval": interval,
+                        "min_doc_count": 0,
+                        "extended_bounds": {"min": first * 1000, "max": (end - 1) * 1000}
+                    },
+                    "aggs": {
+                        "avg_duration": {"avg": {"field": "call_duration"}},
+                        "total_duration": {"sum": {"field": "call_duration"}},
+                        "successful_calls": {"filter": {"term": {"call_successful": True}}}
+                    }
+                }
+            }
+        }
+
+    @staticmethod
+    def bucket_from(bucket):
+        """
+        Extracts the statistics of one `date_histogram` bucket.
+        """
+        calls = bucket['doc_count']
+        successful = bucket.get('successful_calls', {}).get('doc_count', 0)
+        return {
+            "calls": calls,
+            "average_call_duration": bucket.get('avg_duration', {}).get('value'),
+            "total_call_duration": bucket.get('total_duration', {}).get('value', 0),
+            "successful_calls": successful,
+            "success_ratio": successful / calls if calls else None,
+        }
+
+    @staticmethod
+    def isoformat(timestamp):
+        return datetime.fromtimestamp(timestamp, dt_timezone.utc).isoformat()
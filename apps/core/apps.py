@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.core'
+
+    def ready(self):
+        from elasticsearch_dsl.connections import connections
+
+        from apps.core.elastic import ElasticsearchProxy
+
+        # django_elasticsearch_dsl (documents, signal processor, search_index) uses the shared clients too.
+        for alias in settings.ELASTICSEARCH_DSL:
+            connections.add_connection(alias, ElasticsearchProxy(alias))
@@ -0,0 +1,44 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+from apps.core.throttling import TokenBucketThrottle
+from apps.core.authentication import JWTAuthentication
+from apps.core.db_routers import use_replicas
+
+
+class AsyncAPIView(View):
+    """
+    Base class of the async (ASGI) API views.
+
+    DRF's APIView cannot run async handlers, so this plain Django view applies the same JWT
+    authentication and scoped throttling as the sync views (in one thread hop, both touch the
+    database or the cache), then awaits the `async def get` of the subclass, which returns a JsonResponse.
+    The views only read, their queries go to the replicas (see `apps.core.db_routers`).
+    """
+    authentication_classes = [JWTAuthentication]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'default'
+
+    async def dispatch(self, request, *args, **kwargs):
+        with use_replicas():
+            return await self._dispatch(request, *args, **kwargs)
+
+    async def _dispatch(self, request, *args, **kwargs):
+        request = Request(request, authenticators=[auth() for auth in self.authentication_classes])
+        try:
+            await sync_to_async(self.initial)(request)
+        except exceptions.APIException as e:
+            response = JsonResponse({"detail": str(e.detail)}, status=e.status_code)
+            if getattr(e, 'wait', None):
+                response['Retry-After'] = str(int(e.wait))
+            return response
+        return await super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request):
+        """Authenticate the request and apply the throttles, like `APIView.initial`."""
+        request.user  # noqa: B018 - runs the authenticators
+        for throttle in [throttle() for throttle in self.throttle_classes]:
+            if not throttle.allow_request(request, self):
+                raise exceptions.Throttled(throttle.wait())
@@ -0,0 +1,11 @@
+from rest_framework_simplejwt import authentication
+
+from apps.core.server_timing import timed
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """simplejwt's JWT authentication, its time (token check and user lookup) is the `auth` phase of the request."""
+
+    @timed('auth')
+    def authenticate(self, request):
+        return super().authenticate(request)
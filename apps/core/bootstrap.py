@@ -0,0 +1,19 @@
+import os
+
+"""Settings module used when the environment names none, as in manage.py."""
+DEFAULT_SETTINGS_MODULE = 'config.settings'
+
+
+def setup_django():
+    """
+    Configure the settings and load the apps (models, signal receivers, documents), once per process.
+    Components needing the ORM call it when they first need it, so importing them stays cheap;
+    under manage.py, Celery or a WSGI/ASGI server Django is already set up and this returns at once.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', DEFAULT_SETTINGS_MODULE)
+    from django.apps import apps
+
+    if not apps.ready:
+        import django
+
+        django.setup()
@@ -0,0 +1,185 @@
+import heapq
+import itertools
+import logging
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from elastic_transport import TransportError
+from elasticsearch import ApiError
+from elasticsearch.helpers import expand_action
+
+from apps.core.elastic import ElasticsearchProxy
+
+logger = logging.getLogger(__name__)
+
+"""Status of a bulk item (or of a whole _bulk request) rejected by a full write queue, worth sending again."""
+REJECTED = 429
+
+"""Statuses of a whole _bulk request failing on a busy or restarting cluster, worth sending again."""
+UNAVAILABLE = (502, 503, 504)
+
+
+def bulk_settings():
+    return getattr(settings, 'BULK_INDEXER', {})
+
+
+class BulkResult:
+    """Outcome of `BulkIndexer.index`: documents indexed, failed and retry attempts, and the ids that failed."""
+
+    def __init__(self):
+        self.indexed = 0
+        self.failed = 0
+        self.retried = 0
+        self.failed_ids = []
+
+    def as_dict(self):
+        return {'indexed': self.indexed, 'failed': self.failed, 'retried': self.retried,
+                'failed_ids': self.failed_ids}
+
+    def __repr__(self):
+        return f'BulkResult(indexed={self.indexed}, failed={self.failed}, retried={self.retried})'
+
+
+class BulkIndexer:
+    """
+    Sends bulk actions (in the format of `elasticsearch.helpers.bulk`) to Elasticsearch.
+
+    - Every action is serialized once; a chunk is sent when it holds CHUNK_DOCS actions or CHUNK_BYTES bytes.
+    - Up to MAX_IN_FLIGHT chunks are sent at a time by a thread pool.
+    - Items rejected with 429, and chunks rejected as a whole (429, 502, 503, 504, or no response at all:
+      connection errors and timeouts), go back in the queue and are sent again after an exponential backoff
+      with jitter, at most MAX_RETRIES times; other item errors are failures.
+    - The number of chunks in flight adapts to the rejections (AIMD): it is halved when a chunk comes back
+      with rejected items or fails as a whole, and grows by one after as many clean chunks as are in flight.
+
+    Chunks are built and responses handled in the calling thread, the pool threads only send requests.
+    """
+
+    def __init__(self, client=None, index=None, chunk_docs=None, chunk_bytes=None, max_in_flight=None,
+                 max_retries=None):
+        config = bulk_settings()
+        self.client = client or ElasticsearchProxy()
+        self.default_index = index
+        self.chunk_docs = chunk_docs or config.get('CHUNK_DOCS', 1000)
+        self.chunk_bytes = chunk_bytes or config.get('CHUNK_BYTES', 5 * 1024 * 1024)
+        self.max_in_flight = max_in_flight or config.get('MAX_IN_FLIGHT', 4)
+        self.max_retries = config.get('MAX_RETRIES', 5) if max_retries is None else max_retries
+        self.backoff = config.get('BACKOFF', 0.5)
+        self.max_backoff = config.get('MAX_BACKOFF', 30.0)
+        self.in_flight = self.max_in_flight
+        self._clean_chunks = 0
+        self._source, self._carry, self._source_done = None, None, True
+
+    def entries(self, actions):
+        """
+        Serialize the actions. An entry is a list: the document id, the request lines, their size in bytes
+        and the number of attempts so far.
+        """
+        serializer = self.client.transport.serializers.get_serializer('application/json')
+        for action in actions:
+            header, source = expand_action(action)
+            meta = next(iter(header.values()))
+            if self.default_index and '_index' not in meta:
+                meta['_index'] = self.default_index
+            lines = [serializer.dumps(header)] + ([] if source is None else [serializer.dumps(source)])
+            yield [meta.get('_id'), lines, sum(len(line) + 1 for line in lines), 0]
+
+    def index(self, actions):
+        """
+        Send every action and wait for all of them, retries included.
+
+        :return: A `BulkResult`.
+        """
+        self._source, self._carry, self._source_done = self.entries(actions), None, False
+        result, retries, order, futures = BulkResult(), [], itertools.count(), {}
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='bulk-indexer') as pool:
+            while True:
+                while len(futures) < self.in_flight:
+                    chunk = self.next_chunk(retries)
+                    if not chunk:
+                        break
+                    futures[pool.submit(self.send, chunk)] = chunk
+                if not futures:
+                    if not retries:
+                        break
+                    time.sleep(max(0.0, retries[0][0] - time.monotonic()))
+                    continue
+                timeout = max(0.0, retries[0][0] - time.monotonic()) if retries else None
+                done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.handle(futures.pop(future), future, result, retries, order)
+        return result
+
+    def next_chunk(self, retries):
+        """Take the next entries to send: the one left over by the last chunk, retries that are due, then new ones."""
+        chunk, size, now = [], 0, time.monotonic()
+        while len(chunk) < self.chunk_docs:
+            if self._carry is not None:
+                entry, self._carry = self._carry, None
+            elif retries and retries[0][0] <= now:
+                entry = heapq.heappop(retries)[2]
+            elif not self._source_done:
+                entry = next(self._source, None)
+                if entry is None:
+                    self._source_done = True
+                    break
+            else:
+                break
+            if chunk and size + entry[2] > self.chunk_bytes:
+                self._carry = entry
+                break
+            chunk.append(entry)
+            size += entry[2]
+        return chunk
+
+    def send(self, chunk):
+        return self.client.bulk(operations=[line for entry in chunk for line in entry[1]])
+
+    def handle(self, chunk, future, result, retries, order):
+        """Count the items of a chunk that came back, queue the rejected ones again and adapt the chunks in flight."""
+        retryable = (REJECTED,)
+        try:
+            items = [next(iter(item.values())) for item in future.result()['items']]
+        except ApiError as e:
+            logger.warning("Bulk request of %d documents failed: %s", len(chunk), e)
+            items = [{'status': e.status_code}] * len(chunk)
+            retryable = (REJECTED, *UNAVAILABLE)
+        except TransportError as e:
+            logger.warning("Bulk request of %d documents failed: %s", len(chunk), e)
+            items = [{'status': None}] * len(chunk)
+            retryable = (None,)
+        except Exception:
+            logger.exception("Bulk request of %d documents failed", len(chunk))
+            items = [{'status': None}] * len(chunk)
+
+        rejected = 0
+        for entry, item in zip(chunk, items):
+            status = item.get('status')
+            if status is not None and 200 <= status < 300:
+                result.indexed += 1
+                continue
+            if status in retryable:
+                rejected += 1
+                if entry[3] < self.max_retries:
+                    entry[3] += 1
+                    result.retried += 1
+                    delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (entry[3] - 1)))
+                    heapq.heappush(retries, (time.monotonic() + delay, next(order), entry))
+                    continue
+            result.failed += 1
+            result.failed_ids.append(entry[0] if entry[0] is not None else item.get('_id'))
+        self.adapt(rejected)
+
+    def adapt(self, rejected):
+        """Halve the chunks in flight after rejections, add one after a round of clean chunks."""
+        if rejected:
+            self.in_flight = max(1, self.in_flight // 2)
+            self._clean_chunks = 0
+            return
+        self._clean_chunks += 1
+        if self._clean_chunks >= self.in_flight and self.in_flight < self.max_in_flight:
+            self.in_flight += 1
+            self._clean_chunks = 0
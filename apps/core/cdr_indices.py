@@ -0,0 +1,118 @@
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+"""Alias of every CDR index, searched when a query has no start_time to prune on."""
+READ_ALIAS = 'cdrs'
+
+"""Alias of the index of the current period, where documents without a start_time are written."""
+WRITE_ALIAS = 'cdrs_write'
+
+"""Index template giving every index matching INDEX_PATTERN the CdrDocument mapping and the read alias."""
+TEMPLATE_NAME = 'cdrs'
+INDEX_PATTERN = 'cdrs-*'
+
+"""Names of the period indices, by period: cdrs-2024.01 or cdrs-2024.01.31."""
+PERIOD_FORMATS = {'month': 'cdrs-%Y.%m', 'day': 'cdrs-%Y.%m.%d'}
+
+"""A list of period indices may name periods without any CDR, whose index was never created."""
+SEARCH_OPTIONS = {'ignore_unavailable': True, 'allow_no_indices': True}
+
+
+def index_settings():
+    return getattr(settings, 'CDR_INDICES', {})
+
+
+def period():
+    value = index_settings().get('PERIOD', 'month')
+    if value not in PERIOD_FORMATS:
+        raise ImproperlyConfigured(f"CDR_INDICES['PERIOD'] must be one of {', '.join(PERIOD_FORMATS)}, not {value!r}.")
+    return value
+
+
+def period_start(value):
+    """Return the first instant (UTC) of the period holding an aware datetime."""
+    value = value.astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(day=1) if period() == 'month' else value
+
+
+def next_period(start):
+    """Return the first instant of the period following the one starting at `start`."""
+    if period() == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def index_name(value, generation=None):
+    """
+    Return the name of the index holding the CDRs starting at `value`. With a `generation`, the name of the
+    index of that period built by a reindex (cdrs_<generation>-2024.01), outside of the template pattern until
+    `reindex_cdrs` turns the period name into its alias.
+    """
+    name = value.astimezone(dt_timezone.utc).strftime(PERIOD_FORMATS[period()])
+    return name if generation is None else f'{READ_ALIAS}_{generation}{name[len(READ_ALIAS):]}'
+
+
+def indices_for(start_time=None, end_time=None, now=None):
+    """
+    Return the indices holding the CDRs started from `start_time` and ended by `end_time`, comma separated.
+
+    CDRs are indexed by the period of their start time, so those are the periods from the one of `start_time`
+    to the one of `end_time`, or to the period after the current one without `end_time` (clocks of the
+    switches running ahead). Without `start_time`, or past CDR_INDICES['MAX_SEARCHED'] periods, the read alias.
+    """
+    if start_time is None:
+        return READ_ALIAS
+    first = period_start(start_time)
+    last = period_start(end_time) if end_time is not None else next_period(period_start(now or timezone.now()))
+    names, current = [index_name(first)], next_period(first)
+    while current <= last:
+        if len(names) >= index_settings().get('MAX_SEARCHED', 36):
+            return READ_ALIAS
+        names.append(index_name(current))
+        current = next_period(current)
+    return ','.join(names)
+
+
+def search_target(start_time=None, end_time=None):
+    """Return the `index` and options of a search of the CDRs between `start_time` and `end_time`."""
+    return {'index': indices_for(start_time, end_time), **SEARCH_OPTIONS}
+
+
+def template_body():
+    """Return the index template of the period indices: the settings and mapping of CdrDocument, the read alias."""
+    from apps.core.documents import CdrDocument
+
+    return {
+        'index_patterns': [INDEX_PATTERN],
+        'template': {**CdrDocument._index.to_dict(), 'aliases': {READ_ALIAS: {}}},
+        'priority': 100,
+    }
+
+
+def rollover(es, now=None):
+    """
+    Install the index template, create the indices of the current and the next period when missing
+    and move the write alias to the current one. Indices are created by the template whenever a CDR of
+    a new period is written anyway; creating them ahead keeps that off the indexing path.
+
+    :return: The names of the current and the next period indices.
+    """
+    current = period_start(now or timezone.now())
+    names = [index_name(current), index_name(next_period(current))]
+    es.indices.put_index_template(name=TEMPLATE_NAME, **template_body())
+    for name in names:
+        if not es.indices.exists(index=name):
+            es.indices.create(index=name)
+
+    # After a reindex the period name is an alias, the write alias goes to the index behind it.
+    current_index = next(iter(es.indices.get_alias(index=names[0])))
+    actions = []
+    if es.indices.exists_alias(name=WRITE_ALIAS):
+        actions = [{'remove': {'index': index, 'alias': WRITE_ALIAS}}
+                   for index in es.indices.get_alias(name=WRITE_ALIAS) if index != current_index]
+    actions.append({'add': {'index': current_index, 'alias': WRITE_ALIAS, 'is_write_index': True}})
+    es.indices.update_aliases(actions=actions)
+    return names
@@ -0,0 +1,140 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+# Context variables rather than thread locals, so that the ORM calls of async views, run in a thread by
+# sync_to_async, see the routing of the request.
+_pinned = ContextVar('pinned', default=False)
+_replicas = ContextVar('replicas', default=False)
+
+"""Session key of the time until which an admin user who saved a change reads from the primary."""
+PRIMARY_UNTIL_SESSION_KEY = 'db_primary_until'
+
+
+@contextmanager
+def pin_to_primary():
+    """
+    Route every read issued in the block to the primary database, even inside `use_replicas()`.
+    Used by the code that must never read from a lagging replica.
+    """
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+@contextmanager
+def use_replicas():
+    """
+    Allow the reads issued in the block to go to the read replicas. Reads go to the primary everywhere
+    else (Celery tasks, management commands, admin change forms), replicas are opt-in for code that can
+    tolerate up to DB_REPLICA_MAX_LAG seconds of staleness.
+    """
+    token = _replicas.set(True)
+    try:
+        yield
+    finally:
+        _replicas.reset(token)
+
+
+class ReplicaReadsMixin:
+    """
+    Mixin of the read-only API views: the requests with a method of `replica_methods` read from the replicas.
+    """
+    replica_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in self.replica_methods:
+            return super().dispatch(request, *args, **kwargs)
+        with use_replicas():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaChangelistMixin:
+    """
+    Mixin of the ModelAdmins whose change lists read from the replicas. After an admin user saves or deletes
+    anything through this admin, their change lists read from the primary for DB_REPLICA_MAX_LAG seconds,
+    so that they see their own change; the change forms and every POST always use the primary.
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method == 'POST':
+            return self._pin_after_write(request, super().changelist_view(request, extra_context))
+        if request.session.get(PRIMARY_UNTIL_SESSION_KEY, 0) > time.time():
+            return super().changelist_view(request, extra_context)
+        with use_replicas():
+            response = super().changelist_view(request, extra_context)
+            # The rows are read when the template is rendered, which Django defers past this method.
+            return response.render() if hasattr(response, 'render') else response
+
+    def changeform_view(self, request, *args, **kwargs):
+        response = super().changeform_view(request, *args, **kwargs)
+        return self._pin_after_write(request, response) if request.method == 'POST' else response
+
+    def delete_view(self, request, *args, **kwargs):
+        response = super().delete_view(request, *args, **kwargs)
+        return self._pin_after_write(request, response) if request.method == 'POST' else response
+
+    def _pin_after_write(self, request, response):
+        request.session[PRIMARY_UNTIL_SESSION_KEY] = time.time() + settings.DB_REPLICA_MAX_LAG
+        return response
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads made inside `use_replicas()` to the read replicas (`replica_<n>` aliases),
+    every other read and every write to `default`.
+
+    Before a replica is used its replication lag is checked (and cached for DB_REPLICA_LAG_CHECK_INTERVAL
+    seconds); replicas lagging more than DB_REPLICA_MAX_LAG seconds, or unreachable ones, are skipped.
+    Reads fall back to the primary when no replica qualifies, inside a transaction on the primary,
+    or inside `pin_to_primary()`.
+    """
+
+    LAG_QUERY = (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    )
+
+    def __init__(self):
+        self._lag = {}
+
+    def replicas(self):
+        """Return the aliases of the configured read replicas."""
+        return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+    def replica_lag(self, alias):
+        """Return the replication lag of a replica in seconds (infinite if it cannot be measured)."""
+        checked_at, lag = self._lag.get(alias, (0, None))
+        if lag is not None and time.monotonic() - checked_at < settings.DB_REPLICA_LAG_CHECK_INTERVAL:
+            return lag
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(self.LAG_QUERY)
+                lag = float(cursor.fetchone()[0])
+        except DatabaseError as e:
+            print(f"Replica {alias} is unavailable: {e}")
+            lag = float('inf')
+        self._lag[alias] = (time.monotonic(), lag)
+        return lag
+
+    def db_for_read(self, model, **hints):
+        if not _replicas.get() or _pinned.get() or connections['default'].in_atomic_block:
+            return 'default'
+        healthy = [alias for alias in self.replicas() if self.replica_lag(alias) <= settings.DB_REPLICA_MAX_LAG]
+        return random.choice(healthy) if healthy else 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -1,28 +1,51 @@
-from elasticsearch import Elasticsearch
-from django_elasticsearch_dsl import Document
+from django_elasticsearch_dsl import Document, fields
+from elasticsearch_dsl import analyzer, tokenizer
+from django_elasticsearch_dsl.documents import model_field_class_to_field_class
 from django_elasticsearch_dsl.registries import registry
 from apps.cdr.models import Cdr
-from elasticsearch.helpers import bulk
+from apps.core.cdr_indices import READ_ALIAS, WRITE_ALIAS, index_name, index_settings
+from apps.core.fields import PhoneNumberField
+from apps.core.bulk_indexer import BulkIndexer
 
-es = Elasticsearch([{'scheme': 'http', 'host': 'localhost', 'port': 9200}])
+
+"""Shortest number prefix that can be searched, a shorter one would match most of the index."""
+MIN_PREFIX_LENGTH = 4
+
+"""Indexes every leading run of 4 to 11 digits of a phone number, so a prefix search is a single term lookup."""
+number_prefix = analyzer(
+    'number_prefix',
+    tokenizer=tokenizer('number_prefix', 'edge_ngram', min_gram=MIN_PREFIX_LENGTH, max_gram=11, token_chars=['digit']),
+)
+
+
+def phone_number_field(attr=None):
+    """Phone numbers are keywords, with a `prefix` subfield holding their leading digits."""
+    return fields.KeywordField(
+        attr=attr, fields={'prefix': fields.TextField(analyzer=number_prefix, search_analyzer='keyword')})
 
 
 @registry.register_document
 class CdrDocument(Document):
     """CdrDocument is a class that defines how CDR (Call Data Record) data should be indexed
-    and stored in Elasticsearch."""
+    and stored in Elasticsearch.
+
+    Every CDR goes to the index of the period of its start time (cdrs-YYYY.MM), created from the
+    `cdrs` index template, and is searched through the `cdrs` alias (see apps.core.cdr_indices)."""
 
     class Index:
-        """Define settings for the Elasticsearch index."""
-        name = 'cdrs'
+        """Define settings for the Elasticsearch indices, applied to the period indices by the index template."""
+        name = READ_ALIAS
         settings = {
-            'number_of_shards': 1,
-            'number_of_replicas': 1
+            'number_of_shards': index_settings().get('SHARDS', 1),
+            'number_of_replicas': index_settings().get('REPLICAS', 1)
         }
         mapping = {
             'properties': {
-                'src_number': {'type': 'keyword'},
-                'dest_number': {'type': 'keyword'},
+                'id': {'type': 'long'},
+                'src_number': {'type': 'keyword', 'fields': {'prefix': {'type': 'text', 'analyzer': 'number_prefix',
+                                                                        'search_analyzer': 'keyword'}}},
+                'dest_number': {'type': 'keyword', 'fields': {'prefix': {'type': 'text', 'analyzer': 'number_prefix',
+                                                                         'search_analyzer': 'keyword'}}},
                 'call_duration': {'type': 'integer'},
                 'start_time': {'type': 'date'},
                 'end_time': {'type': 'date'},
@@ -36,6 +59,7 @@ class CdrDocument(Document):
         """Maps the Django model to the Elasticsearch document."""
         model = Cdr
         fields = [
+            'id',
             'src_number',
             'dest_number',
             'call_duration',
@@ -59,9 +83,24 @@ class CdrDocument(Document):
         }
 
     @classmethod
-    def bulk_index(cls, documents):
-        """Bulk index the documents into Elasticsearch."""
-        success, failed = bulk(es, documents, index="cdrs")
-        print(f"Successfully indexed {success} documents.")
-        if failed:
-            print(f"Failed to index {failed} documents.")
+    def get_model_field_class_to_field_class(cls):
+        """Phone numbers are stored as integers in PostgreSQL but indexed as keywords, with a prefix subfield."""
+        return {**model_field_class_to_field_class, PhoneNumberField: phone_number_field}
+
+    def _prepare_action(self, object_instance, action):
+        """Write (and delete) every CDR in the index of its period rather than in the read alias."""
+        return {**super()._prepare_action(object_instance, action), '_index': index_name(object_instance.start_time)}
+
+    @classmethod
+    def bulk_index(cls, documents, **options):
+        """
+        Bulk index the documents into Elasticsearch, in the current period index unless they carry an `_index`.
+        The options are those of `BulkIndexer` (chunk_docs, chunk_bytes, max_in_flight, max_retries).
+
+        :return: The `BulkResult`: indexed, failed and retried counts and the ids that failed.
+        """
+        result = BulkIndexer(cls._get_connection(), index=WRITE_ALIAS, **options).index(documents)
+        print(f"Successfully indexed {result.indexed} documents.")
+        if result.failed:
+            print(f"Failed to index {result.failed} documents: {result.failed_ids[:10]}")
+        return result
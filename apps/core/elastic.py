@@ -0,0 +1,166 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from elastic_transport import AsyncTransport, ConnectionError, ConnectionTimeout, Transport
+from elastic_transport.client_utils import DEFAULT, resolve_default
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+
+from apps.core.server_timing import timed
+
+try:
+    from elasticsearch import OrjsonSerializer
+except ImportError:  # pragma: no cover - orjson is an optional dependency
+    OrjsonSerializer = None
+
+
+def retry_delay(attempt):
+    """Return the seconds to wait before retry number `attempt` (0 based): exponential backoff with full jitter."""
+    backoff = getattr(settings, 'ELASTICSEARCH_RETRY_BACKOFF', {})
+    return random.uniform(0, min(backoff.get('MAX', 10.0), backoff.get('FACTOR', 0.2) * 2 ** attempt))
+
+
+def should_retry(error, retry_on_timeout):
+    """Check whether a failed attempt may be retried."""
+    if isinstance(error, ConnectionTimeout):
+        return retry_on_timeout
+    return isinstance(error, ConnectionError)
+
+
+class BackoffTransport(Transport):
+    """
+    Transport waiting between retries. The base transport retries `retry_on_status` responses and
+    connection errors immediately, which only adds load to a cluster answering 429 or 503; here every
+    attempt is a single try of the base transport followed by `retry_delay` seconds of sleep.
+    The time of every request, retries included, is the `es` phase of the request being served.
+    """
+
+    @timed('es')
+    def perform_request(self, method, target, *, max_retries=DEFAULT, retry_on_status=DEFAULT,
+                        retry_on_timeout=DEFAULT, **kwargs):
+        max_retries = resolve_default(max_retries, self.max_retries)
+        retry_on_status = resolve_default(retry_on_status, self.retry_on_status)
+        retry_on_timeout = resolve_default(retry_on_timeout, self.retry_on_timeout)
+        for attempt in range(max_retries + 1):
+            try:
+                response = super().perform_request(
+                    method, target, max_retries=0, retry_on_status=retry_on_status,
+                    retry_on_timeout=retry_on_timeout, **kwargs)
+            except (ConnectionError, ConnectionTimeout) as e:
+                if attempt >= max_retries or not should_retry(e, retry_on_timeout):
+                    raise
+            else:
+                if attempt >= max_retries or response.meta.status not in retry_on_status:
+                    return response
+            time.sleep(retry_delay(attempt))
+
+
+class AsyncBackoffTransport(AsyncTransport):
+    """Async version of `BackoffTransport`. The time of every request, retries included, is the `es` phase."""
+
+    async def perform_request(self, method, target, *, max_retries=DEFAULT, retry_on_status=DEFAULT,
+                              retry_on_timeout=DEFAULT, **kwargs):
+        max_retries = resolve_default(max_retries, self.max_retries)
+        retry_on_status = resolve_default(retry_on_status, self.retry_on_status)
+        retry_on_timeout = resolve_default(retry_on_timeout, self.retry_on_timeout)
+        with timed('es'):
+            for attempt in range(max_retries + 1):
+                try:
+                    response = await super().perform_request(
+                        method, target, max_retries=0, retry_on_status=retry_on_status,
+                        retry_on_timeout=retry_on_timeout, **kwargs)
+                except (ConnectionError, ConnectionTimeout) as e:
+                    if attempt >= max_retries or not should_retry(e, retry_on_timeout):
+                        raise
+                else:
+                    if attempt >= max_retries or response.meta.status not in retry_on_status:
+                        return response
+                await asyncio.sleep(retry_delay(attempt))
+
+
+def client_options(alias='default'):
+    """
+    Return the keyword arguments of the client of a connection alias in settings.ELASTICSEARCH_DSL:
+    hosts (a comma separated string or a list, requests are spread over them round-robin), pool size,
+    compression, timeouts and retries. Responses are parsed with orjson when it is installed.
+    """
+    options = dict(settings.ELASTICSEARCH_DSL[alias])
+    if isinstance(options.get('hosts'), str):
+        options['hosts'] = [host.strip() for host in options['hosts'].split(',') if host.strip()]
+    if OrjsonSerializer is not None:
+        options.setdefault('serializer', OrjsonSerializer())
+    return options
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_es(alias='default'):
+    """
+    Return the Elasticsearch client of this process for a connection alias, creating it on first use.
+    Clients (and their connection pools) are never shared with forked children, which build their own.
+    """
+    key = (os.getpid(), alias)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = Elasticsearch(**client_options(alias), transport_class=BackoffTransport)
+                _clients[key] = client
+    return client
+
+
+async def _close_with_loop(client):
+    """Async generator suspended for the lifetime of its event loop, closing `client` when the loop shuts down."""
+    try:
+        yield
+    finally:
+        await client.close()
+
+
+def get_async_es(alias='default'):
+    """
+    Return the AsyncElasticsearch client of the running event loop, creating it on first use.
+    Every async view of a worker shares its pool of ES_ASYNC_CONNECTIONS_PER_NODE connections per node.
+
+    The client is closed when its loop shuts down: it is tied to an async generator of the loop, which
+    `loop.shutdown_asyncgens()` finalizes before the loop is closed (asyncio.run, asgiref's async_to_sync
+    and ASGI servers all call it). Short-lived loops, one per request under async_to_sync, then leave no
+    open aiohttp session behind.
+    """
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    if alias not in clients:
+        options = {**client_options(alias), 'connections_per_node': settings.ES_ASYNC_CONNECTIONS_PER_NODE}
+        client = AsyncElasticsearch(**options, transport_class=AsyncBackoffTransport)
+        # Run the generator up to its yield: the loop tracks it from its first iteration. It is kept next to
+        # the client, the loop only holds a weak reference.
+        closer = _close_with_loop(client)
+        try:
+            closer.asend(None).send(None)
+        except StopIteration:
+            pass
+        clients[alias] = client
+        clients[(alias, 'closer')] = closer
+    return clients[alias]
+
+
+class ElasticsearchProxy:
+    """
+    Stand-in for an Elasticsearch client that resolves to `get_es(alias)` on every attribute access,
+    so a module level `es` can be imported anywhere without creating a client at import time or
+    carrying one across a fork.
+    """
+
+    def __init__(self, alias='default'):
+        self._alias = alias
+
+    def __getattr__(self, name):
+        return getattr(get_es(self._alias), name)
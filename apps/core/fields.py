@@ -0,0 +1,31 @@
+from django import forms
+from django.db import models
+from django.utils.functional import cached_property
+
+
+class PhoneNumberField(models.BigIntegerField):
+    """
+    Stores an 11 digit mobile number (e.g. 09121234567) as a bigint.
+
+    The leading zero is dropped in the database and restored when the value is read back, so
+    the rest of the code (validators, serializers, Elasticsearch documents) keeps working with strings.
+    """
+
+    description = "Mobile phone number stored as a big integer"
+    digits = 11
+
+    @cached_property
+    def validators(self):
+        # The integer range validators of BigIntegerField would compare the string value to an int.
+        return [*self.default_validators, *self._validators]
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return f'{value:0{self.digits}d}'
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{'form_class': forms.CharField, 'max_length': self.digits, **kwargs})
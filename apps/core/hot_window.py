@@ -0,0 +1,254 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+
+from apps.core.db_routers import pin_to_primary
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+NO_DURATION = -1
+
+
+def to_epoch_us(value):
+    """Convert an aware datetime to integer microseconds since the epoch."""
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_epoch_us(value):
+    """Convert integer microseconds since the epoch back to an aware UTC datetime."""
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+class HotWindow:
+    """
+    In-process columnar store holding the CDRs of the last few minutes (by start_time).
+
+    Every column is a fixed size NumPy array used as a ring buffer: phone numbers are stored
+    as int64, times as epoch microseconds, the duration as int64 (-1 for null) and the success
+    flag as bool. When the buffer is full the oldest rows are overwritten, and the store stops
+    claiming coverage for the time range those rows belonged to.
+
+    The ids of the last `id_margin` ids appended are remembered, so that rows read again are skipped.
+    """
+
+    COLUMNS = ('id', 'src_number', 'dest_number', 'call_duration', 'start_time', 'end_time', 'timestamp',
+               'call_successful')
+
+    def __init__(self, minutes=15, capacity=500000, id_margin=1000):
+        """
+        :param minutes: Size of the time window (by start_time) kept in memory.
+        :param capacity: Maximum number of rows kept in the ring buffer.
+        :param id_margin: Ids below the last id that may still be appended, see `HotWindowFeeder.fetch`.
+        """
+        if np is None:
+            raise RuntimeError('The hot window requires numpy to be installed.')
+        self.window_us = minutes * 60 * 1000000
+        self.capacity = capacity
+        self._id = np.zeros(capacity, dtype=np.int64)
+        self._src = np.zeros(capacity, dtype=np.int64)
+        self._dest = np.zeros(capacity, dtype=np.int64)
+        self._duration = np.zeros(capacity, dtype=np.int64)
+        self._start = np.zeros(capacity, dtype=np.int64)
+        self._end = np.zeros(capacity, dtype=np.int64)
+        self._timestamp = np.zeros(capacity, dtype=np.int64)
+        self._success = np.zeros(capacity, dtype=np.bool_)
+        self._head = 0
+        self._size = 0
+        self._evicted_until = None
+        self._lock = threading.Lock()
+        self.id_margin = id_margin
+        self._recent_ids = set()
+        self.last_id = 0
+        self.ready = False
+
+    def __len__(self):
+        return self._size
+
+    def cutoff_us(self, now=None):
+        """Return the lower bound (epoch microseconds) of the window at `now`."""
+        now = now or datetime.now(dt_timezone.utc)
+        return to_epoch_us(now) - self.window_us
+
+    def append(self, rows, now=None):
+        """
+        Append rows to the ring buffer.
+
+        :param rows: Iterable of tuples ordered like `COLUMNS`.
+        :param now: Reference time used to drop rows that are already outside the window.
+        :return: The number of rows stored.
+        """
+        cutoff = self.cutoff_us(now)
+        batch = []
+        for row in rows:
+            if row[0] in self._recent_ids or row[0] <= self.last_id - self.id_margin:
+                continue
+            self._recent_ids.add(row[0])
+            self.last_id = max(self.last_id, row[0])
+            start_us = to_epoch_us(row[4])
+            if start_us < cutoff:
+                continue
+            batch.append((
+                row[0], int(row[1]), int(row[2]), NO_DURATION if row[3] is None else row[3], start_us,
+                to_epoch_us(row[5]), to_epoch_us(row[6]), bool(row[7]),
+            ))
+        self._recent_ids = {cdr_id for cdr_id in self._recent_ids if cdr_id > self.last_id - self.id_margin}
+        if not batch:
+            return 0
+
+        with self._lock:
+            evicted = [row[4] for row in batch[:-self.capacity]]
+            # Only the last `capacity` rows of an oversized batch can survive anyway.
+            batch = batch[-self.capacity:]
+            positions = (self._head + np.arange(len(batch))) % self.capacity
+            overwritten = positions[:max(0, self._size + len(batch) - self.capacity)]
+            evicted.extend(self._start[overwritten].tolist())
+            if self._evicted_until is not None:
+                evicted.append(self._evicted_until)
+            if evicted:
+                self._evicted_until = max(evicted)
+            columns = list(zip(*batch))
+            for column, values in zip(
+                    (self._id, self._src, self._dest, self._duration, self._start, self._end, self._timestamp,
+                     self._success), columns):
+                column[positions] = values
+            self._head = (self._head + len(batch)) % self.capacity
+            self._size = min(self.capacity, self._size + len(batch))
+        return len(batch)
+
+    def covers(self, start_time, now=None):
+        """
+        Check whether every CDR with a start_time at or after `start_time` is held in memory.
+
+        :param start_time: Lower bound of the query (aware datetime) or None.
+        :return: True if the query can be answered from the window alone.
+        """
+        if not self.ready or start_time is None:
+            return False
+        start_us = to_epoch_us(start_time)
+        if start_us < self.cutoff_us(now):
+            return False
+        return self._evicted_until is None or start_us > self._evicted_until
+
+    def search(self, src_number=None, dest_number=None, start_time=None, end_time=None, call_successful=None,
+               call_duration=None, limit=10, now=None):
+        """
+        Filter the window with vectorized comparisons, using the same semantics as `CDRSearchView.build_query`.
+
+        :return: A list of CDR dictionaries shaped like the Elasticsearch `_source` of a hit.
+        """
+        with self._lock:
+            size = self._size
+            mask = self._start[:size] >= self.cutoff_us(now)
+            if src_number:
+                mask &= self._src[:size] == int(src_number)
+            if dest_number:
+                mask &= self._dest[:size] == int(dest_number)
+            if start_time:
+                mask &= self._start[:size] >= to_epoch_us(start_time)
+            if end_time:
+                mask &= self._end[:size] <= to_epoch_us(end_time)
+            if call_successful is not None:
+                mask &= self._success[:size] == bool(call_successful)
+            if call_duration:
+                mask &= self._duration[:size] == call_duration
+            positions = np.flatnonzero(mask)
+            if limit is not None:
+                positions = positions[:limit]
+            return [self._to_dict(position) for position in positions]
+
+    def _to_dict(self, position):
+        duration = int(self._duration[position])
+        return {
+            'id': int(self._id[position]),
+            'src_number': f'{int(self._src[position]):011d}',
+            'dest_number': f'{int(self._dest[position]):011d}',
+            'call_duration': None if duration == NO_DURATION else duration,
+            'start_time': from_epoch_us(self._start[position]).isoformat(),
+            'end_time': from_epoch_us(self._end[position]).isoformat(),
+            'timestamp': from_epoch_us(self._timestamp[position]).isoformat(),
+            'call_successful': bool(self._success[position]),
+        }
+
+
+class HotWindowFeeder(threading.Thread):
+    """
+    Daemon thread feeding a `HotWindow` by tailing the Cdr table by primary key, on the primary database.
+    On start it backfills the rows of the current window, then polls for new ids.
+
+    Consumers insert concurrently, so ids do not commit in order: a row may become visible after rows
+    with higher ids were read. Every poll reads again the last `window.id_margin` ids, which the window
+    skips when it already holds them.
+    """
+
+    def __init__(self, window, poll_interval=1.0, batch_size=10000):
+        super().__init__(name='cdr-hot-window', daemon=True)
+        if window.id_margin >= batch_size:
+            raise ValueError('The id margin of the hot window must be smaller than the batch size.')
+        self.window = window
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+
+    def fetch(self, **filters):
+        """Fetch the next batch of rows after the last seen id minus the margin."""
+        from apps.cdr.models import Cdr
+
+        with pin_to_primary():
+            return list(
+                Cdr.objects.filter(id__gt=max(0, self.window.last_id - self.window.id_margin), **filters)
+                .order_by('id')
+                .values_list(*HotWindow.COLUMNS)[:self.batch_size]
+            )
+
+    def backfill(self):
+        """Load the CDRs already inside the window, then mark it as ready."""
+        cutoff = from_epoch_us(self.window.cutoff_us())
+        while rows := self.fetch(start_time__gte=cutoff):
+            self.window.append(rows)
+            if len(rows) < self.batch_size:
+                break
+        self.window.ready = True
+
+    def run(self):
+        from django.db import close_old_connections
+
+        while True:
+            try:
+                close_old_connections()
+                if not self.window.ready:
+                    self.backfill()
+                while rows := self.fetch():
+                    self.window.append(rows)
+                    if len(rows) < self.batch_size:
+                        break
+            except Exception as e:
+                print(f"Error while feeding the hot window: {e}")
+            time.sleep(self.poll_interval)
+
+
+_hot_window = None
+_hot_window_lock = threading.Lock()
+
+
+def get_hot_window():
+    """
+    Return the hot window of this worker process, starting its feeder on first use.
+    Returns None when the hot window is disabled or numpy is not installed.
+    """
+    global _hot_window
+    config = getattr(settings, 'HOT_WINDOW', {})
+    if not config.get('ENABLED') or np is None:
+        return None
+    if _hot_window is None:
+        with _hot_window_lock:
+            if _hot_window is None:
+                window = HotWindow(minutes=config.get('MINUTES', 15), capacity=config.get('CAPACITY', 500000),
+                                   id_margin=config.get('ID_MARGIN', 1000))
+                HotWindowFeeder(window, poll_interval=config.get('POLL_INTERVAL', 1.0)).start()
+                _hot_window = window
+    return _hot_window
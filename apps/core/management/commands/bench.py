@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import microbench
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to run the microbenchmarks of `benchmarks.microbench` and compare
+    them to the baseline: the command fails when a case is slower than its baseline by more than
+    `--threshold`. Needs no service, the functions measured run in process.
+
+    The baseline is only meaningful on the machine it was recorded on: record it with `--save` before
+    a change, then run the command after it.
+    """
+
+    help = 'Run the ingest and search microbenchmarks and fail on a regression against the baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('cases', nargs='*', help=f"Cases to run (default: all of {', '.join(microbench.CASES)})")
+        parser.add_argument('--repeat', type=int, default=5, help='Timed rounds per case')
+        parser.add_argument('--min-time', type=float, default=0.1, help='Seconds a timed round lasts at least')
+        parser.add_argument('--warmup', type=float, default=0.05, help='Seconds a case runs before it is timed')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Slowdown over the baseline counted as a regression (0.2 for 20%%)')
+        parser.add_argument('--baseline', default=microbench.BASELINE_PATH, help='Baseline file')
+        parser.add_argument('--save', action='store_true', help='Record the results as the baseline')
+
+    def handle(self, *args, **options):
+        unknown = set(options['cases']) - set(microbench.CASES)
+        if unknown:
+            raise CommandError(f"Unknown cases: {', '.join(sorted(unknown))}.")
+
+        try:
+            baseline = microbench.load_baseline(options['baseline'])
+        except FileNotFoundError:
+            if not options['save']:
+                raise CommandError(f"No baseline in {options['baseline']}, record one with --save.")
+            baseline = {}
+
+        results = microbench.run(options['cases'], repeat=options['repeat'], min_time=options['min_time'],
+                                 warmup=options['warmup'])
+        rows = microbench.compare(results, baseline, options['threshold'])
+
+        self.stdout.write(f"{'case':<30}{'baseline µs':>14}{'best µs':>12}{'median µs':>12}{'ratio':>8}")
+        for name, reference, best, ratio, regressed in rows:
+            line = (f"{name:<30}{'-' if reference is None else f'{reference:.3f}':>14}{best:>12.3f}"
+                    f"{results[name]['median_us']:>12.3f}{'-' if ratio is None else f'{ratio:.2f}':>8}")
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+
+        if options['save']:
+            microbench.save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}."))
+            return
+
+        missing = [name for name, reference, *_ in rows if reference is None]
+        if missing:
+            raise CommandError(f"Not in the baseline: {', '.join(missing)}, record it again with --save.")
+        regressions = [name for name, *_, regressed in rows if regressed]
+        if regressions:
+            raise CommandError(f"Slower than the baseline by more than {options['threshold']:.0%}: "
+                               f"{', '.join(regressions)}.")
+        self.stdout.write(self.style.SUCCESS('No regression.'))
@@ -1,13 +1,23 @@
+import signal
+import threading
+
 from django.core.management.base import BaseCommand
 from apps.cdr.tasks.tasks_consumer import RabbitMQConsumer
-from apps.core import os_setting_elastic
+from utility.profiler import profile_for, profile_path, profiler_settings
 import time
 
 
 class Command(BaseCommand):
-    """ This class defines a Django management command to start the RabbitMQ consumer for processing CDRs. """
+    """
+    This class defines a Django management command to start the RabbitMQ consumer for processing CDRs.
+
+    The consumer can be profiled without a restart: `kill -USR1 <pid>` samples it for PROFILER['SIGNAL_SECONDS']
+    seconds, `--profile-seconds` from the start, and the profile is written to PROFILER['DIR'] (see
+    `utility.profiler`). No sampling happens otherwise.
+    """
 
     help = 'Start the RabbitMQ consumer to process CDRs'
+    sampler = None
 
     def add_arguments(self, parser):
         """
@@ -50,6 +60,12 @@ class Command(BaseCommand):
             default='guest',
             help='RabbitMQ password.',
         )
+        parser.add_argument(
+            '--profile-seconds',
+            type=float,
+            default=0,
+            help='Profile the consumer for this many seconds from the start.',
+        )
 
     def handle(self, *args, **options):
         """
@@ -66,6 +82,11 @@ class Command(BaseCommand):
 
         self.stdout.write(f"Starting RabbitMQ consumer with queue prefix '{queue_prefix}' and {shard_count} shards...")
 
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.profile(profiler_settings()['SIGNAL_SECONDS']))
+        if options['profile_seconds']:
+            self.profile(options['profile_seconds'])
+
         # Initialize and connect the consumer
         consumer = RabbitMQConsumer(
             queue_prefix=queue_prefix,
@@ -86,3 +107,15 @@ class Command(BaseCommand):
         finally:
             consumer.close_connection()
             self.stdout.write('RabbitMQ consumer stopped and connection closed.')
+
+    def profile(self, seconds):
+        """
+        Sample the thread of the consumer for `seconds` in the background, unless a profile is already running.
+        """
+        if self.sampler is not None and self.sampler.running:
+            return
+        config = profiler_settings()
+        path = profile_path(config['DIR'], 'consumer', config['FORMAT'])
+        self.stdout.write(f"Profiling the consumer for {seconds:g}s into {path}")
+        self.sampler = profile_for(seconds, path, config['INTERVAL'], [threading.main_thread().ident],
+                                   on_done=lambda written: self.stdout.write(f"Profile written to {written}"))
@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
 import time
 
-from apps.cdr.tasks.tasks_producer import RabbitMQProducer, generate_cdr
+from apps.cdr.tasks.tasks_main import generate_cdr
+from apps.cdr.tasks.tasks_producer import RabbitMQProducer
 
 
 class Command(BaseCommand):
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.row_counts import COUNTER, count_cdrs, rebuild_counters
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to recount the CDRs of every day into the counters behind the sync status.
+    Needed after CDRs were written without the ORM (bulk_create, raw SQL, restores), which the counters miss.
+    """
+
+    help = 'Recount the CDRs into the per-day counters used by the sync status'
+
+    def handle(self, *args, **options):
+        before, _ = count_cdrs(COUNTER)
+        rebuild_counters()
+        after, _ = count_cdrs(COUNTER)
+        self.stdout.write(self.style.SUCCESS(f'Counters rebuilt: {after} CDRs ({after - before:+d}).'))
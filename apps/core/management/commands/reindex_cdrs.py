@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from apps.cdr.models import Cdr, ReindexChange
+from apps.core.cdr_indices import READ_ALIAS, index_name, rollover
+from apps.core.db_routers import pin_to_primary
+from apps.core.os_setting_elastic import es
+from apps.core.reindex import (ReindexState, create_indices, finish_indices, index_slice, periods_between,
+                               split_range, swap_aliases)
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to rebuild the CDR indices from PostgreSQL in parallel.
+
+    The primary key range of the CDRs is split into slices; `--workers` processes each stream one slice
+    at a time with a server-side cursor and send `_bulk` requests into fresh indices (one per period,
+    without refresh nor replicas while they are loaded). Once every slice is in, the settings are
+    restored, the indices force-merged and the aliases switched to them atomically. The CDRs saved or
+    deleted since the reindex started, recorded by `index_cdrs` while the new indices carry REINDEX_ALIAS,
+    and the ones inserted since, are then indexed again from the database, and only then the previous
+    indices deleted. Progress is saved to `--state-file`: run the command again with `--resume` to
+    continue an interrupted reindex.
+    """
+
+    help = 'Rebuild the CDR indices from PostgreSQL with parallel workers and switch the aliases to them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (default: number of CPUs)')
+        parser.add_argument('--slice-size', type=int, default=100000, help='CDR ids per slice')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='CDRs per database fetch and per _bulk request')
+        parser.add_argument('--state-file', default='reindex_cdrs.json', help='Where the progress is saved')
+        parser.add_argument('--resume', action='store_true', help='Continue the reindex saved in --state-file')
+        parser.add_argument('--merge-timeout', type=float, default=3600.0,
+                            help='Seconds to wait for the force merge of one index')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            if not os.path.exists(options['state_file']):
+                raise CommandError(f"No reindex to resume in {options['state_file']}.")
+            state = ReindexState.load(options['state_file'])
+            self.stdout.write(f'Resuming generation {state.generation}: {len(state.pending())} slices left.')
+        else:
+            state = self.plan(options)
+            if state is None:
+                self.stdout.write(self.style.WARNING('No CDR to index.'))
+                return
+
+        self.index_slices(state, options)
+
+        self.stdout.write('Restoring the index settings and merging segments...')
+        finish_indices(list(state.indices.values()), options['merge_timeout'])
+        # Swapped again on --resume, the previous indices come from the first swap.
+        state.stale = sorted({*state.stale, *swap_aliases(state.indices, index_name(timezone.now()))})
+        state.save()
+        self.stdout.write(self.style.SUCCESS(f'Aliases switched to generation {state.generation}.'))
+
+        self.catch_up(state)
+        rollover(es)
+        for name in state.stale:
+            es.indices.delete(index=name, ignore_unavailable=True)
+            self.stdout.write(f'Deleted the previous index {name}.')
+        os.remove(state.path)
+
+    def plan(self, options):
+        """Split the CDRs into slices and create the indices of every period they start in."""
+        with pin_to_primary():
+            bounds = Cdr.objects.aggregate(min_id=Min('id'), max_id=Max('id'),
+                                           first=Min('start_time'), last=Max('start_time'))
+        if bounds['max_id'] is None:
+            return None
+        started_at = timezone.now()
+        generation = started_at.strftime('%Y%m%d%H%M%S')
+        periods = periods_between(bounds['first'], max(bounds['last'], started_at))
+        # Changes are recorded from here on, the slices are streamed after.
+        indices = create_indices(generation, periods)
+        state = ReindexState(options['state_file'], generation, started_at, bounds['max_id'],
+                             split_range(bounds['min_id'], bounds['max_id'], options['slice_size']), indices)
+        state.save()
+        self.stdout.write(f'Reindexing CDRs {bounds["min_id"]} to {bounds["max_id"]} into {len(indices)} indices '
+                          f'of generation {generation}, {len(state.slices)} slices.')
+        return state
+
+    def index_slices(self, state, options):
+        """Index the pending slices with the worker processes, saving the progress after every slice."""
+        jobs = [(state.generation, low, high, options['chunk_size']) for low, high in state.pending()]
+        total, indexed, started = len(state.slices), 0, time.monotonic()
+        # Forked workers must open their own database connections.
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(options['workers']) as pool:
+            for low, high, count, failed in pool.imap_unordered(index_slice, jobs):
+                indexed += count
+                if failed:
+                    self.stdout.write(self.style.WARNING(f'ids {low}-{high - 1}: {failed} CDRs failed, the slice '
+                                                         f'is left for --resume'))
+                    continue
+                state.done.add(low)
+                state.save()
+                rate = indexed / max(time.monotonic() - started, 1e-9)
+                self.stdout.write(f'[{len(state.done)}/{total}] ids {low}-{high - 1}: {count} CDRs '
+                                  f'({indexed} in this run, {rate:.0f}/s)')
+        if state.pending():
+            raise CommandError(f'{len(state.pending())} slices failed, run the command again with --resume.')
+
+    def catch_up(self, state):
+        """
+        Index again the CDRs inserted, saved or deleted since the reindex started, into the indices now behind
+        the period names: a slice may have been streamed before the change. The CDRs gone are deleted from them.
+        """
+        from apps.core.documents import CdrDocument
+
+        with pin_to_primary():
+            changes = ReindexChange.objects.filter(changed_at__gte=state.started_at)
+            last_change = changes.aggregate(last=Max('id'))['last']
+            changed = set(changes.values_list('cdr_id', flat=True))
+            cdrs = Cdr.objects.filter(Q(id__gt=state.max_id) | Q(id__in=changed)).order_by('id')
+            found = set(cdrs.values_list('id', flat=True))
+            if found:
+                CdrDocument().update(cdrs.iterator(chunk_size=2000))
+        gone = sorted(changed - found)
+        if gone:
+            es.delete_by_query(index=READ_ALIAS, query={'ids': {'values': gone}}, conflicts='proceed', refresh=True)
+        if last_change is not None:
+            # The changes of an abandoned reindex, older, go too.
+            ReindexChange.objects.filter(id__lte=last_change).delete()
+        self.stdout.write(self.style.SUCCESS(f'Caught up with {len(found)} CDRs written and {len(gone)} deleted '
+                                             f'during the reindex.'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.cdr_indices import WRITE_ALIAS, rollover
+from apps.core.os_setting_elastic import es
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to install the CDR index template, create the indices of the current
+    and the next period and move the write alias to the current one.
+    Run it once before the first indexing, then daily (or at least once per period) from cron.
+    """
+
+    help = 'Create the CDR indices of the current and next period and roll the write alias over'
+
+    def handle(self, *args, **options):
+        try:
+            current, following = rollover(es)
+        except Exception as e:
+            raise CommandError(f'Rollover failed: {e}')
+        self.stdout.write(self.style.SUCCESS(f'{WRITE_ALIAS} -> {current}, next index {following} ready.'))
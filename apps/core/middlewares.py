@@ -1,47 +1,160 @@
+import atexit
+import hmac
 import logging
-from django.contrib import messages
-from django.http import HttpResponseRedirect
-from django.urls import reverse
+import logging.handlers
+import os
+import queue
+import threading
 
-"""Initialize the logger with the current module name."""
-logger = logging.getLogger(__name__)
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
 
-"""Define the path for the log file."""
-LOG_FILE_PATH = './utility/info.log'
+from apps.core.server_timing import start_timing, stop_timing
+from utility.profiler import Sampler, profile_path, profiler_settings
 
-"""Configure logging with the specified log file, log level, and format."""
-logging.basicConfig(filename=LOG_FILE_PATH, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+"""Logger of the requests, its records are written to settings.LOG_FILE_PATH by a background thread."""
+logger = logging.getLogger('apps.requests')
 
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
 
-class LogRequiredMiddleware:
+
+def timing_settings():
+    return getattr(settings, 'REQUEST_TIMING', {})
+
+
+def start_request_log():
+    """
+    Send the records of the request logger through a queue to a listener thread writing them to
+    settings.LOG_FILE_PATH, once per process (a forked worker starts its own listener).
+    Logging a request then only puts a record in the queue, the file is never written by the request thread.
+    """
+    global _listener, _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        records = queue.SimpleQueue()
+        file_handler = logging.FileHandler(settings.LOG_FILE_PATH, delay=True)
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        for handler in [handler for handler in logger.handlers if isinstance(handler, logging.handlers.QueueHandler)]:
+            logger.removeHandler(handler)
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(records, file_handler)
+        _listener.start()
+        _listener_pid = os.getpid()
+        atexit.register(_listener.stop)
+
+
+class RequestTimingMiddleware:
+    """
+    Times every request and the phases of its handling: authentication, throttling, validation of the
+    parameters, Elasticsearch calls (retries included) and rendering of the response, recorded with
+    `apps.core.server_timing.timed`. The times are logged with the status code through a queue (when
+    REQUEST_TIMING['LOG'] is set) and, only when REQUEST_TIMING['HEADER'] is set as they reveal internals
+    to every client, sent back in a `Server-Timing` header, which browsers show in the network panel.
+    The body of the response is never changed.
+
+    Served by both WSGI and ASGI workers, without a thread hop around the async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timing, token = start_timing()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_timing(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing, token = start_timing()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_timing(token)
+        return self.finish(request, response, timing)
+
+    def finish(self, request, response, timing):
+        config = timing_settings()
+        header = timing.header()
+        if config.get('HEADER', False):
+            response['Server-Timing'] = header
+        if config.get('LOG', True):
+            start_request_log()
+            level = logging.WARNING if response.status_code >= 400 else logging.INFO
+            logger.log(level, f"{request.method} {request.path} {response.status_code} - {header}")
+        return response
+
+
+class ProfileMiddleware:
     """
-    Defines a middleware class to handle login-required functionality.
-    Logs information about incoming requests and responses.
-    Redirects to the home page with a warning message if an error occurs.
+    Profiles the requests sent with an `X-Profile` header holding PROFILER['TOKEN']: the thread serving
+    the request is sampled (see `utility.profiler.Sampler`) and the profile written to PROFILER['DIR'] on the
+    server, its file name is returned in the `X-Profile-File` header. Under ASGI every thread is sampled:
+    the sync views run in the executor threads of asgiref, not in the event loop thread, so requests
+    served concurrently show up in the profile too. The profile is then written off the event loop.
+
+    Without a PROFILER['TOKEN'] the middleware is not loaded at all.
     """
+    sync_capable = True
+    async_capable = True
+    HEADER = 'X-Profile'
 
     def __init__(self, get_response):
+        self.config = profiler_settings()
+        if not self.config['TOKEN']:
+            raise MiddlewareNotUsed
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        """
-        Overrides the __call__ method to handle incoming requests and responses.
-        Logs information about requests and responses.
-        Redirects to the home page with a warning message if an error occurs.
-        """
-        logger.info(f"Request for URL: {request.path}. Method: {request.method}.")
-
-        response = self.get_response(request)
-
-        if response.status_code in [400, 404, 405, 406, 500, 401, 403]:
-            logger.error(
-                f"Error {response.status_code} occurred for URL: {request.path}. "
-                f"Method: {request.method}. User: {request.user}")
-            messages.warning(request, 'An error occurred. Please try again.', extra_tags='error')
-            return HttpResponseRedirect(reverse('cdr_search'))
-
-        logger.info(
-            f"Request for URL: {request.path}. Method: {request.method}. User: {request.user}. "
-            f"Status Code {response.status_code}")
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.requested(request):
+            return self.get_response(request)
+        sampler = self.start([threading.get_ident()])
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        return self.finish(request, response, sampler)
+
+    async def __acall__(self, request):
+        if not self.requested(request):
+            return await self.get_response(request)
+        sampler = self.start(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            sampler.stop()
+        return await sync_to_async(self.finish, thread_sensitive=False)(request, response, sampler)
+
+    def requested(self, request):
+        token = request.headers.get(self.HEADER)
+        return token is not None and hmac.compare_digest(token.encode(), self.config['TOKEN'].encode())
+
+    def start(self, thread_ids):
+        return Sampler(self.config['REQUEST_INTERVAL'], thread_ids).start()
 
+    def finish(self, request, response, sampler):
+        path = profile_path(self.config['DIR'], 'request', self.config['FORMAT'])
+        sampler.write(path, name=f'{request.method} {request.path}')
+        response['X-Profile-File'] = os.path.basename(path)
         return response
@@ -1,14 +1,10 @@
 import os
-from django.core.wsgi import get_wsgi_application
 
-# Set the default Django settings module for the 'django' program
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
-
-# Get the WSGI application callable for the Django application
-application = get_wsgi_application()
+from apps.core.elastic import ElasticsearchProxy
 
-# Import the Elasticsearch client
-from elasticsearch import Elasticsearch
+# Set the default Django settings module, read when the client is first used
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-# Create an Elasticsearch client instance connecting to localhost on port 9200
-es = Elasticsearch([{'scheme': 'http', 'host': 'localhost', 'port': 9200}])
+# The Elasticsearch client of the current process, configured by settings.ELASTICSEARCH_DSL['default'].
+# Nothing is created at import time: the client is built on first use, see `apps.core.elastic.get_es`.
+es = ElasticsearchProxy()
@@ -0,0 +1,113 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from elasticsearch import NotFoundError
+
+"""How long Elasticsearch keeps a point in time open between two pages."""
+PIT_KEEP_ALIVE = '1m'
+
+"""Stable sort used for cursor pagination: start_time, with the CDR id as tiebreaker."""
+CURSOR_SORT = [{"start_time": "asc"}, {"id": "asc"}]
+
+"""Parts of a paginated search response that are used, Elasticsearch leaves the rest out."""
+PAGE_FILTER_PATH = ["pit_id", "hits.hits._source", "hits.hits.sort"]
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination token cannot be decoded or belongs to another query."""
+
+
+def query_fingerprint(query):
+    """Return a short stable hash of an Elasticsearch query, used to bind a cursor to its filters."""
+    canonical = json.dumps(query, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+def encode_cursor(pit_id, search_after, fingerprint):
+    """Build the opaque `next` token handed to clients."""
+    payload = json.dumps({"pit": pit_id, "after": search_after, "q": fingerprint}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, fingerprint):
+    """
+    Decode a `next` token.
+
+    :return: A (pit_id, search_after) tuple.
+    :raises InvalidCursor: If the token is malformed or was issued for different filters.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        pit_id, search_after, token_fingerprint = payload['pit'], payload['after'], payload['q']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor("The cursor is not valid.")
+    if token_fingerprint != fingerprint:
+        raise InvalidCursor("The cursor does not belong to these search parameters.")
+    return pit_id, search_after
+
+
+def close_point_in_time(es, pit_id):
+    """Release a point in time, ignoring ones that already expired."""
+    try:
+        es.close_point_in_time(id=pit_id)
+    except NotFoundError:
+        pass
+
+
+def pit_search(es, query, pit_id, page_size, search_after=None):
+    """
+    Run one search against a point in time, sorted by `CURSOR_SORT`.
+
+    :return: A (hits, pit_id) tuple, the point in time id may change between calls.
+    """
+    body = {**query, "size": page_size, "sort": CURSOR_SORT, "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}}
+    if search_after:
+        body["search_after"] = search_after
+    response = es.search(body=body, filter_path=PAGE_FILTER_PATH)
+    return response.get("hits", {}).get("hits", []), response.get("pit_id", pit_id)
+
+
+def search_page(es, index, query, page_size, cursor=None):
+    """
+    Fetch one page of hits with a point in time and `search_after`.
+
+    The first call opens a point in time on `index`; the returned token carries its id and the
+    sort values of the last hit, so the next call continues exactly where this one stopped.
+    The point in time is closed once the last page has been read.
+
+    :return: A (hits, next_token) tuple, next_token is None on the last page.
+    """
+    fingerprint = query_fingerprint(query)
+    if cursor:
+        pit_id, search_after = decode_cursor(cursor, fingerprint)
+    else:
+        pit_id, search_after = es.open_point_in_time(index=index, keep_alive=PIT_KEEP_ALIVE,
+                                                     ignore_unavailable=True)['id'], None
+
+    hits, pit_id = pit_search(es, query, pit_id, page_size, search_after)
+    if len(hits) < page_size:
+        close_point_in_time(es, pit_id)
+        return hits, None
+    return hits, encode_cursor(pit_id, hits[-1]["sort"], fingerprint)
+
+
+def iter_pages(es, index, query, page_size):
+    """
+    Yield every page of hits matching `query`, reading them from one point in time.
+    Only one page is held in memory at a time; the point in time is closed when the
+    generator is exhausted or closed early.
+    """
+    pit_id = es.open_point_in_time(index=index, keep_alive=PIT_KEEP_ALIVE, ignore_unavailable=True)['id']
+    search_after = None
+    try:
+        while True:
+            hits, pit_id = pit_search(es, query, pit_id, page_size, search_after)
+            if hits:
+                yield hits
+            if len(hits) < page_size:
+                return
+            search_after = hits[-1]["sort"]
+    finally:
+        close_point_in_time(es, pit_id)
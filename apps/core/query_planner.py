@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from elasticsearch import ApiError, TransportError
+
+from apps.core.db_routers import pin_to_primary
+
+ELASTICSEARCH = 'elasticsearch'
+POSTGRES = 'postgres'
+
+
+def is_unavailable(error):
+    """
+    Whether a failed search means Elasticsearch cannot answer (unreachable, overloaded, index missing),
+    rather than that the query itself is invalid (other 4xx errors).
+    """
+    if isinstance(error, ApiError):
+        return error.status_code in (404, 429) or not 400 <= error.status_code < 500
+    return isinstance(error, TransportError)
+
+
+class QueryPlanner:
+    """
+    Chooses the backend answering a CDR search: Elasticsearch, or PostgreSQL, which the consumer
+    writes first.
+
+    - Elasticsearch down or its index missing: PostgreSQL (degraded mode).
+    - A src/dest pair: PostgreSQL, one probe of the unique (src_number, dest_number) key.
+    - Indexing lagging more than QUERY_PLANNER['MAX_LAG'] seconds: PostgreSQL for the shapes it has an index
+      for and that may hit CDRs not indexed yet, a src_number or a start_time in the last RECENT_MINUTES.
+    - Anything else: Elasticsearch.
+
+    The indexing lag is measured every CHECK_INTERVAL seconds by comparing the highest CDR id in the PostgreSQL
+    primary and in Elasticsearch: it is the age of the newest probe whose PostgreSQL max id Elasticsearch has reached.
+    """
+
+    HISTORY = 64
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._probes = deque(maxlen=self.HISTORY)
+        self._checked_at = None
+        self.available = True
+        self.lag = 0.0
+
+    def config(self):
+        return getattr(settings, 'QUERY_PLANNER', {})
+
+    def mark_unavailable(self):
+        """Record that Elasticsearch failed a query, until the next check."""
+        with self._lock:
+            self.available = False
+            self._checked_at = time.monotonic()
+
+    def refresh(self, es):
+        """Measure the indexing lag and the availability of Elasticsearch, at most once per CHECK_INTERVAL."""
+        from apps.cdr.models import Cdr
+
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.config().get('CHECK_INTERVAL', 5.0):
+            return
+        with self._lock:
+            self._checked_at = now
+            # A lagging replica would hide the CDRs Elasticsearch misses, the max id is read from the primary.
+            with pin_to_primary():
+                pg_max = Cdr.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+            self._probes.append((now, pg_max))
+            try:
+                response = es.search(index="cdrs", body={"size": 0, "aggs": {"max_id": {"max": {"field": "id"}}}})
+            except (TransportError, ApiError) as e:
+                print(f"Elasticsearch is unavailable for searches: {e}")
+                self.available = False
+                return
+            es_max = response.get("aggregations", {}).get("max_id", {}).get("value") or 0
+            caught_up = [probed_at for probed_at, probed_max in self._probes if probed_max <= es_max]
+            self.available = True
+            self.lag = now - max(caught_up) if caught_up else now - self._probes[0][0]
+
+    def choose(self, es, src_number=None, dest_number=None, start_time=None):
+        """
+        Return the backend (ELASTICSEARCH or POSTGRES) that should answer a search with these filters.
+        """
+        config = self.config()
+        if not config.get('ENABLED', True):
+            return ELASTICSEARCH
+        self.refresh(es)
+        if not self.available:
+            return POSTGRES
+        if src_number and dest_number:
+            return POSTGRES
+        if self.lag > config.get('MAX_LAG', 5.0):
+            recent = timezone.now() - timedelta(minutes=config.get('RECENT_MINUTES', 5))
+            if src_number or (start_time is not None and start_time >= recent):
+                return POSTGRES
+        return ELASTICSEARCH
+
+
+planner = QueryPlanner()
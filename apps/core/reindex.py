@@ -0,0 +1,160 @@
+import json
+import os
+from datetime import datetime
+
+from apps.core.bulk_indexer import BulkIndexer
+from apps.core.cdr_indices import READ_ALIAS, WRITE_ALIAS, index_name, index_settings, next_period, period_start
+from apps.core.db_routers import pin_to_primary
+from apps.core.os_setting_elastic import es
+
+"""Settings of the indices of a reindex while they are loaded: no refresh and no replica to copy documents to."""
+BULK_LOAD_SETTINGS = {'refresh_interval': '-1', 'number_of_replicas': 0}
+
+"""
+Alias of the indices of a reindex until they are served: while it exists, the CDRs saved or deleted are
+recorded as ReindexChange rows (see `record_changes`). It is removed by the update that swaps the aliases,
+out of the INDEX_PATTERN wildcard so that no search reaches the indices before.
+"""
+REINDEX_ALIAS = 'reindex-cdrs'
+
+
+class ReindexState:
+    """
+    Progress of a reindex, saved as JSON after every slice so an interrupted run can be resumed:
+    the generation of the indices being built, when it started and the last CDR id then, the primary
+    key slices ([low, high) pairs), the low bound of the slices already indexed, and once the aliases
+    are swapped the previous indices to delete.
+    """
+
+    def __init__(self, path, generation, started_at, max_id, slices, indices, done=(), stale=()):
+        self.path = path
+        self.generation = generation
+        self.started_at = started_at
+        self.max_id = max_id
+        self.slices = [tuple(item) for item in slices]
+        self.indices = indices
+        self.done = set(done)
+        self.stale = list(stale)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as state_file:
+            data = json.load(state_file)
+        return cls(path, data['generation'], datetime.fromisoformat(data['started_at']), data['max_id'],
+                   data['slices'], data['indices'], data['done'], data['stale'])
+
+    def save(self):
+        """Write the state next to its file and rename it over, so a crash never leaves half a file."""
+        data = {'generation': self.generation, 'started_at': self.started_at.isoformat(), 'max_id': self.max_id,
+                'slices': self.slices, 'indices': self.indices, 'done': sorted(self.done), 'stale': self.stale}
+        with open(f'{self.path}.tmp', 'w') as state_file:
+            json.dump(data, state_file)
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def pending(self):
+        return [(low, high) for low, high in self.slices if low not in self.done]
+
+
+def split_range(min_id, max_id, slice_size):
+    """Split the primary keys from `min_id` to `max_id` (included) into [low, high) slices of `slice_size` ids."""
+    return [(low, min(low + slice_size, max_id + 1)) for low in range(min_id, max_id + 1, slice_size)]
+
+
+def periods_between(first, last):
+    """Return the start of every period from the one of `first` to the one of `last`."""
+    current, periods = period_start(first), []
+    while current <= last:
+        periods.append(current)
+        current = next_period(current)
+    return periods
+
+
+def create_indices(generation, periods):
+    """
+    Create the indices of a reindex, one per period, with the mapping of CdrDocument and BULK_LOAD_SETTINGS.
+    Their names are outside of the template pattern, so they get no alias but REINDEX_ALIAS until `swap_aliases`.
+
+    :return: The index of every period, by period name.
+    """
+    from apps.core.documents import CdrDocument
+
+    body = CdrDocument._index.to_dict()
+    indices = {}
+    for start in periods:
+        name = index_name(start, generation)
+        if not es.indices.exists(index=name):
+            es.indices.create(index=name, settings={**body['settings'], **BULK_LOAD_SETTINGS},
+                              mappings=body['mappings'], aliases={REINDEX_ALIAS: {}})
+        indices[index_name(start)] = name
+    return indices
+
+
+def index_slice(job):
+    """
+    Index the CDRs of one primary key slice into the indices of `generation`, in a worker process.
+    The slice is streamed from the primary with a server-side cursor, one chunk at a time.
+
+    :return: The slice and the number of CDRs indexed and failed.
+    """
+    from apps.cdr.models import Cdr
+    from apps.core.documents import CdrDocument
+
+    generation, low, high, chunk_size = job
+    document = CdrDocument()
+    with pin_to_primary():
+        cdrs = Cdr.objects.filter(id__gte=low, id__lt=high).order_by('id').iterator(chunk_size=chunk_size)
+        actions = ({**document._prepare_action(cdr, 'index'), '_index': index_name(cdr.start_time, generation)}
+                   for cdr in cdrs)
+        result = BulkIndexer(es, chunk_docs=chunk_size).index(actions)
+    return low, high, result.indexed, result.failed
+
+
+def finish_indices(indices, merge_timeout):
+    """Restore the refresh interval and replicas of the indices built, then merge each down to one segment."""
+    es.indices.put_settings(index=','.join(indices), settings={
+        'refresh_interval': None, 'number_of_replicas': index_settings().get('REPLICAS', 1)})
+    es.indices.refresh(index=','.join(indices))
+    for name in indices:
+        es.options(request_timeout=merge_timeout).indices.forcemerge(index=name, max_num_segments=1)
+
+
+def swap_aliases(indices, current_period):
+    """
+    Serve the indices of a reindex in place of the current ones, in one atomic alias update: each becomes
+    the read alias member and the write target of its period name, the write alias goes to the current
+    period, and REINDEX_ALIAS is removed. Concrete indices named like a period (or like the read alias, from
+    before per-period indices) are removed by the same update, which fails as a whole if any action does;
+    the other previous members of the read alias only lose their aliases.
+
+    :param indices: The new index of every period, by period name.
+    :return: The previous indices left without alias, to be deleted.
+    """
+    previous = es.indices.get_alias(index=READ_ALIAS) if es.indices.exists(index=READ_ALIAS) else {}
+    actions, stale = [], []
+    for name, info in previous.items():
+        if name in indices or name == READ_ALIAS:
+            actions.append({'remove_index': {'index': name}})
+        elif name not in indices.values():
+            actions.extend({'remove': {'index': name, 'alias': alias}} for alias in info['aliases'])
+            stale.append(name)
+    for period_name, name in indices.items():
+        actions.append({'add': {'index': name, 'alias': READ_ALIAS}})
+        actions.append({'add': {'index': name, 'alias': period_name, 'is_write_index': True}})
+    if current_period in indices:
+        actions.append({'add': {'index': indices[current_period], 'alias': WRITE_ALIAS, 'is_write_index': True}})
+    if es.indices.exists_alias(name=REINDEX_ALIAS):
+        actions.append({'remove': {'index': '*', 'alias': REINDEX_ALIAS}})
+    es.indices.update_aliases(actions=actions)
+    return stale
+
+
+def record_changes(ids):
+    """
+    Record the CDRs saved or deleted while a reindex runs, for its catch up. Called by `index_cdrs` before
+    it writes them to the served indices: a change made before the aliases are swapped is written to the
+    previous indices and recorded, one made after is written to the rebuilt ones.
+    """
+    from apps.cdr.models import ReindexChange
+
+    if ids and es.indices.exists_alias(name=REINDEX_ALIAS):
+        ReindexChange.objects.bulk_create(ReindexChange(cdr_id=pk) for pk in ids)
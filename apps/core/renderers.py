@@ -0,0 +1,24 @@
+from rest_framework.renderers import JSONRenderer
+
+from apps.core.server_timing import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional dependency
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer encoding with orjson when it is installed, several times faster than the standard
+    library on lists of CDRs. The output matches `JSONRenderer` (compact, UTF-8, datetimes in UTC
+    ending in 'Z'); types orjson does not know are handed to DRF's encoder, and indented output
+    (the `indent` media type parameter) is left to `JSONRenderer`.
+    """
+
+    @timed('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=self.encoder_class().default,
+                            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,100 @@
+import random
+from datetime import timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+"""Ways of counting the CDRs of the database, see `count_cdrs`."""
+COUNTER = 'counter'
+ESTIMATE = 'estimate'
+EXACT = 'exact'
+COUNT_MODES = (COUNTER, ESTIMATE, EXACT)
+
+
+def add_to_counter(start_time, delta):
+    """
+    Add `delta` to the count of CDRs of the start_time day, on a random one of CDR_COUNTER_SHARDS rows.
+    Runs in the caller's transaction, so the count commits or rolls back with the CDR.
+    """
+    from apps.cdr.models import CdrCounter
+
+    day = start_time.astimezone(dt_timezone.utc).date()
+    shard = random.randrange(settings.CDR_COUNTER_SHARDS)
+    if CdrCounter.objects.filter(day=day, shard=shard).update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            CdrCounter.objects.create(day=day, shard=shard, count=delta)
+    except IntegrityError:  # Created concurrently
+        CdrCounter.objects.filter(day=day, shard=shard).update(count=F('count') + delta)
+
+
+def rebuild_counters():
+    """
+    Recount the CDRs of every day into the counters, for CDRs written without the ORM (bulk_create, raw SQL).
+    On PostgreSQL, inserts wait for the rebuild to finish.
+    """
+    from apps.cdr.models import Cdr, CdrCounter
+
+    using = router.db_for_write(CdrCounter)
+    with transaction.atomic(using=using):
+        if connections[using].vendor == 'postgresql':
+            with connections[using].cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {Cdr._meta.db_table} IN SHARE MODE')
+        CdrCounter.objects.using(using).all().delete()
+        days = (Cdr.objects.using(using).annotate(day=TruncDate('start_time', tzinfo=dt_timezone.utc))
+                .values('day').annotate(count=Count('id')).order_by())
+        CdrCounter.objects.using(using).bulk_create(
+            CdrCounter(day=row['day'], shard=0, count=row['count']) for row in days)
+
+
+def estimated_cdrs():
+    """Return the planner's estimate of the size of the Cdr table (pg_class.reltuples), or None when unknown."""
+    from apps.cdr.models import Cdr
+
+    connection = connections[router.db_for_read(Cdr)]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [Cdr._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None  # -1 until the table is first analyzed
+
+
+def count_cdrs(mode=COUNTER):
+    """
+    Count the CDRs of the database.
+
+    :param mode: COUNTER sums the per-day counters (exact, one row per day and shard), ESTIMATE reads the
+                 table statistics (constant time, falls back to the counters when there are none), EXACT
+                 runs count(*) on the table.
+    :return: A (count, mode used) tuple.
+    """
+    from apps.cdr.models import Cdr, CdrCounter
+
+    if mode == ESTIMATE:
+        estimate = estimated_cdrs()
+        if estimate is not None:
+            return estimate, ESTIMATE
+        mode = COUNTER
+    if mode == COUNTER:
+        return CdrCounter.objects.aggregate(total=Sum('count'))['total'] or 0, COUNTER
+    return Cdr.objects.count(), EXACT
+
+
+async def acount_cdrs(mode=COUNTER):
+    """Async version of `count_cdrs`."""
+    from apps.cdr.models import Cdr, CdrCounter
+
+    if mode == ESTIMATE:
+        # Django has no async cursor, the catalog is read in a thread.
+        estimate = await sync_to_async(estimated_cdrs)()
+        if estimate is not None:
+            return estimate, ESTIMATE
+        mode = COUNTER
+    if mode == COUNTER:
+        return (await CdrCounter.objects.aaggregate(total=Sum('count')))['total'] or 0, COUNTER
+    return await Cdr.objects.acount(), EXACT
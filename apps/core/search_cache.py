@@ -0,0 +1,170 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+
+from utility.cache import get_or_create
+
+"""
+Alias of the cache holding search results and ingest watermarks. The watermarks are advanced by the consumer
+and the Celery worker, so the cache must be shared between processes (not LocMem).
+"""
+CACHE_ALIAS = 'search'
+
+"""Windows spanning more days than this are keyed by the global watermark instead of per-day ones."""
+MAX_WATERMARK_DAYS = 31
+
+"""Cache key of the time of the last ingest of any CDR."""
+GLOBAL_WATERMARK = 'cdr:watermark'
+
+"""Prefix of the cached buckets of the CDR time series."""
+TIMESERIES_PREFIX = 'cdr:timeseries'
+
+_missing = object()
+
+
+def day_watermark(day):
+    """Return the cache key of the ingest watermark of one start_time day."""
+    return f'cdr:watermark:{day.isoformat()}'
+
+
+def advance_watermark(start_time=None, now=None):
+    """
+    Record that a CDR was just ingested. The watermark is the time of the last ingest, both globally
+    and for the UTC day of the CDR's start_time; cached results keyed by an older watermark are never read again.
+    """
+    now = now or time.time()
+    keys = [GLOBAL_WATERMARK]
+    if start_time is not None:
+        keys.append(day_watermark(start_time.astimezone(dt_timezone.utc).date()))
+    caches[CACHE_ALIAS].set_many(dict.fromkeys(keys, now), timeout=None)
+
+
+def watermark_keys(start_time=None, end_time=None):
+    """
+    Return the watermarks a query depends on: one per start_time day when the query is bounded on both
+    sides (a CDR matching start_time >= A and end_time <= B started between A and B), the global one otherwise.
+    """
+    if start_time is None or end_time is None or end_time < start_time:
+        return [GLOBAL_WATERMARK]
+    first, last = start_time.astimezone(dt_timezone.utc).date(), end_time.astimezone(dt_timezone.utc).date()
+    if (last - first).days > MAX_WATERMARK_DAYS:
+        return [GLOBAL_WATERMARK]
+    return [day_watermark(first + timedelta(days=offset)) for offset in range((last - first).days + 1)]
+
+
+def bucket_key(prefix, interval, start):
+    """Return the cache key of the time series bucket of `interval` seconds starting at `start` (epoch seconds)."""
+    return f'{prefix}:{interval}:{int(start)}'
+
+
+def forget_buckets(prefix, intervals, start_time, now=None):
+    """
+    Drop the cached buckets a CDR starting at `start_time` falls in, for every interval. Only closed buckets
+    are cached, so there is nothing to drop unless the CDR started before SEARCH_CACHE['BUCKET_SETTLE'] seconds ago.
+    """
+    now = now or time.time()
+    timestamp = start_time.timestamp()
+    if timestamp >= now - getattr(settings, 'SEARCH_CACHE', {}).get('BUCKET_SETTLE', 60):
+        return
+    caches[CACHE_ALIAS].delete_many([bucket_key(prefix, interval, timestamp // interval * interval)
+                                     for interval in intervals])
+
+
+def cache_key(prefix, query, watermarks):
+    """Build the cache key from the canonical form of an Elasticsearch query and the watermarks it depends on."""
+    canonical = json.dumps([query, watermarks], sort_keys=True, separators=(',', ':'), default=str)
+    return f'{prefix}:{hashlib.sha1(canonical.encode()).hexdigest()}'
+
+
+def plan(prefix, query, keys, watermarks, end_time=None, now=None):
+    """
+    Return the cache key of a query and how long its result may be stored (0 for not at all).
+
+    :param keys: The watermark keys the query depends on, see `watermark_keys`.
+    :param watermarks: The current values of those keys.
+    """
+    config = getattr(settings, 'SEARCH_CACHE', {})
+    now = now or time.time()
+    if watermarks and now - max(watermarks.values()) < config.get('INGEST_GRACE', 1.0):
+        timeout = 0
+    elif end_time is not None and end_time < datetime.fromtimestamp(now, dt_timezone.utc):
+        timeout = config.get('CLOSED_TIMEOUT', 86400)
+    else:
+        timeout = config.get('TIMEOUT', 60)
+    return cache_key(prefix, query, [watermarks.get(key) for key in keys]), timeout
+
+
+def cached_search(prefix, query, search, start_time=None, end_time=None, now=None):
+    """
+    Return the result of `search()` for `query`, from the search cache when possible.
+
+    Results are stored for SEARCH_CACHE['TIMEOUT'] seconds, or SEARCH_CACHE['CLOSED_TIMEOUT'] when the
+    window ends in the past, and are invalidated as soon as one of the watermarks they depend on advances.
+    Nothing is stored while a watermark is younger than SEARCH_CACHE['INGEST_GRACE'] seconds, as the
+    CDRs just ingested may not be searchable in Elasticsearch yet.
+
+    :param search: Callable running the query, only called on a miss.
+    """
+    if not getattr(settings, 'SEARCH_CACHE', {}).get('ENABLED', True):
+        return search()
+
+    keys = watermark_keys(start_time, end_time)
+    key, timeout = plan(prefix, query, keys, caches[CACHE_ALIAS].get_many(keys), end_time, now)
+    return get_or_create(key, search, timeout=timeout, using=CACHE_ALIAS)
+
+
+async def acached_search(prefix, query, search, start_time=None, end_time=None, now=None):
+    """
+    Async version of `cached_search`, `search` is a coroutine function.
+    """
+    if not getattr(settings, 'SEARCH_CACHE', {}).get('ENABLED', True):
+        return await search()
+
+    cache = caches[CACHE_ALIAS]
+    keys = watermark_keys(start_time, end_time)
+    key, timeout = plan(prefix, query, keys, await cache.aget_many(keys), end_time, now)
+    data = await cache.aget(key, _missing)
+    if data is _missing:
+        data = await search()
+        if timeout:
+            await cache.aset(key, data, timeout)
+    return data
+
+
+def cached_buckets(prefix, interval, starts, search, now=None):
+    """
+    Return the values of consecutive time buckets as a dict keyed by bucket start, from the search cache when possible.
+
+    A bucket ending more than SEARCH_CACHE['BUCKET_SETTLE'] seconds ago is closed: CDRs are not expected in it
+    anymore, so its value is stored for SEARCH_CACHE['CLOSED_TIMEOUT'] seconds (late CDRs drop it once indexed,
+    see `forget_buckets`; the timeout bounds how long a bucket computed before a late CDR was searchable is
+    served). Open buckets are always recomputed, so once the closed buckets are cached only the last few are
+    sent to Elasticsearch.
+
+    :param interval: The length of a bucket in seconds.
+    :param starts: The sorted bucket starts, epoch seconds.
+    :param search: Callable returning the values of the buckets between two bucket starts, both included;
+                   only called when a bucket is missing.
+    """
+    config = getattr(settings, 'SEARCH_CACHE', {})
+    if not config.get('ENABLED', True):
+        return search(starts[0], starts[-1])
+
+    now = now or time.time()
+    settled = now - config.get('BUCKET_SETTLE', 60)
+    cache = caches[CACHE_ALIAS]
+    closed = {bucket_key(prefix, interval, start): start for start in starts if start + interval <= settled}
+    buckets = {closed[key]: value for key, value in cache.get_many(list(closed)).items()}
+    missing = [start for start in starts if start not in buckets]
+    if not missing:
+        return buckets
+
+    computed = search(missing[0], starts[-1])
+    cache.set_many({key: computed[start] for key, start in closed.items()
+                    if start not in buckets and start in computed}, timeout=config.get('CLOSED_TIMEOUT', 86400))
+    buckets.update(computed)
+    return buckets
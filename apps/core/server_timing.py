@@ -0,0 +1,60 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+"""Phases of a request, in the order they are reported: see `timed`."""
+PHASES = ('auth', 'throttle', 'validation', 'es', 'render')
+
+_current = ContextVar('server_timing', default=None)
+
+
+class ServerTiming:
+    """Milliseconds spent in each phase of one request, summed when a phase runs several times."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    def add(self, phase, milliseconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + milliseconds
+
+    def total(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def header(self, total=None):
+        """Return the value of a `Server-Timing` header, e.g. 'auth;dur=1.2, es;dur=8.4, total;dur=12.0'."""
+        order = {phase: position for position, phase in enumerate(PHASES)}
+        phases = sorted(self.phases.items(), key=lambda item: order.get(item[0], len(order)))
+        phases.append(('total', self.total() if total is None else total))
+        return ', '.join(f'{phase};dur={milliseconds:.1f}' for phase, milliseconds in phases)
+
+
+def start_timing():
+    """Start timing the request handled by this thread or task, return the `ServerTiming` and its reset token."""
+    timing = ServerTiming()
+    return timing, _current.set(timing)
+
+
+def stop_timing(token):
+    _current.reset(token)
+
+
+def current_timing():
+    return _current.get()
+
+
+@contextmanager
+def timed(phase):
+    """
+    Add the time spent in the block (or in the decorated function) to `phase` of the current request.
+    Does nothing outside of a request timed by `RequestTimingMiddleware`.
+    """
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, (time.perf_counter() - started) * 1000)
@@ -0,0 +1,110 @@
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django_elasticsearch_dsl.apps import DEDConfig
+from django_elasticsearch_dsl.signals import RealTimeSignalProcessor
+
+from apps.core.cdr_indices import index_name
+
+
+def indexing_settings():
+    return getattr(settings, 'ES_INDEXING', {})
+
+
+class CoalescingSignalProcessor(RealTimeSignalProcessor):
+    """
+    Signal processor of django_elasticsearch_dsl that indexes the saved and deleted CDRs from Celery
+    (see `apps.cdr.tasks.tasks_indexing`) instead of in the saving process.
+
+    The ids of the changed CDRs are recorded once their transaction commits, deduplicated, and sent
+    as one task per ES_INDEXING['BATCH_SIZE'] ids at most ES_INDEXING['WINDOW'] seconds after the first
+    change: a burst of saves becomes a few `_bulk` requests. A deleted CDR is recorded with the index
+    it was in and its start_time, the row being gone by the time the task runs. When the broker cannot be reached the
+    batch is indexed in this process. Other models are indexed in real time, as by the default processor.
+    """
+
+    def setup(self):
+        self._lock = threading.Lock()
+        self._reset()
+        super().setup()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._pending = {}
+        self._timer = None
+
+    def handle_save(self, sender, instance, **kwargs):
+        if not self.coalesced(sender):
+            return super().handle_save(sender, instance, **kwargs)
+        if DEDConfig.autosync_enabled():
+            pk = instance.pk
+            transaction.on_commit(lambda: self.record(pk, None), using=instance._state.db)
+
+    def handle_pre_delete(self, sender, instance, **kwargs):
+        if not self.coalesced(sender):
+            super().handle_pre_delete(sender, instance, **kwargs)
+
+    def handle_delete(self, sender, instance, **kwargs):
+        if not self.coalesced(sender):
+            return super().handle_delete(sender, instance, **kwargs)
+        if DEDConfig.autosync_enabled():
+            # The instance loses its pk once deleted.
+            pk, deleted_from = instance.pk, (index_name(instance.start_time), instance.start_time.isoformat())
+            transaction.on_commit(lambda: self.record(pk, deleted_from), using=instance._state.db)
+
+    @staticmethod
+    def coalesced(sender):
+        from apps.cdr.models import Cdr
+
+        return sender is Cdr
+
+    def record(self, pk, deleted_from):
+        """
+        Add a changed CDR to the next batch. `deleted_from` is the (index, start_time) of a deleted CDR, None for
+        a saved one.
+        """
+        config = indexing_settings()
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child does not own the batch nor the timer of its parent.
+                self._reset()
+            self._pending[pk] = deleted_from
+            if len(self._pending) < config.get('BATCH_SIZE', 500):
+                if self._timer is None:
+                    # Not a daemon: a script that just saved CDRs exits once they are sent.
+                    self._timer = threading.Timer(config.get('WINDOW', 1.0), self.flush)
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        """Send the pending CDRs, one task per BATCH_SIZE ids."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+        from apps.cdr.tasks.tasks_indexing import index_cdrs
+
+        items = list(pending.items())
+        batch_size = indexing_settings().get('BATCH_SIZE', 500)
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            ids = [pk for pk, deleted_from in batch if deleted_from is None]
+            deleted = [[pk, *deleted_from] for pk, deleted_from in batch if deleted_from is not None]
+            try:
+                index_cdrs.delay(ids, deleted)
+            except Exception as e:
+                print(f"Indexing task not sent, indexing {len(batch)} CDRs in process: {e}")
+                try:
+                    index_cdrs(ids, deleted)
+                except Exception as e:
+                    print(f"Error indexing CDRs {ids[:10]}: {e}")
+
+    def teardown(self):
+        super().teardown()
+        self.flush()
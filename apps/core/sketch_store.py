@@ -0,0 +1,112 @@
+import time
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from utility.sketches import DDSketch, HyperLogLog
+
+
+def sketch_settings():
+    return getattr(settings, 'SKETCHES', {})
+
+
+def hour_of(value):
+    """Return the start of the UTC hour of an aware datetime, the bucket of a CDR starting then."""
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+class HourSketches:
+    """The sketches of one hour: number of calls, distinct src and dest numbers, call duration quantiles."""
+
+    def __init__(self, calls=0, src_numbers=None, dest_numbers=None, call_durations=None):
+        config = sketch_settings()
+        self.calls = calls
+        self.src_numbers = src_numbers or HyperLogLog(config.get('HLL_PRECISION', 12))
+        self.dest_numbers = dest_numbers or HyperLogLog(config.get('HLL_PRECISION', 12))
+        self.call_durations = call_durations or DDSketch(config.get('RELATIVE_ACCURACY', 0.01))
+
+    def add(self, cdr_data):
+        self.calls += 1
+        self.src_numbers.add(cdr_data['src_number'])
+        self.dest_numbers.add(cdr_data['dest_number'])
+        if cdr_data.get('call_duration') is not None:
+            self.call_durations.add(cdr_data['call_duration'])
+
+    def merge(self, other):
+        self.calls += other.calls
+        self.src_numbers.merge(other.src_numbers)
+        self.dest_numbers.merge(other.dest_numbers)
+        self.call_durations.merge(other.call_durations)
+        return self
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.calls, HyperLogLog.from_bytes(bytes(row.src_numbers)),
+                   HyperLogLog.from_bytes(bytes(row.dest_numbers)), DDSketch.from_bytes(bytes(row.call_durations)))
+
+    def to_row(self, row):
+        row.calls = self.calls
+        row.src_numbers = self.src_numbers.to_bytes()
+        row.dest_numbers = self.dest_numbers.to_bytes()
+        row.call_durations = self.call_durations.to_bytes()
+        return row
+
+    def stats(self, quantiles=(0.5, 0.95, 0.99)):
+        return {
+            "calls": self.calls,
+            "distinct_src_numbers": self.src_numbers.count(),
+            "distinct_dest_numbers": self.dest_numbers.count(),
+            "call_duration_percentiles": {
+                f"p{round(q * 100)}": self.call_durations.quantile(q) for q in quantiles
+            },
+        }
+
+
+class SketchBuffer:
+    """
+    Sketches of the CDRs consumed since the last flush, per hour. `flush` merges them into the
+    `CdrSketch` rows under a row lock, so any number of consumers can maintain the same hours.
+    """
+
+    def __init__(self):
+        self._hours = {}
+        self._flushed_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._hours)
+
+    def add(self, cdr_data):
+        hour = hour_of(cdr_data['start_time'])
+        if hour not in self._hours:
+            self._hours[hour] = HourSketches()
+        self._hours[hour].add(cdr_data)
+
+    def due(self):
+        """Check whether SKETCHES['FLUSH_INTERVAL'] seconds passed since the last flush."""
+        return time.monotonic() - self._flushed_at >= sketch_settings().get('FLUSH_INTERVAL', 5.0)
+
+    def flush(self):
+        """Merge the buffered sketches into the database, the buffer is kept if that fails."""
+        from apps.cdr.models import CdrSketch
+
+        with transaction.atomic():
+            for hour, sketches in sorted(self._hours.items()):
+                row, created = CdrSketch.objects.select_for_update().get_or_create(bucket=hour)
+                if not created:
+                    sketches = HourSketches.from_row(row).merge(sketches)
+                sketches.to_row(row).save()
+        self._hours = {}
+        self._flushed_at = time.monotonic()
+
+
+def merged_sketches(start_time, end_time):
+    """
+    Merge the sketches of the hours starting between `start_time` (widened to its hour) and `end_time` (excluded).
+    """
+    from apps.cdr.models import CdrSketch
+
+    merged = HourSketches()
+    for row in CdrSketch.objects.filter(bucket__gte=hour_of(start_time), bucket__lt=end_time).iterator():
+        merged.merge(HourSketches.from_row(row))
+    return merged
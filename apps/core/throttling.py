@@ -0,0 +1,202 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import BaseThrottle
+
+from apps.core.server_timing import timed
+
+"""Seconds of every throttle period, by the first letter of the period in a 'N/period' rate."""
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+"""
+Token bucket in one Redis hash (tokens, updated). Refills the bucket for the time elapsed on the
+Redis clock, then takes up to ARGV[3] whole tokens.
+KEYS[1]: the bucket. ARGV: capacity, tokens per second, tokens wanted.
+Returns the tokens granted and, when none were, the seconds until the next token.
+"""
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local granted = math.min(wanted, math.floor(tokens))
+local wait = 0
+if granted >= 1 then
+    tokens = tokens - granted
+else
+    granted = 0
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {granted, tostring(wait)}
+"""
+
+
+def parse_rate(rate):
+    """Return the capacity and the refill rate (tokens per second) of a 'N/period' rate such as '5/m'."""
+    count, period = rate.split('/')
+    return int(count), int(count) / PERIODS[period[0]]
+
+
+class RedisBuckets:
+    """
+    Token buckets in Redis, every `take` is one atomic script call. The script runs on a client of the
+    first server of the cache LOCATION, the one Django's RedisCache writes to, with the cache's key prefix.
+    """
+
+    def __init__(self, cache, location):
+        self.cache = cache
+        self.url = location.split(',')[0] if isinstance(location, str) else location[0]
+        self._client = None
+        self._script = None
+
+    def take(self, key, capacity, rate, wanted):
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.url)
+            self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        granted, wait = self._script(keys=[self.cache.make_and_validate_key(key)], args=[capacity, rate, wanted])
+        return int(granted), float(wait)
+
+
+class CacheBuckets:
+    """
+    Token buckets in any other Django cache (the file cache in development). Reading and writing a
+    bucket are two calls, so concurrent requests may share the last token.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def take(self, key, capacity, rate, wanted):
+        now = time.time()
+        tokens, updated = self.cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+        granted = min(wanted, math.floor(tokens))
+        wait = 0.0
+        if granted >= 1:
+            tokens -= granted
+        else:
+            granted, wait = 0, (1 - tokens) / rate
+        self.cache.set(key, (tokens, now), timeout=math.ceil(capacity / rate))
+        return granted, wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket throttle with the rates of settings.THROTTLE_CONFIG, by the view's `throttle_scope`
+    (staff users get the `admin` scope). Buckets are kept per user, or per client address for anonymous
+    requests, in the THROTTLE['CACHE'] cache: one atomic script call per check when it is Redis.
+
+    Each call takes a lease of up to THROTTLE['LEASE_FRACTION'] of the bucket (THROTTLE['MIN_LEASE']
+    tokens at least), spent locally during THROTTLE['LEASE_TTL'] seconds, and a denial is remembered
+    until the next token is due, so hot clients do not reach Redis on every request. Unspent leases
+    expire, the limit is never exceeded but the tokens are lost to the client: with the default fraction
+    and minimum, a lease is a single token below 40 requests per period, so at the default 5/m every
+    allowed request is one Redis call and only denials are served locally.
+    If the cache fails, requests are allowed.
+    """
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+
+    _lock = threading.Lock()
+    _leases = {}
+    _denied = {}
+    _buckets = {}
+
+    MAX_LOCAL_KEYS = 10000
+
+    def __init__(self):
+        self._wait = None
+
+    @classmethod
+    def buckets(cls):
+        alias = settings.THROTTLE.get('CACHE', 'default')
+        if alias not in cls._buckets:
+            cache = caches[alias]
+            if isinstance(cache, RedisCache):
+                cls._buckets[alias] = RedisBuckets(cache, settings.CACHES[alias]['LOCATION'])
+            else:
+                cls._buckets[alias] = CacheBuckets(cache)
+        return cls._buckets[alias]
+
+    @classmethod
+    def clear_local(cls):
+        """Forget the leases, denials and bucket stores of this process."""
+        with cls._lock:
+            cls._leases.clear()
+            cls._denied.clear()
+            cls._buckets.clear()
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is not None and request.user and request.user.is_staff and 'admin' in settings.THROTTLE_CONFIG:
+            return 'admin'
+        return scope
+
+    @timed('throttle')
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        if scope is None or scope not in settings.THROTTLE_CONFIG:
+            return True
+        capacity, rate = parse_rate(settings.THROTTLE_CONFIG[scope]['rate'])
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        key = self.cache_format % {'scope': scope, 'ident': ident}
+
+        now = time.monotonic()
+        with self._lock:
+            denied_until = self._denied.get(key)
+            if denied_until is not None:
+                if now < denied_until:
+                    self._wait = denied_until - now
+                    return False
+                del self._denied[key]
+            lease = self._leases.get(key)
+            if lease is not None and lease[0] > 0 and now < lease[1]:
+                lease[0] -= 1
+                return True
+
+        lease = int(capacity * settings.THROTTLE.get('LEASE_FRACTION', 0.05))
+        wanted = min(capacity, max(settings.THROTTLE.get('MIN_LEASE', 1), lease))
+        try:
+            granted, wait = self.buckets().take(key, capacity, rate, wanted)
+        except Exception as e:
+            print(f"Throttle cache unavailable, request allowed: {e}")
+            return True
+
+        with self._lock:
+            self._prune(now)
+            if not granted:
+                self._denied[key] = now + wait
+                self._wait = wait
+                return False
+            if granted > 1:
+                self._leases[key] = [granted - 1, now + settings.THROTTLE.get('LEASE_TTL', 1.0)]
+            else:
+                self._leases.pop(key, None)
+        return True
+
+    def _prune(self, now):
+        """Drop expired leases and denials once too many clients are tracked, called with the lock held."""
+        if len(self._leases) + len(self._denied) < self.MAX_LOCAL_KEYS:
+            return
+        for key in [key for key, lease in self._leases.items() if lease[1] <= now]:
+            del self._leases[key]
+        for key in [key for key, until in self._denied.items() if until <= now]:
+            del self._denied[key]
+
+    def wait(self):
+        return self._wait
@@ -38,3 +38,15 @@ class PhoneNumberMobileValidator(CustomRegexValidator):
             r"09(1[0-9]|3[0-9]|2[0-9]|0[1-9]|9[0-9])[0-9]{7}$",
             _('Please enter a valid phone number in the format 09121234567.')
         )
+
+
+class PhoneNumberPrefixValidator(CustomRegexValidator):
+    """
+    Validator for the leading digits of a phone number (4 to 11 digits, e.g. 0912345)
+    """
+
+    def __init__(self):
+        super().__init__(
+            r"^09[0-9]{2,9}$",
+            _('Please enter the first 4 to 11 digits of a phone number, e.g. 0912345.')
+        )
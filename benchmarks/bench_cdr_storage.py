@@ -0,0 +1,104 @@
+"""
+Compare the insert rate and index size of the old (varchar numbers, four number indexes) and the new
+(bigint numbers, one covering unique key) Cdr table layouts on the configured PostgreSQL database.
+
+Run with: python -m benchmarks.bench_cdr_storage --rows 200000
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+LAYOUTS = {
+    'varchar': [
+        """CREATE TEMPORARY TABLE bench_cdr_varchar (
+            id bigserial PRIMARY KEY,
+            src_number varchar(11) NOT NULL UNIQUE,
+            dest_number varchar(11) NOT NULL UNIQUE,
+            call_duration integer,
+            start_time timestamptz NOT NULL,
+            end_time timestamptz NOT NULL,
+            timestamp timestamptz NOT NULL,
+            call_successful boolean NOT NULL,
+            CONSTRAINT bench_varchar_unique_src_dest UNIQUE (src_number, dest_number)
+        )""",
+        "CREATE INDEX ON bench_cdr_varchar (src_number, dest_number, timestamp)",
+        "CREATE INDEX ON bench_cdr_varchar (timestamp)",
+    ],
+    'bigint': [
+        """CREATE TEMPORARY TABLE bench_cdr_bigint (
+            id bigserial PRIMARY KEY,
+            src_number bigint NOT NULL,
+            dest_number bigint NOT NULL,
+            call_duration integer,
+            start_time timestamptz NOT NULL,
+            end_time timestamptz NOT NULL,
+            timestamp timestamptz NOT NULL,
+            call_successful boolean NOT NULL,
+            CONSTRAINT bench_bigint_unique_src_dest UNIQUE (src_number, dest_number) INCLUDE (timestamp)
+        )""",
+        "CREATE INDEX ON bench_cdr_bigint (timestamp)",
+    ],
+}
+
+
+def generate_rows(count):
+    """Generate rows with unique src and dest numbers, so both layouts accept all of them."""
+    now = datetime.now(timezone.utc)
+    numbers = random.sample(range(100000000, 999999999), count * 2)
+    for index in range(count):
+        start_time = now - timedelta(seconds=random.randint(0, 8640000))
+        yield (
+            f"09{numbers[index * 2]}", f"09{numbers[index * 2 + 1]}", random.randint(1, 60000),
+            start_time, start_time + timedelta(seconds=120), start_time, random.choice([True, False]),
+        )
+
+
+def run(layout, rows, batch_size):
+    """Create the table of a layout, insert `rows` in batches and return (rows per second, index bytes, table bytes)."""
+    table = f"bench_cdr_{layout}"
+    with connection.cursor() as cursor:
+        for statement in LAYOUTS[layout]:
+            cursor.execute(statement)
+        insert = (f"INSERT INTO {table} (src_number, dest_number, call_duration, start_time, end_time, timestamp, "
+                  f"call_successful) VALUES (%s, %s, %s, %s, %s, %s, %s)")
+        if layout == 'bigint':
+            rows = [(int(row[0]), int(row[1]), *row[2:]) for row in rows]
+
+        started = time.perf_counter()
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(insert, rows[start:start + batch_size])
+        elapsed = time.perf_counter() - started
+
+        cursor.execute("SELECT pg_indexes_size(%s), pg_relation_size(%s)", [table, table])
+        index_bytes, table_bytes = cursor.fetchone()
+        cursor.execute(f"DROP TABLE {table}")
+    return len(rows) / elapsed, index_bytes, table_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000, help='Number of CDRs to insert per layout.')
+    parser.add_argument('--batch_size', type=int, default=1000, help='Rows per executemany call.')
+    args = parser.parse_args()
+
+    rows = list(generate_rows(args.rows))
+    results = {layout: run(layout, rows, args.batch_size) for layout in LAYOUTS}
+
+    print(f"{'layout':<10}{'rows/s':>12}{'index MB':>12}{'table MB':>12}")
+    for layout, (rate, index_bytes, table_bytes) in results.items():
+        print(f"{layout:<10}{rate:>12.0f}{index_bytes / 2 ** 20:>12.1f}{table_bytes / 2 ** 20:>12.1f}")
+    old, new = results['varchar'], results['bigint']
+    print(f"insert rate: {new[0] / old[0]:.2f}x, index size: {new[1] / old[1]:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
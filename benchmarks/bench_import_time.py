@@ -0,0 +1,87 @@
+"""
+Measure what importing the pipeline modules costs a new process, with `python -X importtime`: every
+module is imported in a fresh interpreter `--runs` times and the median cumulative time is compared
+to `--target-ms`. Importing them must not set up Django (settings, apps, ORM) nor create an
+Elasticsearch client, which only happens once a component needs them (see `apps.core.bootstrap`).
+
+Runs without any service. Exits with status 1 when a module misses the target or boots Django.
+
+Run with: python -m benchmarks.bench_import_time --runs 5 --target-ms 100
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+"""Modules imported by the processes spawned for the pipeline: producers, consumers and their commands."""
+MODULES = [
+    'apps.cdr.tasks.tasks_main',
+    'apps.cdr.tasks.tasks_producer',
+    'apps.cdr.tasks.tasks_consumer',
+    'apps.core.management.commands.create_producer',
+    'apps.core.management.commands.create_consumer',
+]
+
+"""Printed by the child once the module is imported: whether Django's apps are loaded and a client exists."""
+PROBE = ("import {module}, sys; from django.apps import apps; from apps.core import elastic; "
+         "print(apps.ready, bool(elastic._clients), 'django.core.handlers.wsgi' in sys.modules)")
+
+
+def import_time(module):
+    """
+    Import `module` in a new interpreter.
+
+    :return: The cumulative import time of the module in milliseconds, the (self µs, module) of every
+        module imported until then, and whether Django was set up, a client created or the WSGI handler imported.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE.format(module=module)],
+                            capture_output=True, text=True, env={**os.environ, 'PYTHONPATH': os.pathsep.join(
+                                filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')]))})
+    if result.returncode:
+        error = '\n'.join(line for line in result.stderr.splitlines() if not line.startswith('import time:'))
+        raise RuntimeError(f'Importing {module} failed:\n{error}')
+    total, imported = None, []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        imported.append((int(self_us), name))
+        if name == module:
+            # Children are listed before their parent: the rest was imported by the probe.
+            total = int(cumulative_us) / 1000
+            break
+    booted = result.stdout.split()[-3:] != ['False', 'False', 'False']
+    return total, imported, booted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per module.')
+    parser.add_argument('--target-ms', type=float, default=100.0, help='Most cumulative import time per module.')
+    parser.add_argument('--top', type=int, default=10, help='Heaviest imports listed for the slowest module.')
+    parser.add_argument('modules', nargs='*', default=MODULES, help='Modules to measure.')
+    args = parser.parse_args()
+
+    failed, slowest = False, (0.0, None, [])
+    print(f"{'module':<48}{'median ms':>12}{'max ms':>10}  boots Django")
+    for module in args.modules:
+        runs = [import_time(module) for _ in range(args.runs)]
+        times = [total for total, _, _ in runs]
+        booted = any(run[2] for run in runs)
+        median = statistics.median(times)
+        failed |= booted or median > args.target_ms
+        print(f"{module:<48}{median:>12.1f}{max(times):>10.1f}  {'yes' if booted else 'no'}")
+        if median > slowest[0]:
+            slowest = (median, module, runs[-1][1])
+
+    if slowest[1] is not None:
+        print(f"\nHeaviest imports of {slowest[1]} (self ms):")
+        for self_us, name in sorted(slowest[2], reverse=True)[:args.top]:
+            print(f"{self_us / 1000:>8.1f}  {name.strip()}")
+    print(f"\ntarget: {args.target_ms:.0f} ms per module, {'FAILED' if failed else 'met'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Compare the CPU time and peak memory of turning an Elasticsearch search response into the HTTP body of
+a CDR search, for pages of 1k hits:
+- baseline: full response parsed with the json module, `_source` extracted, DRF's JSONRenderer;
+- fast: response trimmed with `filter_path=hits.hits._source`, parsed and rendered with orjson.
+
+Runs without any service, the response bodies are synthesized.
+
+Run with: python -m benchmarks.bench_search_response --hits 1000 --iterations 200
+"""
+import argparse
+import json
+import os
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from apps.core.renderers import FastJSONRenderer, orjson  # noqa: E402
+
+
+def generate_response(hits, filtered):
+    """Build the raw body Elasticsearch returns for a search of `hits` CDRs, with or without `filter_path`."""
+    now = datetime.now(timezone.utc)
+    documents = []
+    for index in range(hits):
+        start_time = now - timedelta(seconds=random.randint(0, 8640000))
+        source = {
+            "id": index, "src_number": f"0912{random.randint(0, 9999999):07d}",
+            "dest_number": f"0935{random.randint(0, 9999999):07d}", "call_duration": random.randint(1, 3600),
+            "start_time": start_time.isoformat(), "end_time": (start_time + timedelta(seconds=120)).isoformat(),
+            "timestamp": start_time.isoformat(), "call_successful": random.choice([True, False]),
+        }
+        if filtered:
+            documents.append({"_source": source})
+        else:
+            documents.append({"_index": "cdrs", "_id": str(index), "_score": None, "_source": source,
+                              "sort": [int(start_time.timestamp() * 1000), index]})
+    if filtered:
+        return json.dumps({"hits": {"hits": documents}}).encode()
+    return json.dumps({"took": 3, "timed_out": False, "_shards": {"total": 1, "successful": 1, "skipped": 0,
+                                                                     "failed": 0},
+                       "hits": {"total": {"value": hits, "relation": "eq"}, "max_score": None,
+                                "hits": documents}}).encode()
+
+
+def baseline(body):
+    response = json.loads(body)
+    return JSONRenderer().render([hit["_source"] for hit in response["hits"]["hits"]])
+
+
+def fast(body):
+    response = orjson.loads(body)
+    return FastJSONRenderer().render([hit["_source"] for hit in response.get("hits", {}).get("hits", [])])
+
+
+def measure(path, body, iterations):
+    """Return (milliseconds per page, peak MiB while handling one page) of a response path."""
+    path(body)
+    started = time.process_time()
+    for _ in range(iterations):
+        path(body)
+    elapsed = (time.process_time() - started) / iterations
+
+    tracemalloc.start()
+    path(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hits', type=int, default=1000, help='Number of hits per page.')
+    parser.add_argument('--iterations', type=int, default=200, help='Pages handled per path.')
+    args = parser.parse_args()
+    if orjson is None:
+        parser.error('orjson is not installed, install the fast-json extra.')
+
+    bodies = {'baseline': generate_response(args.hits, filtered=False),
+              'fast': generate_response(args.hits, filtered=True)}
+    results = {name: measure(path, bodies[name], args.iterations)
+               for name, path in (('baseline', baseline), ('fast', fast))}
+
+    print(f"{'path':<10}{'ES KB':>10}{'ms/page':>10}{'peak MB':>10}")
+    for name, (elapsed, peak) in results.items():
+        print(f"{name:<10}{len(bodies[name]) / 1024:>10.0f}{elapsed:>10.2f}{peak:>10.2f}")
+    old, new = results['baseline'], results['fast']
+    print(f"cpu: {old[0] / new[0]:.2f}x faster, peak memory: {new[1] / old[1]:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
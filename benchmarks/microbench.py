@@ -0,0 +1,161 @@
+"""
+Microbenchmarks of the functions run for every ingested CDR or every search request, timed without any
+service: the producer (`generate_cdr`, `_get_shard_id`), the consumer (`_parse_message`), the phone
+number validator, the validation of the search parameters and the Elasticsearch query of a search.
+
+Every case is warmed up, then timed in `repeat` rounds of as many calls as fit in `min_time` seconds;
+the fastest round gives the time per call, the least disturbed by the rest of the machine. Results are
+compared to a baseline (benchmarks/baseline.json) recorded on the same machine: a case slower than
+its baseline by more than the threshold is a regression.
+
+Run with: python manage.py bench (see `python manage.py bench --help`)
+"""
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+"""Baseline of the suite, next to this module whatever the current directory."""
+BASELINE_PATH = str(Path(__file__).with_name('baseline.json'))
+
+"""A CDR message as published by the producer."""
+MESSAGE = {
+    'src_number': '09124526529', 'dest_number': '09125365540', 'call_duration': 41310, 'call_successful': False,
+    'start_time': '2024-05-02T10:15:00', 'end_time': '2024-05-02T10:16:30', 'timestamp': '2024-05-02T10:16:31',
+}
+
+"""Query parameters of a typical search."""
+SEARCH_PARAMS = {
+    'src_number': '09124526529', 'dest_number': '09125365540', 'start_time': '2024-05-01T00:00:00Z',
+    'end_time': '2024-06-01T00:00:00Z', 'call_successful': 'true', 'call_duration': '60',
+}
+
+
+def bench_generate_cdr():
+    from apps.cdr.tasks.tasks_main import generate_cdr
+
+    return generate_cdr
+
+
+def bench_get_shard_id():
+    from apps.cdr.tasks.tasks_producer import RabbitMQProducer
+
+    # The producer is a singleton holding a connection, only its shard count is used.
+    producer = SimpleNamespace(shard_count=4)
+    return lambda: RabbitMQProducer._get_shard_id(producer, MESSAGE['src_number'])
+
+
+def bench_parse_message():
+    from apps.cdr.tasks.tasks_consumer import RabbitMQConsumer
+
+    return lambda: RabbitMQConsumer._parse_message(None, MESSAGE)
+
+
+def bench_phone_number_validator():
+    from apps.core.validators import PhoneNumberMobileValidator
+
+    validator = PhoneNumberMobileValidator()
+    return lambda: validator(MESSAGE['src_number'])
+
+
+def bench_search_serializer():
+    from apps.cdr.serializers.cdr_serializer import CdrSearchSerializer
+
+    return lambda: CdrSearchSerializer(data=SEARCH_PARAMS).is_valid()
+
+
+def bench_build_query():
+    from apps.cdr.views.cdr_search import CDRSearchView
+
+    view = CDRSearchView()
+    start, end = datetime(2024, 5, 1, tzinfo=timezone.utc), datetime(2024, 6, 1, tzinfo=timezone.utc)
+    return lambda: view.build_query('09124526529', '09125365540', start, end, True, 60)
+
+
+"""The cases of the suite: a name and a function returning the callable to time."""
+CASES = {
+    'generate_cdr': bench_generate_cdr,
+    'producer_get_shard_id': bench_get_shard_id,
+    'consumer_parse_message': bench_parse_message,
+    'phone_number_validator': bench_phone_number_validator,
+    'search_serializer_is_valid': bench_search_serializer,
+    'search_build_query': bench_build_query,
+}
+
+
+def measure(func, repeat=5, min_time=0.1, warmup=0.05):
+    """
+    Time a callable.
+
+    :param repeat: Number of timed rounds.
+    :param min_time: Seconds a round lasts at least, the number of calls per round is chosen to match.
+    :param warmup: Seconds the callable runs before it is timed.
+    :return: The fastest and the median time per call, in microseconds.
+    """
+    deadline, calls = time.perf_counter() + warmup, 0
+    while time.perf_counter() < deadline or calls == 0:
+        func()
+        calls += 1
+
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - started >= min_time / 10:
+            break
+        number *= 2
+    number = max(1, int(number * min_time / max(time.perf_counter() - started, 1e-9)))
+
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - started) / number * 1e6)
+    return min(rounds), statistics.median(rounds)
+
+
+def run(names=None, **options):
+    """Run the cases named (every case by default), return {name: {'best_us': ..., 'median_us': ...}}."""
+    results = {}
+    for name in names or CASES:
+        best, median = measure(CASES[name](), **options)
+        results[name] = {'best_us': round(best, 3), 'median_us': round(median, 3)}
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare the results to the baseline.
+
+    :param threshold: Largest slowdown allowed, as a fraction of the baseline time (0.2 for 20%).
+    :return: (name, baseline µs, current µs, ratio, regressed) of every case, None for the baseline
+        and the ratio of the cases it does not have.
+    """
+    rows = []
+    for name, result in results.items():
+        reference = baseline.get('cases', {}).get(name, {}).get('best_us')
+        if not reference:
+            rows.append((name, None, result['best_us'], None, False))
+            continue
+        ratio = result['best_us'] / reference
+        rows.append((name, reference, result['best_us'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def load_baseline(path):
+    """Read a baseline written by `save_baseline`, raises FileNotFoundError when there is none."""
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, results):
+    """Write the results as the baseline, with the interpreter they were measured with."""
+    with open(path, 'w') as baseline_file:
+        json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'cases': results},
+                  baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
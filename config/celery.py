@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import after_setup_logger
 import logging
 
 # Set the Django settings module for the Celery app
@@ -8,16 +9,18 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 # Create a Celery instance named "app" with base URL "http://localhost"
 app = Celery("config", base_url="http://localhost")
 
-# Configure Celery using Django settings
+# Configure Celery using Django settings (CELERY_BROKER_URL, CELERY_RESULT_BACKEND...)
 app.config_from_object("django.conf:settings", namespace="CELERY")
 
 # Automatically discover tasks defined in the Django app
 app.autodiscover_tasks()
 
-# Set up logging to a file specified by log_file
+# Set up logging to a file specified by log_file, in the worker only: the Django processes load this app to send tasks
 log_file = "/var/log/celery.log"
-logging.basicConfig(filename=log_file, level=logging.DEBUG)
 
-# Configure Celery to use Redis as the broker and result backend
-app.conf.broker_url = 'redis://127.0.0.1:6379/0'
-app.conf.result_backend = 'redis://127.0.0.1:6379/0'
+
+@after_setup_logger.connect
+def log_to_file(logger, **kwargs):
+    handler = logging.FileHandler(log_file)
+    handler.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
@@ -0,0 +1,21 @@
+"""
+Gunicorn settings of the ASGI serving profile, used for the async endpoints (`cdr/async/...`):
+
+    gunicorn -c config/gunicorn_asgi.py config.asgi:application
+
+Every worker runs one event loop with its own AsyncElasticsearch connection pool
+(ES_ASYNC_CONNECTIONS_PER_NODE connections), so a few workers keep hundreds of queries in flight.
+Async ORM calls run in the worker's thread pool; keep CONN_MAX_AGE at 0 under ASGI.
+"""
+import multiprocessing
+
+from decouple import config
+
+bind = config('GUNICORN_BIND', default='0.0.0.0:8000')
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = config('GUNICORN_WORKERS', cast=int, default=multiprocessing.cpu_count())
+timeout = config('GUNICORN_TIMEOUT', cast=int, default=30)
+graceful_timeout = 30
+keepalive = 5
+max_requests = config('GUNICORN_MAX_REQUESTS', cast=int, default=10000)
+max_requests_jitter = 1000
@@ -30,6 +30,8 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 MIDDLEWARE = [
+    "apps.core.middlewares.RequestTimingMiddleware",
+    "apps.core.middlewares.ProfileMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -38,8 +40,6 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
-if DEBUG:
-    MIDDLEWARE.append('apps.core.middlewares.LogRequiredMiddleware')
 
 TEMPLATES = [
     {
@@ -60,12 +60,19 @@ TEMPLATES = [
 # THROTTLE_CONFIG
 THROTTLE_CONFIG = {
     'default': {
-        'rate': '5/m',  # 5 requests per 5 minutes
+        'rate': '5/m',  # 5 requests per minute
     },
     'admin': {
-        'rate': '20/m',  # 20 requests per 5 minutes
+        'rate': '20/m',  # 20 requests per minute, staff users
     },
 }
+# Token bucket throttle (apps.core.throttling): cache holding the buckets, and local leases of tokens
+THROTTLE = {
+    'CACHE': config('THROTTLE_CACHE', default='default'),
+    'LEASE_FRACTION': config('THROTTLE_LEASE_FRACTION', cast=float, default=0.05),  # of a bucket, per cache call
+    'MIN_LEASE': config('THROTTLE_MIN_LEASE', cast=int, default=1),  # tokens, per cache call
+    'LEASE_TTL': config('THROTTLE_LEASE_TTL', cast=float, default=1.0),  # seconds
+}
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -100,17 +107,18 @@ SIMPLE_JWT = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.core.authentication.JWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
-    'DEFAULT_THROTTLING_CLASSES': [
-        'apps.account.throttling.CustomThrottle',
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
-    'DEFAULT_THROTTLE_RATES': {
-        'default': '5/m',
-        'admin': '20/m',
-    },
+    'DEFAULT_THROTTLE_CLASSES': [
+        'apps.core.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {scope: scope_config['rate'] for scope, scope_config in THROTTLE_CONFIG.items()},
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 SPECTACULAR_SETTINGS = {
@@ -129,18 +137,142 @@ MEDIA_ROOT = BASE_DIR / "storage/media"
 
 # Logging
 LOG_FILE_PATH = config("LOG_FILE_PATH")
+# Request timing (apps.core.middlewares): Server-Timing header and request log, written to LOG_FILE_PATH off the
+# request thread
+REQUEST_TIMING = {
+    'HEADER': config('REQUEST_TIMING_HEADER', cast=bool, default=False),  # exposes internal timings to clients
+    'LOG': config('REQUEST_TIMING_LOG', cast=bool, default=True),
+}
+# Sampling profiler (utility.profiler): requests sent with an `X-Profile: <TOKEN>` header (off without a token),
+# and the consumer on SIGUSR1 or --profile-seconds
+PROFILER = {
+    'TOKEN': config('PROFILER_TOKEN', default=''),
+    'DIR': config('PROFILER_DIR', default=str(BASE_DIR / 'profiles')),
+    'FORMAT': config('PROFILER_FORMAT', default='speedscope'),  # 'speedscope' (JSON) or 'folded' (flamegraph.pl)
+    'INTERVAL': config('PROFILER_INTERVAL', cast=float, default=0.005),  # seconds between samples, consumer
+    'REQUEST_INTERVAL': config('PROFILER_REQUEST_INTERVAL', cast=float, default=0.001),  # and requests
+    'SIGNAL_SECONDS': config('PROFILER_SIGNAL_SECONDS', cast=float, default=30),
+}
 
 # RabbitMQ settings for Celery
 CELERY_BROKER_URL = config("CELERY_BROKER_URL")
 CELERY_ACCEPT_CONTENT = config("CELERY_ACCEPT_CONTENT")
 CELERY_TASK_SERIALIZER = config("CELERY_TASK_SERIALIZER")
+CELERY_RESULT_BACKEND = config("CELERY_RESULT_BACKEND", default=None)
+CELERY_IMPORTS = ("apps.cdr.tasks.tasks_indexing",)
 
-# Elasticsearch Settings
+# Elasticsearch Settings: every client (API, consumer, documents) is built from these by apps.core.elastic
 ELASTICSEARCH_DSL = {
     'default': {
-        'hosts': config('ELASTICSEARCH_HOST', default='http://localhost:9200')
+        'hosts': config('ELASTICSEARCH_HOST', default='http://localhost:9200'),  # comma separated, round-robin
+        'connections_per_node': config('ELASTICSEARCH_CONNECTIONS_PER_NODE', cast=int, default=10),
+        'http_compress': config('ELASTICSEARCH_HTTP_COMPRESS', cast=bool, default=True),
+        'request_timeout': config('ELASTICSEARCH_REQUEST_TIMEOUT', cast=float, default=10.0),  # seconds
+        'max_retries': config('ELASTICSEARCH_MAX_RETRIES', cast=int, default=3),
+        'retry_on_status': (429, 502, 503, 504),
+        'retry_on_timeout': True,
+        'node_selector_class': 'round_robin',
+        'dead_node_backoff_factor': 1.0,  # seconds, doubled for every consecutive failure of a node
+        'max_dead_node_backoff': 30.0,  # seconds
     },
 }
+# Saved and deleted CDRs are indexed by the `index_cdrs` Celery task, in batches of up to BATCH_SIZE ids sent
+# WINDOW seconds after the first change (apps.core.signal_processor)
+ELASTICSEARCH_DSL_SIGNAL_PROCESSOR = 'apps.core.signal_processor.CoalescingSignalProcessor'
+ES_INDEXING = {
+    'WINDOW': config('ES_INDEXING_WINDOW', cast=float, default=1.0),  # seconds
+    'BATCH_SIZE': config('ES_INDEXING_BATCH_SIZE', cast=int, default=500),
+}
+# Wait between two retries of a request: random, up to min(MAX, FACTOR * 2 ** attempt) seconds
+ELASTICSEARCH_RETRY_BACKOFF = {
+    'FACTOR': config('ELASTICSEARCH_RETRY_BACKOFF_FACTOR', cast=float, default=0.2),
+    'MAX': config('ELASTICSEARCH_RETRY_BACKOFF_MAX', cast=float, default=10.0),
+}
+
+# Bulk indexing (CdrDocument.bulk_index, reindex_cdrs): chunk limits, concurrency and retries of rejected items
+BULK_INDEXER = {
+    'CHUNK_DOCS': config('BULK_CHUNK_DOCS', cast=int, default=1000),
+    'CHUNK_BYTES': config('BULK_CHUNK_BYTES', cast=int, default=5 * 1024 * 1024),
+    'MAX_IN_FLIGHT': config('BULK_MAX_IN_FLIGHT', cast=int, default=4),  # halved on 429s, regrown when clean
+    'MAX_RETRIES': config('BULK_MAX_RETRIES', cast=int, default=5),
+    'BACKOFF': config('BULK_BACKOFF', cast=float, default=0.5),  # seconds, doubled for every retry of an item
+    'MAX_BACKOFF': config('BULK_MAX_BACKOFF', cast=float, default=30.0),
+}
+
+# CDR indices: one index per period of start_time (cdrs-YYYY.MM or cdrs-YYYY.MM.DD) behind the `cdrs` read alias
+CDR_INDICES = {
+    'PERIOD': config('CDR_INDEX_PERIOD', default='month'),  # 'month' or 'day'
+    'SHARDS': config('CDR_INDEX_SHARDS', cast=int, default=1),  # primary shards of every period index
+    'REPLICAS': config('CDR_INDEX_REPLICAS', cast=int, default=1),
+    'MAX_SEARCHED': config('CDR_INDEX_MAX_SEARCHED', cast=int, default=36),  # more periods: search the read alias
+}
+
+# Databases: everything uses "default" (primary) but the reads of the read-only API views and admin change
+# lists, which go to the replicas (see apps.core.db_routers)
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": config("DB_NAME"),
+        "USER": config("DB_USER"),
+        "PASSWORD": config("DB_PASSWORD"),
+        "HOST": config("DB_HOST"),
+        "PORT": config("DB_PORT"),
+    }
+}
+DB_REPLICA_HOSTS = config(
+    "DB_REPLICA_HOSTS", default="", cast=lambda hosts: [h.strip() for h in hosts.split(",") if h.strip()]
+)
+for replica_index, replica_host in enumerate(DB_REPLICA_HOSTS):
+    replica_host, _, replica_port = replica_host.partition(":")
+    DATABASES[f"replica_{replica_index}"] = {
+        **DATABASES["default"],
+        "HOST": replica_host,
+        "PORT": replica_port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["apps.core.db_routers.ReplicaRouter"]
+DB_REPLICA_MAX_LAG = config("DB_REPLICA_MAX_LAG", cast=float, default=5.0)  # seconds
+DB_REPLICA_LAG_CHECK_INTERVAL = config("DB_REPLICA_LAG_CHECK_INTERVAL", cast=float, default=5.0)  # seconds
+
+# Hot window: per worker in-memory copy of the last N minutes of CDRs (requires numpy)
+HOT_WINDOW = {
+    'ENABLED': config('HOT_WINDOW_ENABLED', cast=bool, default=False),
+    'MINUTES': config('HOT_WINDOW_MINUTES', cast=int, default=15),
+    'CAPACITY': config('HOT_WINDOW_CAPACITY', cast=int, default=500000),
+    'POLL_INTERVAL': config('HOT_WINDOW_POLL_INTERVAL', cast=float, default=1.0),
+    'ID_MARGIN': config('HOT_WINDOW_ID_MARGIN', cast=int, default=1000),  # ids read again for late commits
+}
+
+# Rows per day of the CDR counters behind the sync status, inserts update a random one to avoid lock contention
+CDR_COUNTER_SHARDS = config('CDR_COUNTER_SHARDS', cast=int, default=16)
+
+# Mergeable sketches (distinct numbers, call duration percentiles) maintained per hour by the consumer
+SKETCHES = {
+    'ENABLED': config('SKETCHES_ENABLED', cast=bool, default=True),
+    'HLL_PRECISION': config('SKETCHES_HLL_PRECISION', cast=int, default=12),  # 2^12 registers, ~1.6% error
+    'RELATIVE_ACCURACY': config('SKETCHES_RELATIVE_ACCURACY', cast=float, default=0.01),  # of the percentiles
+    'FLUSH_INTERVAL': config('SKETCHES_FLUSH_INTERVAL', cast=float, default=5.0),  # seconds
+}
+
+# Size of the AsyncElasticsearch connection pool of every ASGI worker (async views)
+ES_ASYNC_CONNECTIONS_PER_NODE = config("ES_ASYNC_CONNECTIONS_PER_NODE", cast=int, default=100)
+
+# Query planner: searches answered by PostgreSQL instead of Elasticsearch (exact lookups, lagging index, ES down)
+QUERY_PLANNER = {
+    'ENABLED': config('QUERY_PLANNER_ENABLED', cast=bool, default=True),
+    'MAX_LAG': config('QUERY_PLANNER_MAX_LAG', cast=float, default=5.0),  # seconds of indexing lag tolerated
+    'RECENT_MINUTES': config('QUERY_PLANNER_RECENT_MINUTES', cast=int, default=5),
+    'CHECK_INTERVAL': config('QUERY_PLANNER_CHECK_INTERVAL', cast=float, default=5.0),  # seconds
+}
+
+# Search result cache (the `search` cache alias), invalidated when the ingest watermark advances
+SEARCH_CACHE = {
+    'ENABLED': config('SEARCH_CACHE_ENABLED', cast=bool, default=True),
+    'TIMEOUT': config('SEARCH_CACHE_TIMEOUT', cast=int, default=60),  # seconds, windows still open
+    'CLOSED_TIMEOUT': config('SEARCH_CACHE_CLOSED_TIMEOUT', cast=int, default=86400),  # seconds, windows in the past
+    'INGEST_GRACE': config('SEARCH_CACHE_INGEST_GRACE', cast=float, default=1.0),  # seconds, ES refresh interval
+    'BUCKET_SETTLE': config('SEARCH_CACHE_BUCKET_SETTLE', cast=int, default=60),  # seconds, time series buckets
+}
 
 # Mode Handling:
 if DEBUG:
@@ -160,22 +292,16 @@ if DEBUG:
         # Application
         *list(map(lambda app: f"apps.{app}", APPLICATIONS)),
     ]
-    DATABASES = {
-        "default": {
-            "ENGINE": "django.db.backends.postgresql",
-            "NAME": config("DB_NAME"),
-            "USER": config("DB_USER"),
-            "PASSWORD": config("DB_PASSWORD"),
-            "HOST": config("DB_HOST"),
-            "PORT": config("DB_PORT"),
-        }
-    }
-
     CACHES = {
         "default": {
             "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
             "LOCATION": BASE_DIR / "utility/cache",
-        }
+        },
+        # Shared with the consumer and the Celery worker, which advance the ingest watermarks it holds
+        "search": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": BASE_DIR / "utility/cache/search",
+        },
     }
 
 else:
@@ -197,6 +323,11 @@ else:
         "default": {
             "BACKEND": "django.core.cache.backends.redis.RedisCache",
             "LOCATION": REDIS_URL,
-        }
+        },
+        "search": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "search",
+        },
     }
     SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
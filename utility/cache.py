@@ -1,22 +1,26 @@
 from typing import Any
 
-from django.core.cache import cache
+from django.core.cache import caches
 
+_missing = object()
 
-def get_or_create(key: str, value: Any, timeout: int = 1):
+
+def get_or_create(key: str, value: Any, timeout: int = 1, using: str = "default"):
     """Get value from cache by key or create it if not exists.
 
         Args:
             key (str): The key to lookup in cache.
-            value (Any): The value to be cached if key does not exist.
-            timeout (int, optional): Timeout for cache expiration in seconds. Defaults to 1.
+            value (Any): The value to be cached if key does not exist, or a callable returning it.
+            timeout (int, optional): Timeout for cache expiration in seconds, 0 to not store it. Defaults to 1.
+            using (str, optional): Alias of the cache in settings.CACHES. Defaults to "default".
 
         Returns:
             Any: The value from cache if found, otherwise the newly created value.
         """
-    if not (data := cache.get(key, None)):
-        if callable(value):
-            value = value()
-
-        cache.set(key, value, timeout)
+    cache = caches[using]
+    data = cache.get(key, _missing)
+    if data is _missing:
+        data = value() if callable(value) else value
+        if timeout:
+            cache.set(key, data, timeout)
     return data
@@ -0,0 +1,142 @@
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+"""Output formats of a profile: speedscope JSON (https://www.speedscope.app) or folded stacks for flamegraph.pl."""
+FORMATS = {'speedscope': '.speedscope.json', 'folded': '.folded'}
+
+_sequence = itertools.count(1)
+
+
+class Sampler:
+    """
+    Statistical profiler: a daemon thread reads the stack of the profiled threads every `interval`
+    seconds (`sys._current_frames`) and counts the stacks seen, so the profiled code runs untouched,
+    unlike with cProfile. Samples are wall clock: a thread waiting on I/O is counted in the waiting call.
+    Nothing runs until `start` and after `stop`.
+    """
+
+    def __init__(self, interval=0.005, thread_ids=None):
+        """
+        :param interval: Seconds between two samples.
+        :param thread_ids: Idents of the threads to sample, every thread but the sampler's by default.
+        """
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.stacks = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._stopped = threading.Event()
+        self._thread = None
+        self._started = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                self.stacks[self.stack(frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def stack(frame):
+        """Return the functions of a stack, outermost first, as (name, file, first line) tuples."""
+        functions = []
+        while frame is not None:
+            code = frame.f_code
+            functions.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        functions.reverse()
+        return tuple(functions)
+
+    def folded(self):
+        """Return the stacks in the folded format of flamegraph.pl: 'outer;inner count' lines."""
+        return ''.join(f"{';'.join(f'{name} ({file}:{line})' for name, file, line in stack)} {count}\n"
+                       for stack, count in self.stacks.most_common())
+
+    def speedscope(self, name):
+        """Return the stacks as a speedscope 'sampled' profile, every stack weighted by its time in seconds."""
+        frames, index, samples, weights = [], {}, [], []
+        for stack, count in self.stacks.most_common():
+            sample = []
+            for function in stack:
+                if function not in index:
+                    index[function] = len(frames)
+                    frames.append({'name': function[0], 'file': function[1], 'line': function[2]})
+                sample.append(index[function])
+            samples.append(sample)
+            weights.append(count * self.interval)
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': [{'type': 'sampled', 'name': name, 'unit': 'seconds', 'startValue': 0,
+                          'endValue': sum(weights), 'samples': samples, 'weights': weights}],
+            'name': name,
+            'exporter': 'cdr-pipeline',
+        }
+
+    def write(self, path, name=None):
+        """Write the profile to `path`, in speedscope format when it ends in .json, folded stacks otherwise."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as profile_file:
+            if path.endswith('.json'):
+                json.dump(self.speedscope(name or os.path.basename(path)), profile_file)
+            else:
+                profile_file.write(self.folded())
+        return path
+
+
+def profiler_settings():
+    """Return settings.PROFILER over the defaults."""
+    return {'DIR': 'profiles', 'FORMAT': 'speedscope', 'INTERVAL': 0.005, 'REQUEST_INTERVAL': 0.001,
+            'SIGNAL_SECONDS': 30, 'TOKEN': '', **getattr(settings, 'PROFILER', {})}
+
+
+def profile_path(directory, prefix, output_format='speedscope'):
+    """Return a new file name in `directory` for a profile of this process, e.g. consumer-4242-20240101T120000-1."""
+    stamp = time.strftime('%Y%m%dT%H%M%S')
+    return os.path.join(directory, f'{prefix}-{os.getpid()}-{stamp}-{next(_sequence)}{FORMATS[output_format]}')
+
+
+def profile_for(seconds, path, interval=0.005, thread_ids=None, on_done=None):
+    """
+    Sample the process for `seconds` in the background, then write the profile to `path`.
+
+    :param on_done: Called with the path once the profile is written.
+    :return: The running `Sampler`.
+    """
+    sampler = Sampler(interval, thread_ids).start()
+
+    def finish():
+        sampler.stop().write(path)
+        if on_done is not None:
+            on_done(path)
+
+    timer = threading.Timer(seconds, finish)
+    timer.daemon = True
+    timer.start()
+    return sampler
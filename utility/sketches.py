@@ -0,0 +1,131 @@
+import hashlib
+import math
+import struct
+
+"""Weight 2^-rank of every possible HyperLogLog register value."""
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter: 2^precision one-byte registers, a standard error of about
+    1.04 / sqrt(2^precision) (1.6% with the default precision of 12, in 4 KiB).
+    Two sketches of the same precision merge losslessly, so per-bucket sketches add up to any range.
+    """
+
+    def __init__(self, precision=12, registers=None):
+        """
+        :param precision: Number of index bits, between 4 and 16.
+        :param registers: The registers of a serialized sketch, see `from_bytes`.
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError('The precision of a HyperLogLog must be between 4 and 16.')
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError(f'A HyperLogLog of precision {precision} has {self.size} registers.')
+
+    def add(self, value):
+        """Add a value, compared by its string form."""
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+        bits = 64 - self.precision
+        index = hashed >> bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Merge another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError('Only HyperLogLogs of the same precision can be merged.')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Return the estimated number of distinct values added."""
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(self.size, 0.7213 / (1 + 1.079 / self.size))
+        estimate = alpha * self.size * self.size / sum(_INVERSE_POWERS[rank] for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)  # Linear counting is more accurate for small sets
+        return round(estimate)
+
+    def to_bytes(self):
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(data[0], data[1:])
+
+
+class DDSketch:
+    """
+    DDSketch quantile sketch for non-negative values: every quantile is returned with a relative error
+    of at most `relative_accuracy`. Values are counted in logarithmic bins, so the size only depends on
+    the range of the values (a few hundred bins for call durations), and sketches merge losslessly.
+    """
+
+    _HEADER = struct.Struct('<dQI')
+    _BIN = struct.Struct('<iQ')
+
+    def __init__(self, relative_accuracy=0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('The relative accuracy of a DDSketch must be between 0 and 1.')
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.bins.values())
+
+    def add(self, value, count=1):
+        """Add a value `count` times."""
+        if value < 0:
+            raise ValueError('A DDSketch only holds non-negative values.')
+        if value == 0:
+            self.zero_count += count
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + count
+
+    def merge(self, other):
+        """Merge another sketch of the same accuracy into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Only DDSketches of the same relative accuracy can be merged.')
+        self.zero_count += other.zero_count
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        return self
+
+    def quantile(self, q):
+        """Return the estimated `q` quantile (0 <= q <= 1), or None when the sketch is empty."""
+        if not 0 <= q <= 1:
+            raise ValueError('A quantile must be between 0 and 1.')
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_bytes(self):
+        return self._HEADER.pack(self.relative_accuracy, self.zero_count, len(self.bins)) + b''.join(
+            self._BIN.pack(key, count) for key, count in sorted(self.bins.items()))
+
+    @classmethod
+    def from_bytes(cls, data):
+        relative_accuracy, zero_count, size = cls._HEADER.unpack_from(data)
+        sketch = cls(relative_accuracy)
+        sketch.zero_count = zero_count
+        sketch.bins = dict(cls._BIN.iter_unpack(data[cls._HEADER.size:cls._HEADER.size + size * cls._BIN.size]))
+        return sketch